@@ -2,6 +2,7 @@ import os
 import frappe
 import openai
 import anthropic
+from telehealth_platform.telehealth.utils import profiling
 
 class LLMAdapter:
     def __init__(self, provider=None):
@@ -31,18 +32,20 @@ class LLMAdapter:
 
     def _call_openai(self, prompt):
         client = openai.OpenAI(api_key=self.api_key)
-        response = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
+        with profiling.external_call("llm"):
+            response = client.chat.completions.create(
+                model="gpt-4-turbo-preview",
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"}
+            )
         return response.choices[0].message.content
 
     def _call_anthropic(self, prompt):
         client = anthropic.Anthropic(api_key=self.api_key)
-        message = client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=1024,
-            messages=[{"role": "user", "content": prompt}]
-        )
+        with profiling.external_call("llm"):
+            message = client.messages.create(
+                model="claude-3-opus-20240229",
+                max_tokens=1024,
+                messages=[{"role": "user", "content": prompt}]
+            )
         return message.content
@@ -0,0 +1,150 @@
+import re
+import threading
+import frappe
+from telehealth_platform.telehealth.utils import profiling
+
+# Textract error codes worth retrying; anything else fails the job at once
+TRANSIENT_ERROR_CODES = {
+    "ThrottlingException",
+    "ProvisionedThroughputExceededException",
+    "InternalServerError",
+    "ServiceUnavailableException",
+    "LimitExceededException",
+}
+
+PLAN_TYPES = ("PPO", "HMO", "EPO", "POS", "HDHP", "PFFS", "Medicare Advantage", "Medicaid")
+
+# One client per site configuration, as for S3 in storage_adapter
+_textract_clients = {}
+_textract_lock = threading.Lock()
+
+class OCRTransientError(Exception):
+    """
+    Raised for failures that may succeed on retry (throttling, timeouts, 5xx).
+    """
+
+class OCRAdapter:
+    def __init__(self, engine=None):
+        # "textract" (AWS) or "local" (Tesseract if installed, else plain-text fixtures)
+        self.engine = engine or frappe.conf.get("ocr_engine", "textract")
+
+    def extract_lines(self, image_bytes):
+        """
+        Returns the text lines detected in an image.
+        """
+        if self.engine == "textract":
+            return self._call_textract(image_bytes)
+        elif self.engine == "local":
+            return self._call_local(image_bytes)
+        else:
+            frappe.throw(f"Unknown OCR engine: {self.engine}")
+
+    def extract_card_fields(self, front_bytes, back_bytes=None):
+        """
+        Runs OCR on both sides of an insurance card and parses the known fields.
+        Values found on the front win over the back.
+        """
+        lines = self.extract_lines(front_bytes)
+        if back_bytes:
+            lines += self.extract_lines(back_bytes)
+        return parse_card_fields(lines)
+
+    def _call_textract(self, image_bytes):
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        try:
+            with profiling.external_call("textract"):
+                response = get_textract_client().detect_document_text(Document={"Bytes": image_bytes})
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in TRANSIENT_ERROR_CODES:
+                raise OCRTransientError(str(e))
+            raise
+        except BotoCoreError as e:
+            # Connection and timeout errors
+            raise OCRTransientError(str(e))
+
+        return [b["Text"] for b in response.get("Blocks", []) if b.get("BlockType") == "LINE"]
+
+    def _call_local(self, image_bytes):
+        try:
+            import io
+            import pytesseract
+            from PIL import Image
+            text = pytesseract.image_to_string(Image.open(io.BytesIO(image_bytes)))
+        except ImportError:
+            # Stand-in for tests and development: fixtures are UTF-8 text "images"
+            text = image_bytes.decode("utf-8", errors="ignore")
+        return [line.strip() for line in text.splitlines() if line.strip()]
+
+def get_textract_client():
+    """
+    Pooled Textract client for the current site's credentials and region.
+    boto3 clients are thread safe and expensive to build.
+    """
+    settings = (
+        frappe.conf.get("aws_access_key_id"),
+        frappe.conf.get("aws_secret_access_key"),
+        frappe.conf.get("aws_region_name")
+    )
+    client = _textract_clients.get(settings)
+    if client is None:
+        with _textract_lock:
+            client = _textract_clients.get(settings)
+            if client is None:
+                import boto3
+                key_id, secret, region = settings
+                client = _textract_clients[settings] = boto3.client(
+                    "textract",
+                    aws_access_key_id=key_id,
+                    aws_secret_access_key=secret,
+                    region_name=region
+                )
+    return client
+
+def parse_card_fields(lines):
+    """
+    Extracts policy, group, plan and subscriber details from OCR text lines.
+    """
+    fields = {}
+    for i, line in enumerate(lines):
+        following = lines[i + 1] if i + 1 < len(lines) else ""
+        lower = line.lower()
+
+        if "policy_number" not in fields and re.search(r"\b(member|subscriber|policy)?\s*(id|#|no\.?|number)\b", lower) \
+                and not lower.startswith("group"):
+            value = get_labelled_value(line, following)
+            if value and re.search(r"\d", value):
+                fields["policy_number"] = value
+        elif "group_number" not in fields and re.search(r"\b(group|grp)\b", lower):
+            value = get_labelled_value(line, following)
+            if value and re.search(r"\d", value):
+                fields["group_number"] = value
+        elif "subscriber_name" not in fields and re.search(r"\b(subscriber|member)\s*(name)?\s*:", lower):
+            fields["subscriber_name"] = get_labelled_value(line, following)
+
+        if "plan_type" not in fields:
+            for plan in PLAN_TYPES:
+                if re.search(rf"\b{re.escape(plan.lower())}\b", lower):
+                    fields["plan_type"] = plan
+                    break
+
+    # The payer name is usually the first line that is not a labelled value
+    for line in lines:
+        if ":" not in line and not re.search(r"\d{3,}", line):
+            fields["provider_name"] = line
+            break
+
+    return fields
+
+def get_labelled_value(line, following):
+    """
+    Value after a "Label: value" separator, or the next line when the label stands alone.
+    """
+    if ":" in line:
+        value = line.split(":", 1)[1].strip()
+        if value:
+            return value
+    parts = line.split()
+    if len(parts) > 1 and re.search(r"\d", parts[-1]):
+        return parts[-1]
+    return following.strip()
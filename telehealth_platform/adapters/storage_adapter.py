@@ -0,0 +1,116 @@
+import threading
+import frappe
+from telehealth_platform.telehealth.utils import profiling
+
+# Object storage for video recordings. Credentials and bucket come from
+# site_config (aws_access_key_id, aws_secret_access_key, aws_region_name,
+# s3_bucket_name). Set s3_endpoint_url to point at an S3-compatible server
+# (MinIO, or `moto_server` in tests) instead of AWS.
+# One client per distinct configuration, so sites of a bench with different
+# credentials or endpoints never share one.
+_s3_clients = {}
+_s3_lock = threading.Lock()
+DELETE_BATCH_SIZE = 1000
+
+def get_s3_client():
+    """
+    Pooled S3 client for the current site's configuration. boto3 clients are
+    thread safe and expensive to build.
+    """
+    conf = frappe.conf
+    settings = (
+        conf.get("aws_access_key_id"),
+        conf.get("aws_secret_access_key"),
+        conf.get("aws_region_name"),
+        conf.get("s3_endpoint_url"),
+        conf.get("s3_addressing_style") or "auto",
+        int(conf.get("s3_max_pool_connections") or 20)
+    )
+    client = _s3_clients.get(settings)
+    if client is None:
+        with _s3_lock:
+            client = _s3_clients.get(settings)
+            if client is None:
+                import boto3
+                from botocore.config import Config
+                key_id, secret, region, endpoint, addressing_style, max_connections = settings
+                client = _s3_clients[settings] = boto3.client(
+                    "s3",
+                    aws_access_key_id=key_id,
+                    aws_secret_access_key=secret,
+                    region_name=region,
+                    endpoint_url=endpoint,
+                    config=Config(
+                        signature_version="s3v4",
+                        # Local stand-ins do not resolve bucket subdomains
+                        s3={"addressing_style": addressing_style},
+                        max_pool_connections=max_connections
+                    )
+                )
+    return client
+
+def reset_s3_client():
+    """
+    Drops the pooled clients, e.g. to release their connections in tests.
+    """
+    with _s3_lock:
+        _s3_clients.clear()
+
+def get_bucket_name():
+    return frappe.conf.get("s3_bucket_name")
+
+def sign_get(key, expires_in, content_type=None):
+    """
+    Presigned GET URL for `key`. S3 serves it with Range support, so players
+    can seek without downloading the whole object.
+    """
+    params = {"Bucket": get_bucket_name(), "Key": key, "ResponseContentDisposition": "inline"}
+    if content_type:
+        params["ResponseContentType"] = content_type
+    return get_s3_client().generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+def read_object(key):
+    with profiling.external_call("s3"):
+        return get_s3_client().get_object(Bucket=get_bucket_name(), Key=key)["Body"].read()
+
+def head_object(key):
+    with profiling.external_call("s3"):
+        return get_s3_client().head_object(Bucket=get_bucket_name(), Key=key)
+
+def upload_file(path, key, content_type=None):
+    extra = {"ContentType": content_type} if content_type else None
+    with profiling.external_call("s3"):
+        get_s3_client().upload_file(path, get_bucket_name(), key, ExtraArgs=extra)
+
+def delete_objects(keys):
+    """
+    Deletes keys with one request per 1000 (the S3 limit). Returns {key: error}
+    for the keys that could not be deleted.
+    """
+    keys = list(dict.fromkeys(keys))
+    errors = {}
+    for i in range(0, len(keys), DELETE_BATCH_SIZE):
+        with profiling.external_call("s3"):
+            response = get_s3_client().delete_objects(Bucket=get_bucket_name(), Delete={
+                "Objects": [{"Key": key} for key in keys[i:i + DELETE_BATCH_SIZE]],
+                "Quiet": True
+            })
+        for error in response.get("Errors", []):
+            errors[error["Key"]] = error.get("Message") or error.get("Code")
+    return errors
+
+def archive_object(key, storage_class):
+    """
+    Moves an object to a colder storage class by copying it onto itself.
+    Returns False when there is no such object.
+    """
+    from botocore.exceptions import ClientError
+    try:
+        with profiling.external_call("s3"):
+            get_s3_client().copy_object(Bucket=get_bucket_name(), Key=key, StorageClass=storage_class,
+                CopySource={"Bucket": get_bucket_name(), "Key": key}, MetadataDirective="COPY")
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return False
+        raise
+    return True
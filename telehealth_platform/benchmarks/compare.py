@@ -0,0 +1,109 @@
+"""
+Compares two saved benchmark runs and flags regressions.
+
+    python -m telehealth_platform.benchmarks.compare hot_paths
+    python -m telehealth_platform.benchmarks.compare old.json new.json --threshold 0.1
+
+With a benchmark name, the two newest runs under benchmark-results/<name>/
+are compared. Exits 1 when a metric got worse by more than the threshold.
+Only compare runs from the same machine.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from telehealth_platform.benchmarks import harness
+
+DEFAULT_THRESHOLD = 0.10
+# Throughput: higher is better. Everything else (latency, queries, lag) is lower is better.
+HIGHER_IS_BETTER = ("per_second", "per_minute", "succeeded")
+# Counts describing the run rather than measuring it
+IGNORED = ("iterations", "requests", "consults", "patients", "slots", "sessions", "concurrency", "wall_seconds")
+
+def flatten(results, prefix=""):
+    """
+    {"a": {"b": 1}} -> {"a.b": 1}, numeric values only.
+    """
+    flat = {}
+    for key, value in (results or {}).items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def is_higher_better(name):
+    return any(marker in name for marker in HIGHER_IS_BETTER)
+
+def is_ignored(name):
+    last = name.rsplit(".", 1)[-1]
+    return last in IGNORED or ".statuses." in name
+
+def compare(old, new, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns one row per metric present in both runs, with the relative change
+    and whether it is a regression or an improvement beyond the threshold.
+    """
+    old_values, new_values = flatten(old), flatten(new)
+    rows = []
+    for name in sorted(set(old_values) & set(new_values)):
+        if is_ignored(name):
+            continue
+        before, after = old_values[name], new_values[name]
+        if not before:
+            continue
+        change = (after - before) / abs(before)
+        worse = -change if is_higher_better(name) else change
+        rows.append({
+            "metric": name,
+            "old": before,
+            "new": after,
+            "change": round(change, 4),
+            "verdict": "regression" if worse > threshold else "improvement" if worse < -threshold else ""
+        })
+    return rows
+
+def get_latest_runs(name, output_dir=None):
+    paths = sorted(glob.glob(os.path.join(output_dir or harness.DEFAULT_RESULTS_DIR, name, "*.json")))
+    if len(paths) < 2:
+        raise SystemExit(f"Need two saved runs of {name}, found {len(paths)}")
+    return paths[-2:]
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("runs", nargs="+", help="A benchmark name, or the old and new result files")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative change to flag")
+    parser.add_argument("--output-dir", default=harness.DEFAULT_RESULTS_DIR)
+    parser.add_argument("--all", action="store_true", help="Show unchanged metrics too")
+    args = parser.parse_args(argv)
+
+    if len(args.runs) == 1:
+        old_path, new_path = get_latest_runs(args.runs[0], args.output_dir)
+    elif len(args.runs) == 2:
+        old_path, new_path = args.runs
+    else:
+        parser.error("Pass a benchmark name or exactly two result files")
+
+    old, new = load(old_path), load(new_path)
+    print(f"old: {old_path} ({old.get('git_commit')}, {old.get('created_at')})")
+    print(f"new: {new_path} ({new.get('git_commit')}, {new.get('created_at')})")
+    if old.get("machine") != new.get("machine"):
+        print(f"warning: runs are from different machines ({old.get('machine')} vs {new.get('machine')})")
+
+    rows = compare(old.get("results"), new.get("results"), args.threshold)
+    for row in rows:
+        if row["verdict"] or args.all:
+            print(f"{row['metric']:<60} {row['old']:>12} -> {row['new']:>12} {row['change']:+8.1%} {row['verdict']}")
+
+    regressions = [row for row in rows if row["verdict"] == "regression"]
+    print(f"{len(rows)} metrics compared, {len(regressions)} regressions beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Shared timing and result storage for the benchmark suite.
+
+Every suite run can be saved as one JSON file under benchmark-results/<name>/
+(or --output-dir), named by time and git commit, so runs on the same machine
+can be compared across commits with telehealth_platform.benchmarks.compare.
+"""
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+DEFAULT_RESULTS_DIR = "benchmark-results"
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def summarize(latencies, unit=1e6):
+    """
+    mean/p50/p95/p99 of latencies in seconds, scaled by `unit` (microseconds by default).
+    """
+    latencies = sorted(latencies)
+    if not latencies:
+        return None
+    return {
+        "mean": round(statistics.mean(latencies) * unit, 1),
+        "p50": round(percentile(latencies, 0.5) * unit, 1),
+        "p95": round(percentile(latencies, 0.95) * unit, 1),
+        "p99": round(percentile(latencies, 0.99) * unit, 1)
+    }
+
+def measure(fn, iterations=1000, warmup=50, count_queries=False):
+    """
+    Calls `fn()` `iterations` times after a warmup and returns latency in
+    microseconds, calls per second and, inside a site with count_queries,
+    the database queries per call.
+    """
+    for _i in range(warmup):
+        fn()
+
+    profile = None
+    if count_queries:
+        import frappe
+        from telehealth_platform.telehealth.utils import profiling
+        profile = profiling.RequestProfile()
+        db = frappe.local.db
+        db.sql = profiling.timed_sql(db.sql, profile)
+
+    latencies = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _i in range(iterations):
+            call_started = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - call_started)
+        wall = time.perf_counter() - started
+    finally:
+        if gc_enabled:
+            gc.enable()
+        if profile:
+            del db.sql
+
+    result = {
+        "iterations": iterations,
+        "latency_us": summarize(latencies),
+        "calls_per_second": round(iterations / wall, 1) if wall else None
+    }
+    if profile:
+        result["queries_per_call"] = round(profile.db_queries / float(iterations), 2)
+        result["db_time_share"] = round(profile.db_seconds / wall, 3) if wall else None
+    return result
+
+def get_git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(__file__), timeout=10).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+            text=True, cwd=os.path.dirname(__file__), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None, None
+    return commit or None, bool(dirty)
+
+def save_result(name, params, results, output_dir=None):
+    """
+    Writes a run to <output_dir>/<name>/<timestamp>-<commit>.json and returns the path.
+    """
+    commit, dirty = get_git_commit()
+    created = datetime.datetime.now()
+    document = {
+        "benchmark": name,
+        "created_at": created.isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "git_dirty": dirty,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "params": params,
+        "results": results
+    }
+    directory = os.path.join(output_dir or DEFAULT_RESULTS_DIR, name)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{created.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}{'-dirty' if dirty else ''}.json")
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return path
+
+def report(name, params, results, save=False, output_dir=None):
+    """
+    Prints the results as JSON and, with `save`, stores them for comparison.
+    """
+    print(json.dumps(results, indent=2))
+    if save:
+        print(f"Saved to {save_result(name, params, results, output_dir)}")
+    return results
+
+def add_save_arguments(parser):
+    parser.add_argument("--save", action="store_true", help="Store the results for compare")
+    parser.add_argument("--output-dir", default=DEFAULT_RESULTS_DIR)
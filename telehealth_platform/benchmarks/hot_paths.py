@@ -0,0 +1,112 @@
+"""
+Micro-benchmarks of hot request paths: router dispatch, format_appointment,
+LiveKit token generation and get_availability.
+
+Router dispatch and format_appointment without payment links need no site:
+    python -m telehealth_platform.benchmarks.hot_paths --iterations 20000 --save
+
+Inside a site every benchmark runs, with database queries counted per call
+(seed data with telehealth_platform.benchmarks.synthetic.seed_site first):
+    bench --site <site> execute telehealth_platform.benchmarks.hot_paths.run \
+        --kwargs "{'iterations': 2000, 'save': True}"
+"""
+import argparse
+import datetime
+import itertools
+from telehealth_platform.benchmarks import harness, synthetic
+
+# Paths in the mix a mobile client sends, exact routes and parameterised ones
+DISPATCH_PATHS = [
+    ("GET", "appointments"),
+    ("GET", "patients/profile"),
+    ("GET", "doctors/search"),
+    ("GET", "doctors/BENCH-HP-00001/availability"),
+    ("GET", "video-session/BENCH-VS-1/token"),
+    ("POST", "transcription/chunk"),
+    ("GET", "clinical-notes/BENCH-VS-1"),
+    ("PUT", "patients/medical-records/uploads/abc123"),
+    ("GET", "appointments/BENCH-APT-0000001"),
+    ("GET", "no/such/route"),
+]
+
+def has_site():
+    try:
+        import frappe
+    except ImportError:
+        return False
+    return bool(getattr(frappe.local, "site", None) and getattr(frappe.local, "db", None))
+
+def bench_router_dispatch(iterations):
+    from telehealth_platform.telehealth.api.router import resolve_route
+    paths = itertools.cycle(DISPATCH_PATHS)
+    return harness.measure(lambda: resolve_route(*next(paths)), iterations)
+
+def bench_format_appointment(iterations, site):
+    from telehealth_platform.telehealth.api.appointment import format_appointment
+    practitioners = synthetic.make_practitioners(10)
+    patients = synthetic.make_patients(100)
+    rows = synthetic.make_appointments(practitioners, patients, days=14)
+    results = {}
+
+    cycle = itertools.cycle(rows)
+    results["without_payment_request"] = harness.measure(lambda: format_appointment(next(cycle)), iterations,
+        count_queries=site)
+    if site:
+        # Every row with a payment link costs a Payment Request lookup
+        linked = synthetic.make_appointments(practitioners, patients, days=14, with_payment_requests=True)
+        cycle = itertools.cycle(linked)
+        results["with_payment_request"] = harness.measure(lambda: format_appointment(next(cycle)),
+            max(iterations // 10, 1), count_queries=True)
+    return results
+
+def bench_token_generation(iterations):
+    import frappe
+    from telehealth_platform.telehealth.utils import livekit_utils
+    conf = frappe.local.conf
+    added = {k: v for k, v in (("livekit_api_key", "bench-key"), ("livekit_api_secret", "bench-secret" * 4))
+        if not conf.get(k)}
+    conf.update(added)
+    try:
+        counter = itertools.count()
+        return harness.measure(lambda: livekit_utils.generate_token(f"room-bench-{next(counter) % 100}",
+            "bench-patient-1@bench.invalid", name="Bench Patient", metadata='{"role": "patient"}'), iterations)
+    finally:
+        for key in added:
+            conf.pop(key, None)
+
+def bench_get_availability(iterations):
+    import frappe
+    from telehealth_platform.telehealth.api.doctor import get_availability
+    practitioners = frappe.get_all("Healthcare Practitioner", filters={"name": ["like", "BENCH-HP-%"]},
+        pluck="name", limit=20) or frappe.get_all("Healthcare Practitioner", pluck="name", limit=20)
+    if not practitioners:
+        return {"skipped": "no Healthcare Practitioner on this site"}
+    cycle = itertools.cycle(practitioners)
+    four_weeks = str(datetime.date.today() + datetime.timedelta(weeks=4))
+    return {
+        "one_week": harness.measure(lambda: get_availability(next(cycle)), iterations, warmup=10,
+            count_queries=True),
+        "four_weeks": harness.measure(lambda: get_availability(next(cycle), end_date=four_weeks),
+            max(iterations // 4, 1), warmup=5, count_queries=True)
+    }
+
+def run(iterations=5000, save=False, output_dir=None):
+    iterations = int(iterations)
+    site = has_site()
+    results = {
+        "router_dispatch": bench_router_dispatch(iterations),
+        "format_appointment": bench_format_appointment(iterations, site)
+    }
+    if site:
+        results["token_generation"] = bench_token_generation(max(iterations // 5, 1))
+        results["get_availability"] = bench_get_availability(max(iterations // 20, 1))
+    else:
+        results["skipped"] = ["token_generation", "get_availability (run inside a site)"]
+    return harness.report("hot_paths", {"iterations": iterations, "site": site}, results, save, output_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    harness.add_save_arguments(parser)
+    args = parser.parse_args()
+    run(iterations=args.iterations, save=args.save, output_dir=args.output_dir)
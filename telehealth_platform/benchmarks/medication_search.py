@@ -0,0 +1,115 @@
+"""
+Autocomplete latency of the medication index against a substring scan.
+
+    python -m telehealth_platform.benchmarks.medication_search --entries 100000
+
+The formulary is synthetic ("<generic> <strength> <form>" with a generic name
+per entry). Queries replay autocomplete keystrokes: every prefix of 3+ characters
+of a generic name, plus whole-word and misspelt queries. The baseline is a
+Python substring scan, the in-memory equivalent of `name like '%text%'`.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from telehealth_platform.telehealth.utils.text_index import TextIndex
+
+SYLLABLES = ["a", "ab", "ce", "cil", "da", "dro", "fen", "ga", "im", "la", "lo", "mab", "met", "mi",
+    "na", "nol", "o", "pam", "pra", "ri", "sar", "tan", "te", "tin", "vas", "xa", "zep", "zol"]
+STEMS = ["cillin", "pril", "sartan", "statin", "olol", "azole", "prazole", "mab", "tinib", "vir",
+    "mycin", "dipine", "afil", "oxacin", "parin", "triptan"]
+STRENGTHS = ["5 mg", "10 mg", "20 mg", "25 mg", "50 mg", "100 mg", "250 mg", "500 mg", "1 g", "40 mg/ml"]
+FORMS = ["Tablet", "Capsule", "Oral Suspension", "Injection", "Cream", "Extended Release Tablet",
+    "Inhaler", "Oral Solution", "Patch", "Eye Drops"]
+
+def make_formulary(entries, seed=0):
+    """
+    {name: generic_name}: ~entries / 10 generics, each in several strengths and forms.
+    """
+    rng = random.Random(seed)
+    formulary, generics = {}, set()
+    while len(formulary) < entries:
+        generic = "".join(rng.choice(SYLLABLES) for _i in range(rng.randint(1, 3))) + rng.choice(STEMS)
+        if generic in generics:
+            continue
+        generics.add(generic)
+        for strength in rng.sample(STRENGTHS, 5):
+            for form in rng.sample(FORMS, 2):
+                formulary[f"{generic.capitalize()} {strength} {form}"] = generic
+    return dict(list(formulary.items())[:entries])
+
+def make_queries(formulary, count, seed=1):
+    rng = random.Random(seed)
+    generics = sorted(set(formulary.values()))
+    queries = []
+    while len(queries) < count:
+        generic = rng.choice(generics)
+        kind = rng.random()
+        if kind < 0.6:
+            # Keystrokes of an autocomplete
+            queries.extend(generic[:n] for n in range(3, len(generic) + 1))
+        elif kind < 0.8:
+            queries.append(f"{generic} {rng.choice(STRENGTHS).split()[0]}")
+        else:
+            i = rng.randrange(1, len(generic) - 1)
+            queries.append(generic[:i] + generic[i + 1:])
+    return queries[:count]
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        "mean": round(statistics.mean(latencies), 1),
+        "p50": round(percentile(latencies, 0.5), 1),
+        "p95": round(percentile(latencies, 0.95), 1),
+        "p99": round(percentile(latencies, 0.99), 1)
+    }
+
+def run(entries=100000, queries=5000, limit=20, baseline_queries=200):
+    formulary = make_formulary(int(entries))
+    started = time.perf_counter()
+    index = TextIndex()
+    for name, generic in formulary.items():
+        index.add(name, [name, generic])
+    index.ensure_sorted()
+    build_seconds = time.perf_counter() - started
+
+    samples = make_queries(formulary, int(queries))
+    latencies, prefix_hits = [], 0
+    for query in samples:
+        started = time.perf_counter()
+        results = index.search(query, limit=int(limit))
+        latencies.append((time.perf_counter() - started) * 1e6)
+        if results and results[0][0].lower().startswith(query.lower()):
+            prefix_hits += 1
+
+    names = [name.lower() for name in formulary]
+    baseline = []
+    for query in samples[:int(baseline_queries)]:
+        started = time.perf_counter()
+        needle = query.lower()
+        [name for name in names if needle in name][:int(limit)]
+        baseline.append((time.perf_counter() - started) * 1e6)
+
+    report = {
+        "entries": len(formulary),
+        "build_seconds": round(build_seconds, 3),
+        "queries": len(samples),
+        "limit": int(limit),
+        "top_result_is_prefix_match": round(prefix_hits / float(len(samples)), 4),
+        "index_latency_us": summarize(latencies),
+        "substring_scan_latency_us": summarize(baseline)
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    run(entries=args.entries, queries=args.queries, limit=args.limit)
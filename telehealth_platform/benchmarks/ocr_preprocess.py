@@ -0,0 +1,127 @@
+"""
+Payload size and OCR latency of raw vs normalized insurance card photos.
+
+Preprocessing only (no site needed):
+    python -m telehealth_platform.benchmarks.ocr_preprocess --samples 20
+    python -m telehealth_platform.benchmarks.ocr_preprocess --corpus ./cards
+
+End-to-end, against the configured OCR engine:
+    bench --site <site> execute telehealth_platform.benchmarks.ocr_preprocess.run \
+        --kwargs "{'samples': 10, 'engine': 'textract'}"
+"""
+import argparse
+import io
+import json
+import os
+import random
+import statistics
+import time
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from telehealth_platform.telehealth.utils import image_preprocess
+
+CARD_LINES = [
+    "Blue Shield of California",
+    "Member Name: JANE DOE",
+    "Member ID: XJK{0:09d}",
+    "Group: {1:08d}",
+    "Plan: PPO",
+    "RxBIN 610014  RxPCN CAL",
+    "Copay: PCP $20 / Specialist $40 / ER $150"
+]
+
+def make_sample_card(seed, size=(3024, 4032)):
+    """
+    Synthetic 12 MP phone photo: a skewed card with printed text on a textured table.
+    """
+    rng = random.Random(seed)
+    photo = Image.effect_noise(size, 40).convert("RGB")
+    photo = Image.blend(photo, Image.new("RGB", size, (120, 96, 70)), 0.6)
+
+    card = Image.new("RGB", (2200, 1390), (250, 250, 246))
+    draw = ImageDraw.Draw(card)
+    font = ImageFont.load_default(size=64)
+    draw.rectangle((0, 0, 2199, 1389), outline=(30, 60, 140), width=12)
+    for i, line in enumerate(CARD_LINES):
+        draw.text((90, 90 + i * 170), line.format(rng.randint(0, 10 ** 9), rng.randint(0, 10 ** 8)),
+            fill=(20, 20, 20), font=font)
+
+    card = card.rotate(rng.uniform(-6, 6), resample=Image.BICUBIC, expand=True, fillcolor=(0, 0, 0))
+    mask = Image.new("L", card.size, 0)
+    mask.paste(255, mask=card.convert("L").point(lambda p: 255 if p > 0 else 0))
+    offset = (rng.randint(100, size[0] - card.size[0] - 100), rng.randint(300, size[1] - card.size[1] - 300))
+    photo.paste(card, offset, mask.filter(ImageFilter.MinFilter(3)))
+
+    out = io.BytesIO()
+    photo.save(out, "JPEG", quality=95)
+    return out.getvalue()
+
+def load_corpus(corpus=None, samples=20):
+    if corpus:
+        names = sorted(n for n in os.listdir(corpus) if n.lower().endswith((".jpg", ".jpeg", ".png", ".heic")))
+        return [open(os.path.join(corpus, n), "rb").read() for n in names]
+    return [make_sample_card(seed) for seed in range(samples)]
+
+def time_ocr(adapter, content, repeat):
+    timings = []
+    for _i in range(repeat):
+        started = time.perf_counter()
+        adapter.extract_lines(content)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "mean": round(statistics.mean(values), 4),
+        "p50": round(values[len(values) // 2], 4),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+        "max": round(values[-1], 4)
+    }
+
+def run(corpus=None, samples=20, engine=None, max_side=image_preprocess.DEFAULT_MAX_SIDE, repeat=1):
+    """
+    Runs the benchmark and returns (and prints) a JSON-serialisable summary.
+    With `engine`, each image is also sent to OCR raw and normalized.
+    """
+    images = load_corpus(corpus, int(samples))
+    adapter = None
+    if engine:
+        from telehealth_platform.adapters.ocr_adapter import OCRAdapter
+        adapter = OCRAdapter(engine=engine)
+
+    original, normalized, preprocess, ocr_raw, ocr_normalized = [], [], [], [], []
+    for content in images:
+        started = time.perf_counter()
+        result, stats = image_preprocess.normalize_card_image(content, max_side=int(max_side))
+        preprocess.append(time.perf_counter() - started)
+        original.append(stats["original_bytes"])
+        normalized.append(stats["normalized_bytes"])
+
+        if adapter:
+            ocr_raw.append(time_ocr(adapter, content, int(repeat)))
+            # End to end: the normalized path pays for preprocessing too
+            ocr_normalized.append(preprocess[-1] + time_ocr(adapter, result, int(repeat)))
+
+    report = {
+        "images": len(images),
+        "max_side": int(max_side),
+        "bytes_original": summarize(original),
+        "bytes_normalized": summarize(normalized),
+        "size_reduction": round(1 - sum(normalized) / float(sum(original)), 4),
+        "preprocess_seconds": summarize(preprocess)
+    }
+    if adapter:
+        report["engine"] = engine
+        report["ocr_seconds_original"] = summarize(ocr_raw)
+        report["ocr_seconds_normalized"] = summarize(ocr_normalized)
+
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", help="Directory of card photos (default: synthetic cards)")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--max-side", type=int, default=image_preprocess.DEFAULT_MAX_SIDE)
+    args = parser.parse_args()
+    run(corpus=args.corpus, samples=args.samples, max_side=args.max_side)
@@ -0,0 +1,142 @@
+"""
+Throughput of the bulk patient import, plus a sample file.
+
+Parsing and validation only (no site; this is not the import rate):
+    python -m telehealth_platform.benchmarks.patient_import --rows 100000
+    python -m telehealth_platform.benchmarks.patient_import --rows 100000 --write patients.csv
+
+End to end, creating User, Customer and Patient for every row on a staging
+site (run workers for --workers > 1):
+    bench --site <site> execute telehealth_platform.benchmarks.patient_import.run \
+        --kwargs "{'rows': 5000, 'end_to_end': True, 'workers': 4}"
+
+The file is synthetic, with a share of bad and duplicate rows. End-to-end runs
+create @bench.invalid users with a per-run prefix; never run them in production.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from telehealth_platform.telehealth.utils import patient_import
+
+END_TO_END_TIMEOUT = 4 * 3600
+
+FIRST_NAMES = ["Amal", "Ben", "Chen", "Dana", "Eli", "Fatima", "Gus", "Hana", "Ivan", "Jade", "Kofi", "Lena"]
+LAST_NAMES = ["Ali", "Brown", "Cohen", "Diaz", "Evans", "Farah", "Garcia", "Haddad", "Ito", "Jones", "Khan"]
+GENDERS = ["Male", "Female", "F", "m", "Other", ""]
+
+def make_rows(rows, seed=0, bad_share=0.01, duplicate_share=0.01, domain="clinic.example", prefix="patient"):
+    rng = random.Random(seed)
+    for i in range(rows):
+        email = f"{prefix}{i}@{domain}"
+        if i and rng.random() < duplicate_share:
+            email = f"{prefix}{rng.randrange(i)}@{domain}"
+        row = {
+            "patient_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "email": email,
+            "phone": f"+1 (555) {rng.randrange(10 ** 7):07d}",
+            "date_of_birth": f"{rng.randint(1930, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "gender": rng.choice(GENDERS)
+        }
+        if rng.random() < bad_share:
+            row[rng.choice(["email", "date_of_birth"])] = "n/a"
+        yield row
+
+def write_file(rows, fmt):
+    out = io.StringIO()
+    columns = ["patient_name", "email", "phone", "date_of_birth", "gender"]
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            out.write(json.dumps(row) + "\n")
+    return out.getvalue().encode("utf-8")
+
+def run(rows=100000, fmt="csv", chunk_size=500, write=None, end_to_end=False, workers=1):
+    if end_to_end:
+        return run_end_to_end(int(rows), fmt, int(chunk_size), int(workers))
+    content = write_file(make_rows(int(rows)), fmt)
+    if write:
+        with open(write, "wb") as f:
+            f.write(content)
+
+    started = time.perf_counter()
+    seen, valid, rejected, batches = set(), 0, 0, 0
+    for batch in patient_import.iter_batches(patient_import.iter_rows(io.BytesIO(content), fmt), int(chunk_size)):
+        batch_valid, batch_errors = patient_import.validate_batch(batch, seen)
+        valid += len(batch_valid)
+        rejected += len(batch_errors)
+        batches += 1
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "rows": int(rows),
+        "format": fmt,
+        "file_bytes": len(content),
+        "valid": valid,
+        "rejected": rejected,
+        "batches": batches,
+        "parse_validate_seconds": round(elapsed, 3),
+        "parse_rows_per_second": round(int(rows) / elapsed),
+        # The import also issues one existing-User query and one commit per batch
+        "existing_user_queries": batches,
+        "commits": batches
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+def run_end_to_end(rows, fmt, chunk_size, workers):
+    """
+    Imports a generated file into the current site through run_import and
+    reports the real patients per second, waiting for background chunks.
+    """
+    import frappe
+    from telehealth_platform.telehealth.api import patient_import as importer
+
+    prefix = f"bench-import-{frappe.generate_hash(length=6)}-"
+    content = write_file(make_rows(rows, domain="bench.invalid", prefix=prefix), fmt)
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+
+    import_id = frappe.generate_hash(length=12)
+    started = time.perf_counter()
+    status = importer.run_import(import_id, path, fmt, workers=workers, chunk_size=chunk_size, remove_file=True)
+    deadline = time.monotonic() + END_TO_END_TIMEOUT
+    while status and status["status"] == "Running" and time.monotonic() < deadline:
+        time.sleep(1)
+        status = importer.get_import_progress(import_id)
+    elapsed = time.perf_counter() - started
+
+    status = status or {}
+    imported = status.get("imported", 0)
+    report = {
+        "rows": rows,
+        "format": fmt,
+        "workers": workers,
+        "chunk_size": chunk_size,
+        "status": status.get("status"),
+        "imported": imported,
+        "rejected": status.get("rejected", 0),
+        "seconds": round(elapsed, 1),
+        "patients_per_second": round(imported / elapsed, 1) if elapsed else None,
+        "projected_minutes_per_100k": round(100000 / (imported / elapsed) / 60, 1) if imported else None,
+        "email_prefix": prefix
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--format", choices=patient_import.FORMATS, default="csv")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--write", help="Also save the generated file here")
+    args = parser.parse_args()
+    run(rows=args.rows, fmt=args.format, chunk_size=args.chunk_size, write=args.write)
@@ -0,0 +1,119 @@
+"""
+Build time, lookup latency and accuracy of the payer text index.
+
+    python -m telehealth_platform.benchmarks.payer_index --payers 5000 --variants 10
+
+The directory is synthetic: every payer is indexed under its name plus
+`variants - 1` aliases, and looked up with OCR-style noise (suffixes, case,
+dropped and swapped letters, truncation).
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from telehealth_platform.telehealth.utils.text_index import TextIndex
+
+# Real payer names mix a distinctive brand with common words (states, "Health",
+# "Plan"); brands here are made up from syllables so every payer has one
+SYLLABLES = ["an", "ber", "ca", "del", "ex", "fi", "gen", "hal", "in", "jo", "ka", "lum", "mer", "no",
+    "or", "pa", "qui", "ren", "sa", "ta", "ul", "vi", "wes", "xa", "yor", "zen"]
+STATES = ["Alabama", "Arizona", "California", "Colorado", "Florida", "Georgia", "Illinois", "Indiana",
+    "Kansas", "Kentucky", "Maine", "Maryland", "Michigan", "Missouri", "Nevada", "New Jersey",
+    "New York", "Ohio", "Oregon", "Texas", "Utah", "Virginia", "Washington", "Wisconsin"]
+SUFFIXES = ["Health Plan", "Insurance Company", "Community Plan", "Medicare Plans", "Choice", "Select",
+    "Advantage", "Health Options", "Benefit Administrators", "Family Care", "Blue Cross", "Blue Shield"]
+ALIAS_FORMS = ["{brand} {state}", "{brand} of {state}", "{brand} {suffix}", "{brand} {state} {suffix}",
+    "{state} {brand}", "{brand} {suffix} {state}", "{brand} Health", "{brand} Inc",
+    "{brand} {suffix} Inc", "{brand} ({state})"]
+
+def make_directory(payers, variants, seed=0):
+    """
+    {payer_id: [canonical name, alias, ...]} with payers * variants texts in total.
+    """
+    rng = random.Random(seed)
+    directory, brands = {}, set()
+    while len(directory) < payers:
+        brand = "".join(rng.choice(SYLLABLES) for _i in range(rng.randint(2, 4))).capitalize()
+        if brand in brands:
+            continue
+        brands.add(brand)
+        state, suffix = rng.choice(STATES), rng.choice(SUFFIXES)
+        texts = [f"{brand} {suffix} of {state}"] + [form.format(brand=brand, state=state, suffix=suffix)
+            for form in ALIAS_FORMS[:variants - 1]]
+        directory[f"PAYER-{len(directory):05d}"] = texts
+    return directory
+
+def add_noise(text, rng):
+    choice = rng.random()
+    if choice < 0.2:
+        return f"{text} (OCR)"
+    if choice < 0.4:
+        return text.upper()
+    if choice < 0.6 and len(text) > 6:
+        i = rng.randrange(1, len(text) - 1)
+        return text[:i] + text[i + 1:]
+    if choice < 0.8 and len(text) > 6:
+        i = rng.randrange(1, len(text) - 2)
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    return text[:max(4, int(len(text) * 0.7))]
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def measure(samples, search):
+    latencies, correct = [], 0
+    for payer_id, query in samples:
+        started = time.perf_counter()
+        results = search(query)
+        latencies.append((time.perf_counter() - started) * 1e6)
+        if results and results[0][0] == payer_id:
+            correct += 1
+
+    latencies.sort()
+    return {
+        "top1_accuracy": round(correct / float(len(latencies)), 4),
+        "latency_us": {
+            "mean": round(statistics.mean(latencies), 1),
+            "p50": round(percentile(latencies, 0.5), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "p99": round(percentile(latencies, 0.99), 1)
+        }
+    }
+
+def run(payers=5000, variants=10, queries=5000, seed=0):
+    directory = make_directory(int(payers), int(variants), seed)
+    started = time.perf_counter()
+    index = TextIndex()
+    for payer_id, texts in directory.items():
+        index.add(payer_id, texts)
+    index.ensure_sorted()
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(seed + 1)
+    payer_ids = list(directory)
+    samples = []
+    for _i in range(int(queries)):
+        payer_id = rng.choice(payer_ids)
+        samples.append((payer_id, add_noise(rng.choice(directory[payer_id]), rng)))
+
+    report = {
+        "payers": len(directory),
+        "indexed_texts": sum(len(texts) for texts in directory.values()),
+        "build_seconds": round(build_seconds, 3),
+        "queries": len(samples),
+        # What OCR normalization does: the single best payer
+        "resolve": measure(samples, lambda query: index.search(query, limit=1)),
+        # Payer autocomplete
+        "search_top10": measure(samples, lambda query: index.search(query, limit=10))
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payers", type=int, default=5000)
+    parser.add_argument("--variants", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+    run(payers=args.payers, variants=args.variants, queries=args.queries)
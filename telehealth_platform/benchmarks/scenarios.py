@@ -0,0 +1,257 @@
+"""
+Scenario load tests against a running staging site, through the /api/v1 router.
+
+    python -m telehealth_platform.benchmarks.scenarios consult-day --url http://localhost:8000 \
+        --fixture bench-fixture.json --consults 50 --concurrency 10 --save
+    python -m telehealth_platform.benchmarks.scenarios booking-rush --url ... --patients 50 --slots 5
+    python -m telehealth_platform.benchmarks.scenarios transcript-stream --url ... --sessions 20 --rate 2
+
+The fixture (logins, practitioners, appointments) comes from
+telehealth_platform.benchmarks.synthetic.seed_site. Every scenario writes to
+the site: video sessions, transcript chunks and appointments. Latency is
+measured client side per step; statuses are counted per step.
+
+- consult-day: patients and practitioners go through a consult each: list
+  appointments, open the video session, fetch a token, stream the transcript,
+  read the notes and end the session.
+- booking-rush: patients race for the same few slots of one practitioner;
+  reports how many bookings succeeded per slot (more than one is a double booking).
+- transcript-stream: agents post transcript chunks to many sessions at a fixed
+  rate; reports the achieved rate and how far posting fell behind schedule.
+"""
+import argparse
+import http.cookiejar
+import json
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from telehealth_platform.benchmarks import harness, synthetic
+
+ROUTER_PATH = "/api/method/telehealth_platform.telehealth.api.router.handle?path="
+
+class Client:
+    """
+    One logged-in user (session cookie) calling the API.
+    """
+    def __init__(self, url, stats, timeout=60):
+        self.url = url.rstrip("/")
+        self.stats = stats
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def login(self, user, password):
+        status, _body = self.request("POST", "/api/method/login", {"usr": user, "pwd": password}, step="login")
+        if status != 200:
+            raise RuntimeError(f"Login failed for {user}: {status}")
+        return self
+
+    def call(self, method, path, payload=None, step=None):
+        return self.request(method, ROUTER_PATH + urllib.parse.quote(path, safe="/"), payload, step or path)
+
+    def request(self, method, path, payload=None, step=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+            headers={"Accept": "application/json", "Content-Type": "application/json"})
+        started = time.perf_counter()
+        body = None
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, TimeoutError):
+            status = "error"
+        self.stats.add(step, status, time.perf_counter() - started)
+        try:
+            return status, json.loads(body).get("message") if body else None
+        except ValueError:
+            return status, None
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.steps = {}
+
+    def add(self, step, status, elapsed):
+        with self.lock:
+            entry = self.steps.setdefault(step, {"statuses": {}, "latencies": []})
+            entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+            entry["latencies"].append(elapsed)
+
+    def summary(self):
+        return {step: {
+            "requests": len(entry["latencies"]),
+            "statuses": entry["statuses"],
+            "latency_ms": harness.summarize(entry["latencies"], unit=1e3)
+        } for step, entry in sorted(self.steps.items())}
+
+def load_fixture(path):
+    with open(path) as f:
+        return json.load(f)
+
+def login_all(url, stats, users, password, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return dict(zip(users, pool.map(lambda user: Client(url, stats).login(user, password), users)))
+
+def consult_day(url, fixture, consults=50, concurrency=10, chunks=30):
+    fixture = load_fixture(fixture)
+    stats = Stats()
+    practitioners = {p["name"]: p["user"] for p in fixture["practitioners"]}
+    appointments = fixture["appointments"][:int(consults)]
+    patient_users = fixture["patients"]
+    clients = login_all(url, stats, sorted(set(practitioners.values())) + patient_users, fixture["password"],
+        int(concurrency))
+    transcript = synthetic.make_transcript("", int(chunks))
+
+    def consult(i):
+        appointment = appointments[i]
+        doctor = clients[practitioners[appointment["practitioner"]]]
+        patient = clients[patient_users[i % len(patient_users)]]
+
+        patient.call("GET", "appointments")
+        patient.call("GET", "patients/profile")
+        doctor.call("GET", "appointments")
+        status, session = patient.call("POST", "video-session/create", {"appointment_id": appointment["name"]})
+        if status != 200 or not session:
+            return
+        session_id = session["session_id"]
+        doctor.call("GET", f"video-session/{session_id}/token", step="video-session/{id}/token")
+        for chunk in transcript:
+            doctor.call("POST", "transcription/chunk", {"session_id": session_id, "speaker": chunk["speaker"],
+                "text": chunk["text"], "is_final": 1})
+        doctor.call("GET", f"clinical-notes/{session_id}", step="clinical-notes/{id}")
+        doctor.call("POST", "video-session/end", {"id": session_id})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=int(concurrency)) as pool:
+        list(pool.map(consult, range(len(appointments))))
+    wall = time.perf_counter() - started
+    return {
+        "consults": len(appointments),
+        "concurrency": int(concurrency),
+        "wall_seconds": round(wall, 2),
+        "consults_per_minute": round(len(appointments) / wall * 60, 1) if wall else None,
+        "steps": stats.summary()
+    }
+
+def booking_rush(url, fixture, patients=50, slots=5, practitioner=None):
+    fixture = load_fixture(fixture)
+    stats = Stats()
+    users = fixture["patients"][:int(patients)]
+    practitioner = practitioner or fixture["practitioners"][-1]["name"]
+    clients = login_all(url, stats, users, fixture["password"], len(users))
+
+    # Everyone reads the same availability, then goes for the first open slots
+    status, availability = clients[users[0]].call("GET", f"doctors/{practitioner}/availability",
+        step="doctors/{id}/availability")
+    open_slots = [s for s in (availability if isinstance(availability, list) else []) if s.get("status") == "Available"][:int(slots)]
+    if not open_slots:
+        return {"error": f"No open slots for {practitioner} (status {status})"}
+
+    booked = {}
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(users))
+
+    def book(i):
+        client = clients[users[i]]
+        client.call("GET", "doctors/search")
+        client.call("GET", f"doctors/{practitioner}/availability", step="doctors/{id}/availability")
+        slot = open_slots[i % len(open_slots)]
+        barrier.wait()
+        status, _body = client.call("POST", "appointments", {"doctor_id": practitioner,
+            "scheduled_time": slot["start_time"], "reason": "Benchmark booking rush"})
+        if status in (200, 201):
+            with lock:
+                booked[slot["start_time"]] = booked.get(slot["start_time"], 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(users)) as pool:
+        list(pool.map(book, range(len(users))))
+    wall = time.perf_counter() - started
+    return {
+        "patients": len(users),
+        "slots": len(open_slots),
+        "practitioner": practitioner,
+        "wall_seconds": round(wall, 2),
+        "bookings_succeeded": sum(booked.values()),
+        "double_booked_slots": sum(1 for count in booked.values() if count > 1),
+        "steps": stats.summary()
+    }
+
+def transcript_stream(url, fixture, sessions=20, rate=2.0, duration=60):
+    fixture = load_fixture(fixture)
+    stats = Stats()
+    practitioners = fixture["practitioners"]
+    clients = login_all(url, stats, [p["user"] for p in practitioners], fixture["password"], 10)
+
+    streams = []
+    for i, appointment in enumerate(fixture["appointments"][:int(sessions)]):
+        client = clients[practitioners[i % len(practitioners)]["user"]]
+        status, session = client.call("POST", "video-session/create", {"appointment_id": appointment["name"]})
+        if status == 200 and session:
+            streams.append((client, session["session_id"]))
+    if not streams:
+        return {"error": "Could not open any video session"}
+
+    interval = 1.0 / float(rate)
+    lags = []
+    lock = threading.Lock()
+
+    def stream(args):
+        client, session_id = args
+        transcript = synthetic.make_transcript(session_id, int(float(rate) * int(duration)))
+        started = time.perf_counter()
+        for i, chunk in enumerate(transcript):
+            due = started + i * interval
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            client.call("POST", "transcription/chunk", {"session_id": session_id, "speaker": chunk["speaker"],
+                "text": chunk["text"], "is_final": 1})
+            with lock:
+                lags.append(max(time.perf_counter() - due - interval, 0))
+        client.call("POST", "video-session/end", {"id": session_id})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(streams)) as pool:
+        list(pool.map(stream, streams))
+    wall = time.perf_counter() - started
+    chunks = stats.steps.get("transcription/chunk", {}).get("latencies", [])
+    return {
+        "sessions": len(streams),
+        "target_chunks_per_second": round(len(streams) * float(rate), 1),
+        "achieved_chunks_per_second": round(len(chunks) / wall, 1) if wall else None,
+        "schedule_lag_ms": harness.summarize(lags, unit=1e3),
+        "steps": stats.summary()
+    }
+
+SCENARIOS = {
+    "consult-day": consult_day,
+    "booking-rush": booking_rush,
+    "transcript-stream": transcript_stream,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scenario", choices=SCENARIOS)
+    parser.add_argument("--url", required=True, help="Site base URL, e.g. http://localhost:8000")
+    parser.add_argument("--fixture", default="bench-fixture.json")
+    parser.add_argument("--consults", type=int, help="consult-day: consults to run")
+    parser.add_argument("--concurrency", type=int, help="consult-day: consults at once")
+    parser.add_argument("--chunks", type=int, help="consult-day: transcript chunks per consult")
+    parser.add_argument("--patients", type=int, help="booking-rush: patients racing")
+    parser.add_argument("--slots", type=int, help="booking-rush: slots they race for")
+    parser.add_argument("--sessions", type=int, help="transcript-stream: concurrent sessions")
+    parser.add_argument("--rate", type=float, help="transcript-stream: chunks per second per session")
+    parser.add_argument("--duration", type=int, help="transcript-stream: seconds to stream")
+    harness.add_save_arguments(parser)
+    args = parser.parse_args()
+
+    options = {k: v for k, v in vars(args).items()
+        if v is not None and k not in ("scenario", "url", "fixture", "save", "output_dir")}
+    results = SCENARIOS[args.scenario](args.url, args.fixture, **options)
+    harness.report(f"scenario-{args.scenario}", dict(options, url=args.url), results, args.save, args.output_dir)
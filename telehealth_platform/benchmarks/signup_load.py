@@ -0,0 +1,94 @@
+"""
+Signup load test: registrations per second against a running site.
+
+    python -m telehealth_platform.benchmarks.signup_load --url http://localhost:8000 \
+        --registrations 500 --concurrency 20
+
+Each registration is one POST /api/v1 patients/register with a unique email,
+sent through the router like the mobile app does. Run it against a staging
+site: every request creates a real User and Patient (and, in the background,
+a Customer). Latency is measured client side; failures are counted by status.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+REGISTER_PATH = "/api/method/telehealth_platform.telehealth.api.router.handle?path=patients/register"
+
+def make_payload(run_id, i):
+    return {
+        "patient_name": f"Load Test {run_id} {i}",
+        "email": f"signup-{run_id}-{i}@loadtest.invalid",
+        "phone": f"+1555{i:07d}",
+        "date_of_birth": "1990-01-01",
+        "password": f"Lt-{run_id}-{i}-pass!",
+        "gender": "Other"
+    }
+
+def register(url, payload, timeout):
+    data = urllib.parse.urlencode(payload).encode("utf-8")
+    request = urllib.request.Request(url + REGISTER_PATH, data=data, method="POST",
+        headers={"Accept": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, TimeoutError):
+        status = "error"
+    return status, time.perf_counter() - started
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def run(url, registrations=500, concurrency=20, timeout=60):
+    run_id = str(int(time.time()))
+    statuses, latencies = {}, []
+    lock = threading.Lock()
+
+    def task(i):
+        status, elapsed = register(url.rstrip("/"), make_payload(run_id, i), timeout)
+        with lock:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 201:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=int(concurrency)) as pool:
+        list(pool.map(task, range(int(registrations))))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    report = {
+        "registrations": int(registrations),
+        "concurrency": int(concurrency),
+        "succeeded": len(latencies),
+        "statuses": statuses,
+        "wall_seconds": round(wall, 2),
+        "registrations_per_second": round(len(latencies) / wall, 2) if wall else None,
+        "latency_seconds": {
+            "mean": round(statistics.mean(latencies), 4),
+            "p50": round(percentile(latencies, 0.5), 4),
+            "p95": round(percentile(latencies, 0.95), 4),
+            "p99": round(percentile(latencies, 0.99), 4)
+        } if latencies else None
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", required=True, help="Site base URL, e.g. http://localhost:8000")
+    parser.add_argument("--registrations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=int, default=60)
+    args = parser.parse_args()
+    run(args.url, registrations=args.registrations, concurrency=args.concurrency, timeout=args.timeout)
@@ -0,0 +1,231 @@
+"""
+Synthetic data for the benchmark suite: practitioners, patients, appointments,
+transcripts and PHI access logs at a configurable scale.
+
+The generators are deterministic (seeded) and database free; the micro
+benchmarks use them directly. seed_site writes the same data to a staging
+site for the scenario load tests and saves the logins they use:
+
+    bench --site <site> execute telehealth_platform.benchmarks.synthetic.seed_site \
+        --kwargs "{'scale': 'small', 'fixture': '/tmp/bench-fixture.json'}"
+
+Seeded records use the BENCH- / @bench.invalid prefixes so they are easy to
+find and remove. Never run it against a production site.
+"""
+import datetime
+import json
+import random
+
+SCALES = {
+    "small": {"practitioners": 20, "patients": 500, "days": 14, "audit_logs": 50000, "chunks_per_session": 200},
+    "medium": {"practitioners": 100, "patients": 5000, "days": 30, "audit_logs": 500000, "chunks_per_session": 400},
+    "large": {"practitioners": 500, "patients": 50000, "days": 90, "audit_logs": 5000000, "chunks_per_session": 800},
+}
+SLOTS_PER_DAY = 16
+BOOKED_SHARE = 0.6
+PASSWORD = "Bench-Load-Test-1!"
+DEPARTMENTS = ["General Practice", "Cardiology", "Dermatology", "Pediatrics", "Psychiatry", "Endocrinology"]
+FIRST_NAMES = ["Amal", "Ben", "Chen", "Dana", "Eli", "Fatima", "Gus", "Hana", "Ivan", "Jade", "Kofi", "Lena",
+    "Mona", "Nils", "Omar", "Priya", "Quinn", "Rosa", "Sami", "Tara"]
+LAST_NAMES = ["Ali", "Brown", "Cohen", "Diaz", "Evans", "Farah", "Garcia", "Haddad", "Ito", "Jones", "Khan",
+    "Lopez", "Mensah", "Novak", "Okafor", "Park", "Rossi", "Singh"]
+STATUSES = ["Scheduled", "Scheduled", "Closed", "Closed", "Closed", "Cancelled"]
+PHI_ACTIONS = ["VIEW_PHI", "VIEW_PHI", "VIEW_PHI", "UPDATE_PHI", "LOGIN", "LOGOUT", "EXPORT_DATA"]
+RESOURCE_TYPES = ["Patient", "Patient Encounter", "Medication Request", "Clinical Note AI", "Video Recording"]
+# Consultation phrases, so transcripts have clinical vocabulary and realistic length
+PATIENT_LINES = [
+    "I've had a headache for about three days now.",
+    "The pain gets worse in the evening, especially after work.",
+    "I'm currently taking lisinopril 10 mg once a day.",
+    "I'm allergic to penicillin, it gave me a rash.",
+    "I haven't had any fever, but I feel tired all the time.",
+    "My sleep has been poor for the last couple of weeks.",
+]
+DOCTOR_LINES = [
+    "Can you describe where exactly the pain is located?",
+    "Any nausea, vomiting or sensitivity to light?",
+    "Let's check your blood pressure readings from this week.",
+    "I'd like to order a basic metabolic panel and a CBC.",
+    "We'll start ibuprofen 400 mg as needed, no more than three times a day.",
+    "Please follow up in two weeks, or sooner if symptoms worsen.",
+]
+
+def get_scale(scale="small", **overrides):
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale {scale}, expected one of {', '.join(SCALES)}")
+    return dict(SCALES[scale], **{k: v for k, v in overrides.items() if v is not None})
+
+def make_practitioners(count, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "name": f"BENCH-HP-{i:05d}",
+        "first_name": rng.choice(FIRST_NAMES),
+        "last_name": rng.choice(LAST_NAMES),
+        "department": rng.choice(DEPARTMENTS),
+        "gender": rng.choice(["Male", "Female"]),
+        "op_consultation_charge": rng.choice([40, 60, 80, 120]),
+        "user_id": f"bench-doctor-{i}@bench.invalid"
+    } for i in range(count)]
+
+def make_patients(count, seed=1):
+    rng = random.Random(seed)
+    return [{
+        "name": f"BENCH-PAT-{i:06d}",
+        "patient_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "email": f"bench-patient-{i}@bench.invalid",
+        "mobile": f"+1555{i:07d}",
+        "dob": datetime.date(rng.randint(1940, 2015), rng.randint(1, 12), rng.randint(1, 28)),
+        "sex": rng.choice(["Male", "Female", "Other"])
+    } for i in range(count)]
+
+def make_appointments(practitioners, patients, days, start=None, seed=2, with_payment_requests=False):
+    """
+    A schedule of 30-minute slots from 09:00, BOOKED_SHARE of them booked,
+    shaped like the Patient Appointment rows list_appointments reads.
+    """
+    rng = random.Random(seed)
+    start = start or datetime.date.today()
+    appointments = []
+    for day in range(days):
+        date = start + datetime.timedelta(days=day)
+        if date.weekday() >= 5:
+            continue
+        for practitioner in practitioners:
+            for slot in range(SLOTS_PER_DAY):
+                if rng.random() > BOOKED_SHARE:
+                    continue
+                name = f"BENCH-APT-{len(appointments):07d}"
+                appointments.append({
+                    "name": name,
+                    "patient": rng.choice(patients)["name"],
+                    "practitioner": practitioner["name"],
+                    "practitioner_name": f"{practitioner['first_name']} {practitioner['last_name']}",
+                    "appointment_date": date,
+                    "appointment_time": datetime.timedelta(hours=9, minutes=30 * slot),
+                    "duration": 30,
+                    "status": rng.choice(STATUSES),
+                    "appointment_type": "Telehealth",
+                    "custom_payment_request": f"BENCH-PR-{name}" if with_payment_requests else None
+                })
+    return appointments
+
+def make_transcript(session, chunks, seed=3, start=None):
+    rng = random.Random(seed)
+    start = start or datetime.datetime.now()
+    return [{
+        "video_session": session,
+        "speaker": "Patient" if i % 2 else "Doctor",
+        "text": rng.choice(PATIENT_LINES if i % 2 else DOCTOR_LINES),
+        "timestamp": start + datetime.timedelta(seconds=4 * i),
+        "is_final": 1
+    } for i in range(chunks)]
+
+def make_audit_logs(count, users, patients, days=30, seed=4, end=None):
+    rng = random.Random(seed)
+    end = end or datetime.datetime.now()
+    for i in range(count):
+        yield {
+            "user": rng.choice(users),
+            "action": rng.choice(PHI_ACTIONS),
+            "timestamp": end - datetime.timedelta(seconds=rng.randrange(days * 86400)),
+            "patient": rng.choice(patients)["name"],
+            "resource_type": rng.choice(RESOURCE_TYPES),
+            "resource_id": f"BENCH-RES-{rng.randrange(10 ** 6):06d}",
+            "ip_address": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+        }
+
+def seed_site(scale="small", fixture="bench-fixture.json", login_users=50, **overrides):
+    """
+    Writes a synthetic dataset to the current site and a fixture with the
+    logins, practitioners and appointments the scenario load tests use.
+    """
+    import frappe
+    from frappe.utils import now_datetime
+    from telehealth_platform.telehealth.api.patient import build_patient, build_patient_user
+
+    config = get_scale(scale, **overrides)
+    practitioners = make_practitioners(config["practitioners"])
+    patients = make_patients(config["patients"])
+    appointments = make_appointments(practitioners, patients, config["days"])
+    frappe.flags.in_import = True
+    frappe.flags.mute_emails = True
+
+    for doc in practitioners:
+        if frappe.db.exists("Healthcare Practitioner", doc["name"]):
+            continue
+        user = frappe.get_doc({"doctype": "User", "email": doc["user_id"], "first_name": doc["first_name"],
+            "last_name": doc["last_name"], "new_password": PASSWORD, "send_welcome_email": 0,
+            "roles": [{"role": "Healthcare Practitioner"}, {"role": "Physician"}]})
+        user.insert(ignore_permissions=True, ignore_if_duplicate=True)
+        frappe.get_doc(dict(doc, doctype="Healthcare Practitioner")).insert(ignore_permissions=True,
+            set_name=doc["name"])
+    frappe.db.commit()
+
+    # Only the first login_users patients get a User; the rest are records to search and page through
+    for i, doc in enumerate(patients):
+        if frappe.db.exists("Patient", doc["name"]):
+            continue
+        user_id = None
+        if i < login_users:
+            user = build_patient_user(doc["patient_name"], doc["email"], PASSWORD)
+            user.flags.no_welcome_mail = True
+            user.insert(ignore_permissions=True, ignore_if_duplicate=True)
+            user_id = user.name
+        patient = build_patient(doc["patient_name"], doc["email"], doc["mobile"], doc["dob"], doc["sex"], user_id)
+        patient.insert(ignore_permissions=True, set_name=doc["name"])
+        if i % 500 == 0:
+            frappe.db.commit()
+    frappe.db.commit()
+
+    now = now_datetime()
+    insert_rows("Patient Appointment", [{k: v for k, v in a.items() if k != "custom_payment_request"}
+        for a in appointments], now)
+
+    # A finished consult with a full transcript for every practitioner
+    sessions = []
+    for practitioner in practitioners:
+        appointment = next(a for a in appointments if a["practitioner"] == practitioner["name"])
+        session = f"BENCH-VS-{practitioner['name']}"
+        sessions.append(session)
+        insert_rows("Telehealth Video Session", [{"name": session, "appointment": appointment["name"],
+            "room_name": f"room-{appointment['name']}", "status": "Ended", "started_at": now, "ended_at": now}], now)
+        insert_rows("Transcript Chunk", make_transcript(session, config["chunks_per_session"]), now)
+
+    users = [p["user_id"] for p in practitioners]
+    batch = []
+    for row in make_audit_logs(config["audit_logs"], users, patients):
+        batch.append(row)
+        if len(batch) >= 10000:
+            insert_rows("PHI Access Log", batch, now)
+            batch = []
+    insert_rows("PHI Access Log", batch, now)
+
+    data = {
+        "scale": scale,
+        "config": config,
+        "password": PASSWORD,
+        "patients": [p["email"] for p in patients[:login_users]],
+        "practitioners": [{"name": p["name"], "user": p["user_id"]} for p in practitioners],
+        "appointments": [{"name": a["name"], "patient": a["patient"], "practitioner": a["practitioner"]}
+            for a in appointments if a["status"] == "Scheduled"][:1000],
+        "sessions": sessions
+    }
+    with open(fixture, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    print(f"Seeded {len(practitioners)} practitioners, {len(patients)} patients, {len(appointments)} appointments, "
+        f"{config['audit_logs']} audit logs. Fixture: {fixture}")
+    return fixture
+
+def insert_rows(doctype, rows, now):
+    """
+    bulk_insert with the standard columns filled in; names default to random hashes.
+    """
+    import frappe
+    if not rows:
+        return
+    fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus"] + \
+        [k for k in rows[0] if k != "name"]
+    values = [[row.get("name") or frappe.generate_hash(length=12), now, now, "Administrator", "Administrator", 0] +
+        [row[k] for k in fields[6:]] for row in rows]
+    frappe.db.bulk_insert(doctype, fields, values, ignore_duplicates=True)
+    frappe.db.commit()
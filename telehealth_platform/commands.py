@@ -0,0 +1,62 @@
+import os
+import time
+import click
+from frappe.commands import get_site, pass_context
+
+@click.command("import-patients")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), help="Defaults to the file extension")
+@click.option("--workers", type=int, default=1, show_default=True,
+    help="Chunks created in parallel by background workers (1 = in this process)")
+@click.option("--chunk-size", type=int, default=500, show_default=True, help="Patients per transaction")
+@click.option("--date-format", type=click.Choice(["iso", "dmy", "mdy"]), default="iso", show_default=True,
+    help="date_of_birth format: YYYY-MM-DD, DD/MM/YYYY or MM/DD/YYYY")
+@click.option("--wait", type=int, default=4 * 3600, show_default=True,
+    help="Seconds to wait for background chunks to finish")
+@pass_context
+def import_patients(context, path, fmt=None, workers=1, chunk_size=500, date_format="iso", wait=4 * 3600):
+    """
+    Bulk-create patients (User, Customer and Patient) from a CSV or NDJSON file.
+    """
+    import frappe
+    from telehealth_platform.telehealth.api import patient_import
+
+    fmt = fmt or ("ndjson" if path.lower().endswith((".ndjson", ".jsonl")) else "csv")
+    frappe.init(site=get_site(context))
+    frappe.connect()
+    try:
+        import_id = frappe.generate_hash(length=12)
+        click.echo(f"Import {import_id}: {os.path.abspath(path)} ({fmt}, {workers} worker(s))")
+        status = patient_import.run_import(import_id, path, fmt, workers=workers, chunk_size=chunk_size,
+            date_format=date_format, on_progress=print_progress)
+
+        # With workers the last chunk job may still be writing the error file
+        deadline = time.monotonic() + wait
+        while status and status["status"] == "Running" and time.monotonic() < deadline:
+            time.sleep(2)
+            status = patient_import.get_import_progress(import_id)
+            if status:
+                print_progress(status)
+
+        click.echo("")
+        if not status:
+            click.echo(f"Import {import_id} status expired before it finished", err=True)
+            return
+        if status["status"] == "Running":
+            click.echo(f"Still running after {wait}s; follow it with GET admin/patient-imports?import_id={import_id}",
+                err=True)
+        click.echo(f"{status['status']}: {status['imported']} imported, {status['rejected']} rejected "
+            f"of {status['rows_read']} rows in {status['elapsed_seconds']}s "
+            f"({status['patients_per_second']} patients/s)")
+        if status.get("error_file_url"):
+            click.echo(f"Rejected rows: {status['error_file_url']}")
+        if status.get("error"):
+            click.echo(f"Error: {status['error']}", err=True)
+    finally:
+        frappe.destroy()
+
+def print_progress(status):
+    click.echo(f"\r{status['rows_read']} read, {status['imported']} imported, {status['rejected']} rejected, "
+        f"{status['patients_per_second']} patients/s", nl=False)
+
+commands = [import_patients]
@@ -56,6 +56,8 @@ app_license = "mit"
 
 # before_install = "telehealth_platform.install.before_install"
 # after_install = "telehealth_platform.install.after_install"
+before_migrate = "telehealth_platform.install.before_migrate"
+after_migrate = "telehealth_platform.install.after_migrate"
 
 # Uninstallation
 # --------------
@@ -111,6 +113,76 @@ app_license = "mit"
 doc_events = {
 	"Payment Request": {
 		"on_update": "telehealth_platform.telehealth.api.appointment.handle_payment_request_update"
+	},
+	"File": {
+		"on_trash": "telehealth_platform.telehealth.utils.blob_store.release"
+	},
+	"Patient": {
+		"on_update": [
+			"telehealth_platform.telehealth.utils.cache_utils.clear_patient_for_user",
+			"telehealth_platform.telehealth.api.medical_history.clear_medical_history_cache",
+			"telehealth_platform.telehealth.api.patient.clear_profile_cache"
+		],
+		"on_trash": [
+			"telehealth_platform.telehealth.utils.cache_utils.clear_patient_for_user",
+			"telehealth_platform.telehealth.api.medical_history.clear_medical_history_cache",
+			"telehealth_platform.telehealth.api.patient.clear_profile_cache"
+		]
+	},
+	"Clinical Procedure": {
+		"on_change": "telehealth_platform.telehealth.api.medical_history.clear_medical_history_cache",
+		"on_trash": "telehealth_platform.telehealth.api.medical_history.clear_medical_history_cache"
+	},
+	"Insurance Payer": {
+		"on_trash": "telehealth_platform.telehealth.utils.reference_index.invalidate",
+		"after_rename": "telehealth_platform.telehealth.utils.reference_index.invalidate"
+	},
+	"Medication": {
+		"on_trash": "telehealth_platform.telehealth.utils.reference_index.invalidate",
+		"after_rename": "telehealth_platform.telehealth.utils.reference_index.invalidate"
+	},
+	"Lab Test Template": {
+		"on_trash": "telehealth_platform.telehealth.utils.reference_index.invalidate",
+		"after_rename": "telehealth_platform.telehealth.utils.reference_index.invalidate"
+	},
+	"Clinical Procedure Template": {
+		"on_trash": "telehealth_platform.telehealth.utils.reference_index.invalidate",
+		"after_rename": "telehealth_platform.telehealth.utils.reference_index.invalidate"
+	},
+	"Observation Template": {
+		"on_trash": "telehealth_platform.telehealth.utils.reference_index.invalidate",
+		"after_rename": "telehealth_platform.telehealth.utils.reference_index.invalidate"
+	},
+	"Medication Request": {
+		"on_change": "telehealth_platform.telehealth.utils.active_orders.update_active_orders",
+		"on_trash": "telehealth_platform.telehealth.utils.active_orders.update_active_orders",
+		"after_rename": "telehealth_platform.telehealth.utils.active_orders.update_active_orders"
+	},
+	"Service Request": {
+		"on_change": "telehealth_platform.telehealth.utils.active_orders.update_active_orders",
+		"on_trash": "telehealth_platform.telehealth.utils.active_orders.update_active_orders",
+		"after_rename": "telehealth_platform.telehealth.utils.active_orders.update_active_orders"
+	},
+	"Practitioner Feedback": {
+		"after_insert": "telehealth_platform.telehealth.utils.practitioner_ratings.update_rating",
+		"on_update": "telehealth_platform.telehealth.utils.practitioner_ratings.update_rating",
+		"on_trash": "telehealth_platform.telehealth.utils.practitioner_ratings.update_rating"
+	},
+	"Video Recording": {
+		"on_update": "telehealth_platform.telehealth.utils.recording_access.clear_recording_urls",
+		"on_trash": "telehealth_platform.telehealth.utils.recording_access.clear_recording_urls"
+	},
+	"Healthcare Practitioner": {
+		"on_update": "telehealth_platform.telehealth.api.doctor.clear_doctor_profile",
+		"on_trash": "telehealth_platform.telehealth.api.doctor.clear_doctor_profile",
+		"after_rename": "telehealth_platform.telehealth.api.doctor.clear_doctor_profile"
+	},
+	"User": {
+		"on_update": "telehealth_platform.telehealth.api.doctor.clear_doctor_profile",
+		"on_trash": "telehealth_platform.telehealth.api.doctor.clear_doctor_profile"
+	},
+	"Allergy Term": {
+		"after_rename": "telehealth_platform.telehealth.utils.reference_index.invalidate"
 	}
 }
 
@@ -125,7 +197,15 @@ scheduler_events = {
 # 		"telehealth_platform.tasks.daily"
 # 	],
  	"hourly": [
- 		"telehealth_platform.telehealth.api.video_session.cleanup_expired_sessions"
+ 		"telehealth_platform.telehealth.api.video_session.cleanup_expired_sessions",
+ 		"telehealth_platform.telehealth.utils.audit_storage.refresh_today_rollups",
+ 		"telehealth_platform.telehealth.api.patient.enqueue_missing_customers",
+ 		"telehealth_platform.telehealth.utils.recording_ingest.requeue_stale_recordings",
+ 		"telehealth_platform.telehealth.utils.upload_utils.remove_abandoned_sessions"
+ 	],
+ 	"daily": [
+ 		"telehealth_platform.telehealth.utils.audit_storage.build_daily_rollups",
+ 		"telehealth_platform.telehealth.utils.practitioner_ratings.rebuild_ratings"
  	],
 # 	"weekly": [
 # 		"telehealth_platform.tasks.weekly"
@@ -133,6 +213,12 @@ scheduler_events = {
 # 	"monthly": [
 # 		"telehealth_platform.tasks.monthly"
 # 	],
+ 	"daily_long": [
+ 		"telehealth_platform.telehealth.utils.recording_ingest.expire_recordings"
+ 	],
+ 	"monthly_long": [
+ 		"telehealth_platform.telehealth.utils.audit_storage.archive_cold_logs"
+ 	],
 }
 
 # Testing
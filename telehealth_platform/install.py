@@ -0,0 +1,110 @@
+import frappe
+
+# Indexes on DocTypes owned by other apps (Frappe Health, Frappe) that back this
+# app's hot queries. Our own DocTypes declare theirs in on_doctype_update.
+INDEXES = [
+    ("Patient Medical Record", ["patient", "communication_date"]),
+    # Doctor search filters active practitioners by department or gender and
+    # sorts by name or fee; ratings come from Practitioner Rating by primary key
+    ("Healthcare Practitioner", ["status", "department", "practitioner_name"]),
+    ("Healthcare Practitioner", ["status", "department", "op_consultation_charge"]),
+    ("Healthcare Practitioner", ["status", "gender"]),
+]
+
+# Rows that reference a Telehealth Video Session, moved over when duplicate
+# sessions for one appointment are merged
+SESSION_LINKS = ["Transcript Chunk", "Clinical Note AI", "AI Session Data", "Video Recording"]
+
+MAX_REPORTED_CONFLICTS = 50
+
+def before_migrate():
+    # The unique constraints on Telehealth Video Session.appointment and
+    # Clinical Note AI.video_session cannot be added while duplicates exist.
+    # Clinical notes are never removed here: conflicts stop the migration.
+    session_groups = get_duplicates("Telehealth Video Session", "appointment", "creation asc")
+    check_note_conflicts(session_groups)
+    merge_duplicate_sessions(session_groups)
+
+def after_migrate():
+    add_indexes()
+
+def add_indexes():
+    for doctype, fields in INDEXES:
+        if not frappe.db.table_exists(doctype):
+            continue
+        meta = frappe.get_meta(doctype)
+        if all(f in ("name", "creation", "modified") or meta.has_field(f) for f in fields):
+            frappe.db.add_index(doctype, fields)
+
+def get_duplicates(doctype, field, order_by, fields=None):
+    """
+    {value: [rows]} for values of `field` held by more than one row, each list
+    in `order_by` order.
+    """
+    if not frappe.db.table_exists(doctype) or not frappe.db.has_column(doctype, field):
+        return {}
+    values = frappe.db.sql(f"""
+        select `{field}` from `tab{doctype}`
+        where `{field}` is not null and `{field}` != ''
+        group by `{field}` having count(*) > 1""", pluck=True)
+    duplicates = {}
+    for row in frappe.get_all(doctype, filters={field: ["in", values]},
+            fields=["name", field] + (fields or []), order_by=order_by) if values else []:
+        duplicates.setdefault(row[field], []).append(row)
+    return duplicates
+
+def check_note_conflicts(session_groups):
+    """
+    Stops the migration when a session has, or would have once duplicate
+    sessions are merged, more than one Clinical Note AI, listing the notes to
+    reconcile by hand.
+    """
+    merged_into = {row.name: rows[0].name for rows in session_groups.values() for row in rows}
+    notes = {}
+    for session, rows in get_duplicates("Clinical Note AI", "video_session", "creation asc",
+            fields=["status"]).items():
+        notes.setdefault(merged_into.get(session, session), {}).update({row.name: row.status for row in rows})
+    if merged_into and frappe.db.table_exists("Clinical Note AI"):
+        for row in frappe.get_all("Clinical Note AI", filters={"video_session": ["in", list(merged_into)]},
+                fields=["name", "video_session", "status"], order_by="creation asc"):
+            notes.setdefault(merged_into[row.video_session], {})[row.name] = row.status
+
+    conflicts = [f"{session}: " + ", ".join(f"{name} ({status})" for name, status in names.items())
+        for session, names in sorted(notes.items()) if len(names) > 1]
+    if not conflicts:
+        return
+    report = "\n".join(conflicts[:MAX_REPORTED_CONFLICTS])
+    if len(conflicts) > MAX_REPORTED_CONFLICTS:
+        report += f"\n... and {len(conflicts) - MAX_REPORTED_CONFLICTS} more"
+    frappe.throw(
+        f"{len(conflicts)} video sessions (after merging duplicate sessions per appointment) have more than "
+        f"one Clinical Note AI. Reconcile them into one note per session, then run the migration again:\n{report}",
+        title="Duplicate clinical notes")
+
+def merge_duplicate_sessions(session_groups):
+    """
+    Keeps the oldest session of an appointment and moves transcripts, notes
+    and recordings of the others onto it. The fields of each removed session
+    are kept in a comment on the session that stays.
+    """
+    for appointment, rows in session_groups.items():
+        keep, duplicates = rows[0].name, [row.name for row in rows[1:]]
+        merged = frappe.get_all("Telehealth Video Session", filters={"name": ["in", duplicates]}, fields=["*"],
+            order_by="creation asc")
+        frappe.get_doc("Telehealth Video Session", keep).add_comment("Info",
+            f"Merged duplicate video sessions of appointment {appointment} into this one:"
+            + "".join(f"<pre>{frappe.as_json(row)}</pre>" for row in merged))
+        for doctype in SESSION_LINKS:
+            if frappe.db.table_exists(doctype):
+                frappe.db.set_value(doctype, {"video_session": ["in", duplicates]}, "video_session", keep,
+                    update_modified=False)
+        frappe.db.delete("Telehealth Video Session", {"name": ["in", duplicates]})
+        print(f"Merged video sessions {', '.join(duplicates)} into {keep} (appointment {appointment})")
+
+    # Room names are derived from the appointment; clear any left over on newer sessions
+    for room_name, rows in get_duplicates("Telehealth Video Session", "room_name", "creation asc").items():
+        for row in rows[1:]:
+            frappe.db.set_value("Telehealth Video Session", row.name, "room_name", None, update_modified=False)
+            frappe.get_doc("Telehealth Video Session", row.name).add_comment("Info",
+                f"Cleared room name {room_name}, already used by video session {rows[0].name}")
+    frappe.db.commit()
@@ -96,7 +96,13 @@ def update_clinical_notes(session_id, subjective=None, objective=None, assessmen
     if assessment is not None: note.assessment = assessment
     if plan is not None: note.plan = plan
     
-    note.save(ignore_permissions=True)
+    try:
+        note.save(ignore_permissions=True)
+    except frappe.UniqueValidationError:
+        # A concurrent request created the note for this session first; retry as an update
+        frappe.clear_messages()
+        frappe.db.rollback()
+        return update_clinical_notes(session_id, subjective, objective, assessment, plan)
     frappe.db.commit()
     
     return get_clinical_notes(session_id)
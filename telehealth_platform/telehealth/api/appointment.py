@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
-from frappe.utils import get_datetime, now_datetime
+from frappe.utils import cint, get_datetime, getdate, now_datetime
+from telehealth_platform.telehealth.utils import profiling
 
 @frappe.whitelist()
 def list_appointments():
@@ -146,7 +147,8 @@ def cancel_appointment(id):
                 else:
                     payment_intent_id = appointment.custom_payment_intent_id
                     # Issue refund
-                    refund = stripe.Refund.create(payment_intent=payment_intent_id)
+                    with profiling.external_call("stripe"):
+                        refund = stripe.Refund.create(payment_intent=payment_intent_id)
                     if refund.status == "succeeded":
                         refund_amount = appointment.paid_amount
                         appointment.custom_payment_status = "Refunded"
@@ -189,7 +191,8 @@ def confirm_payment(id, payment_intent_id):
             # but generally should fail or log. We'll mark as Paid for progress in dev.
             pass 
         else:
-            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+            with profiling.external_call("stripe"):
+                intent = stripe.PaymentIntent.retrieve(payment_intent_id)
             if intent.status != "succeeded":
                 frappe.throw(_("Payment verification failed: Status is {0}").format(intent.status))
                 
@@ -233,6 +236,49 @@ def update_pre_consultation(id, symptoms=None, notes=None, photos=None):
     frappe.db.commit()
     return {"message": _("Pre-consultation data saved")}
 
+@frappe.whitelist()
+def submit_feedback(id, rating, comment=None):
+    """
+    Records the patient's rating (1-5) of a past appointment, once per appointment.
+    The practitioner's rating aggregate is updated by the Practitioner Feedback doc event.
+    """
+    appointment = frappe.db.get_value("Patient Appointment", id,
+        ["name", "patient", "practitioner", "appointment_date", "status"], as_dict=True)
+    if not appointment:
+        frappe.local.response.http_status_code = 404
+        return {"error": "Not Found", "message": _("Appointment not found")}
+
+    if appointment.patient != frappe.db.get_value("Patient", {"user_id": frappe.session.user}, "name"):
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Only the patient can rate this appointment")}
+
+    rating = cint(rating)
+    if not 1 <= rating <= 5:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Rating must be between 1 and 5")}
+
+    if appointment.status in ("Cancelled", "No Show") or getdate(appointment.appointment_date) > getdate():
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Only attended appointments can be rated")}
+
+    if frappe.db.exists("Practitioner Feedback", {"appointment": appointment.name}):
+        frappe.local.response.http_status_code = 409
+        return {"error": "Conflict", "message": _("This appointment has already been rated")}
+
+    feedback = frappe.get_doc({
+        "doctype": "Practitioner Feedback",
+        "appointment": appointment.name,
+        "patient": appointment.patient,
+        "practitioner": appointment.practitioner,
+        "rating": rating,
+        "comment": comment
+    })
+    feedback.insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    frappe.local.response.http_status_code = 201
+    return {"id": feedback.name, "appointment": appointment.name, "rating": rating}
+
 def format_appointment(a):
     """
     Helper to map Patient Appointment to contract Appointment schema.
@@ -1,45 +1,306 @@
+import csv
+import json
 import frappe
 from frappe import _
+from frappe.query_builder import Order
+from frappe.utils import add_days, get_datetime, getdate
+from telehealth_platform.telehealth.utils import audit_storage, pagination
+
+LOG_FIELDS = ["name", "timestamp", "user", "user_name", "action", "resource_type", "resource_id",
+    "patient", "ip_address", "user_agent", "metadata"]
+
+EXPORT_COLUMNS = ["id", "timestamp", "user_id", "user_name", "action", "resource_type", "resource_id",
+    "patient_id", "ip_address", "user_agent", "metadata"]
+
+# Export progress lives in Redis so a status poll never touches the log table
+EXPORT_STATUS_KEY = "telehealth_audit_exports"
+EXPORT_PROGRESS_INTERVAL = 10000
+
+def is_admin():
+    roles = frappe.get_roles()
+    return "System Manager" in roles or "Administrator" in roles
 
 @frappe.whitelist()
-def search_logs(user_id=None, patient_id=None, from_date=None, to_date=None):
+def search_logs(user_id=None, patient_id=None, from_date=None, to_date=None, limit=None, cursor=None):
     """
     Search audit logs. Requires Admin role.
+    Keyset paginated on (timestamp, name), newest first. Pass `next_cursor` back as `cursor`.
+    Reads the hot table first and only falls through to monthly archives when the
+    page is not yet full, so recent windows never touch archived history.
     """
-    if not ("System Manager" in frappe.get_roles() or "Administrator" in frappe.get_roles()):
+    if not is_admin():
         frappe.local.response.http_status_code = 403
         return {"error": "Forbidden", "message": _("Admin access required")}
 
-    filters = {}
-    if user_id: filters["user"] = user_id
-    if patient_id: filters["patient"] = patient_id
-    if from_date and to_date:
-        filters["timestamp"] = ["between", [from_date, to_date]]
+    page_size = pagination.get_page_size(limit)
+    after = pagination.decode_cursor(cursor, 2) if cursor else None
+
+    rows = []
+    for table in get_sources(from_date, to_date):
+        query = build_log_query(user_id, patient_id, from_date, to_date, table=table, after=after)
+        rows += query.limit(page_size + 1 - len(rows)).run(as_dict=True)
+        if len(rows) > page_size:
+            break
 
-    logs = frappe.get_all("PHI Access Log", 
-        fields=["name", "timestamp", "user", "user_name", "action", "resource_type", "patient", "ip_address"],
-        filters=filters,
-        order_by="timestamp desc"
+    rows, next_cursor = pagination.paginate(rows, page_size, key=lambda r: (r.timestamp, r.name))
+
+    return {
+        "data": [format_log(l) for l in rows],
+        "next_cursor": next_cursor,
+        "has_more": bool(next_cursor)
+    }
+
+def build_log_query(user_id=None, patient_id=None, from_date=None, to_date=None, table=None, after=None):
+    """
+    Builds the filtered PHI Access Log query shared by search and export.
+    Equality filters on user/patient plus a timestamp range line up with the
+    (user, timestamp) and (patient, timestamp) indexes.
+    `table` selects the hot table (default) or a monthly archive table.
+    `after` is a decoded (timestamp, name) cursor.
+    """
+    log = table or frappe.qb.DocType("PHI Access Log")
+    timestamp, name = log.field("timestamp"), log.field("name")
+    query = (
+        frappe.qb.from_(log)
+        .select(*[log.field(f) for f in LOG_FIELDS])
+        .orderby(timestamp, order=Order.desc)
+        .orderby(name, order=Order.desc)
     )
 
-    return [format_log(l) for l in logs]
+    if user_id:
+        query = query.where(log.field("user") == user_id)
+    if patient_id:
+        query = query.where(log.field("patient") == patient_id)
+
+    # Either bound may be given on its own
+    if from_date:
+        query = query.where(timestamp >= get_datetime(from_date))
+    if to_date:
+        query = query.where(timestamp < get_range_end(to_date))
+
+    if after:
+        # Rows strictly after the last row of the previous page in (timestamp desc, name desc) order
+        ts, last_name = after
+        query = query.where((timestamp < ts) | ((timestamp == ts) & (name < last_name)))
+
+    return query
+
+def get_sources(from_date=None, to_date=None):
+    return audit_storage.get_log_sources(
+        get_datetime(from_date) if from_date else None,
+        get_range_end(to_date) if to_date else None
+    )
+
+def get_range_end(to_date):
+    """
+    Exclusive upper bound for a date filter. A bare date includes the whole day.
+    """
+    if len(str(to_date).strip()) <= 10:
+        return get_datetime(add_days(getdate(to_date), 1))
+    return get_datetime(to_date)
 
 @frappe.whitelist()
 def get_log_detail(id):
     """
     Get audit log detail. Requires Admin role.
     """
-    if not ("System Manager" in frappe.get_roles() or "Administrator" in frappe.get_roles()):
+    if not is_admin():
         frappe.local.response.http_status_code = 403
         return {"error": "Forbidden", "message": _("Admin access required")}
 
-    if not frappe.db.exists("PHI Access Log", id):
+    if frappe.db.exists("PHI Access Log", id):
+        return format_log(frappe.get_doc("PHI Access Log", id))
+
+    log = audit_storage.find_archived_log(id)
+    if not log:
         frappe.local.response.http_status_code = 404
         return {"error": "Not Found", "message": _("Log entry not found")}
 
-    log = frappe.get_doc("PHI Access Log", id)
     return format_log(log)
 
+@frappe.whitelist()
+def export_logs(format="csv", user_id=None, patient_id=None, from_date=None, to_date=None):
+    """
+    Queues a streaming export of audit logs as CSV or NDJSON. Requires Admin role.
+    The export itself is recorded as an EXPORT_DATA access.
+    """
+    if not is_admin():
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Admin access required")}
+
+    if format not in ("csv", "ndjson"):
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Export format must be csv or ndjson")}
+
+    filters = {"user_id": user_id, "patient_id": patient_id, "from_date": from_date, "to_date": to_date}
+    export_id = frappe.generate_hash(length=12)
+
+    frappe.get_doc({
+        "doctype": "PHI Access Log",
+        "user": frappe.session.user,
+        "action": "EXPORT_DATA",
+        "resource_type": "PHI Access Log",
+        "resource_id": export_id,
+        "patient": patient_id,
+        "metadata": json.dumps({"format": format, "filters": filters})
+    }).insert(ignore_permissions=True)
+
+    set_export_status(export_id, status="Queued", format=format, rows=0)
+
+    frappe.enqueue(
+        "telehealth_platform.telehealth.api.audit.run_export",
+        queue="long",
+        timeout=4 * 3600,
+        enqueue_after_commit=True,
+        export_id=export_id,
+        export_format=format,
+        filters=filters
+    )
+    frappe.db.commit()
+
+    frappe.local.response.http_status_code = 202
+    return {"export_id": export_id, "status": "Queued"}
+
+@frappe.whitelist()
+def get_export_status(export_id):
+    """
+    Returns progress of an audit log export, and the private file URL once completed.
+    """
+    if not is_admin():
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Admin access required")}
+
+    status = frappe.cache().hget(EXPORT_STATUS_KEY, export_id)
+    if not status:
+        frappe.local.response.http_status_code = 404
+        return {"error": "Not Found", "message": _("Export not found")}
+
+    return status
+
+def run_export(export_id, export_format, filters):
+    """
+    Background job: streams matching rows from a server-side (unbuffered) cursor
+    straight to a private file, so memory stays flat regardless of row count.
+    """
+    file_name = f"audit-logs-{export_id}.{export_format}"
+    path = frappe.get_site_path("private", "files", file_name)
+    rows = 0
+
+    try:
+        set_export_status(export_id, status="Running", format=export_format, rows=0)
+        sources = get_sources(filters.get("from_date"), filters.get("to_date"))
+
+        with open(path, "w", newline="", encoding="utf-8") as f, frappe.db.unbuffered_cursor():
+            write_row = get_row_writer(f, export_format)
+            for table in sources:
+                query = build_log_query(table=table, **filters)
+                for row in query.run(as_dict=True, as_iterator=True):
+                    write_row(format_log(row))
+                    rows += 1
+                    if rows % EXPORT_PROGRESS_INTERVAL == 0:
+                        set_export_status(export_id, status="Running", format=export_format, rows=rows)
+
+        # The connection is free again once the unbuffered cursor is closed
+        file_doc = frappe.get_doc({
+            "doctype": "File",
+            "file_name": file_name,
+            "file_url": f"/private/files/{file_name}",
+            "is_private": 1
+        })
+        file_doc.insert(ignore_permissions=True)
+        frappe.db.commit()
+
+        set_export_status(export_id, status="Completed", format=export_format, rows=rows,
+            file_url=file_doc.file_url)
+    except Exception as e:
+        frappe.log_error(f"Audit export {export_id} failed: {str(e)}", "Audit Export")
+        set_export_status(export_id, status="Failed", format=export_format, rows=rows, error=str(e))
+
+@frappe.whitelist()
+def get_access_summary(dimension="User", from_date=None, to_date=None, action=None, limit=20):
+    """
+    Top users, patients or actions by access count over a date range.
+    Reads the daily rollups only, never the raw log.
+    """
+    if not is_admin():
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Admin access required")}
+
+    if dimension not in ("User", "Patient", "Action"):
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Dimension must be User, Patient or Action")}
+
+    values = {
+        "dimension": dimension,
+        "from_date": getdate(from_date) if from_date else add_days(getdate(), -30),
+        "to_date": getdate(to_date) if to_date else getdate(),
+        "action": action,
+        "limit": pagination.get_page_size(limit, default=20)
+    }
+    action_condition = "and action = %(action)s" if action else ""
+
+    return frappe.db.sql(f"""
+        select dimension_value as value, sum(access_count) as access_count
+        from `tabPHI Access Log Rollup`
+        where dimension = %(dimension)s and date between %(from_date)s and %(to_date)s
+        {action_condition}
+        group by dimension_value
+        order by access_count desc
+        limit %(limit)s
+    """, values, as_dict=True)
+
+@frappe.whitelist()
+def get_access_anomalies(date=None, window_days=30, min_ratio=3.0, action="VIEW_PHI"):
+    """
+    Users whose access count on `date` exceeds `min_ratio` times their daily
+    average over the preceding window. Reads the daily rollups only.
+    """
+    if not is_admin():
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Admin access required")}
+
+    day = getdate(date) if date else getdate()
+    window_days = int(window_days)
+    values = {
+        "day": day,
+        "window_start": add_days(day, -window_days),
+        "window_days": window_days,
+        "min_ratio": float(min_ratio),
+        "action": action
+    }
+
+    return frappe.db.sql("""
+        select dimension_value as user_id,
+            sum(case when date = %(day)s then access_count else 0 end) as access_count,
+            sum(case when date < %(day)s then access_count else 0 end) / %(window_days)s as daily_average
+        from `tabPHI Access Log Rollup`
+        where dimension = 'User' and action = %(action)s
+            and date between %(window_start)s and %(day)s
+        group by dimension_value
+        having access_count > greatest(daily_average, 1) * %(min_ratio)s
+        order by access_count desc
+    """, values, as_dict=True)
+
+def get_row_writer(f, export_format):
+    """
+    Returns a callable writing one formatted log entry to `f`.
+    """
+    if export_format == "ndjson":
+        def write_ndjson(entry):
+            f.write(json.dumps(entry, default=str))
+            f.write("\n")
+        return write_ndjson
+
+    writer = csv.writer(f)
+    writer.writerow(EXPORT_COLUMNS)
+
+    def write_csv(entry):
+        writer.writerow([entry.get(c) for c in EXPORT_COLUMNS])
+    return write_csv
+
+def set_export_status(export_id, **status):
+    frappe.cache().hset(EXPORT_STATUS_KEY, export_id, dict(status, export_id=export_id))
+
 def format_log(l):
     """
     Helper to format log entry according to contract.
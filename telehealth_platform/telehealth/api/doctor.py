@@ -1,79 +1,186 @@
 import frappe
 from frappe import _
-from frappe.utils import getdate, add_days, now_datetime
+from frappe.query_builder import Order
+from frappe.utils import flt, getdate, add_days, now_datetime
+from telehealth_platform.telehealth.utils import cache_utils, metrics, pagination, profiling
+
+MAX_BULK_PROFILES = 100
+DOCTOR_PROFILE_TTL = 3600
 
 @frappe.whitelist()
-def search(specialty=None, availability=None, min_rating=None, gender=None, sort_by=None):
+def search(specialty=None, availability=None, min_rating=None, gender=None, sort_by=None, limit=None, cursor=None):
     """
     Search for doctors. Wraps internal 'Healthcare Practitioner' DocType.
+    Filtering, sorting and keyset pagination all happen in one query; ratings
+    are the Bayesian averages kept in Practitioner Rating (None until rated).
     """
-    filters = {"status": "Active"}
-    
+    page_size = pagination.get_page_size(limit, default=20)
+    practitioner = frappe.qb.DocType("Healthcare Practitioner")
+    rating = frappe.qb.DocType("Practitioner Rating")
+
+    query = (
+        frappe.qb.from_(practitioner)
+        .left_join(rating).on(rating.name == practitioner.name)
+        .select(practitioner.name, practitioner.practitioner_name, practitioner.department,
+            practitioner.op_consultation_charge, practitioner.image, rating.rating, rating.rating_count)
+        .where(practitioner.status == "Active")
+        .limit(page_size + 1)
+    )
+
     if specialty:
-        filters["department"] = specialty # In Frappe Healthcare, specialty is often tracked via Medical Department
-        
+        # In Frappe Healthcare, specialty is tracked via Medical Department
+        query = query.where(practitioner.department == specialty)
+
     if gender:
-        # Practitioner might have gender tied to the linked User or Employee record
-        # For simplicity, we assume a custom field or check linked doc
-        filters["gender"] = gender
+        if not frappe.get_meta("Healthcare Practitioner").has_field("gender"):
+            return {"data": [], "next_cursor": None, "has_more": False}
+        query = query.where(practitioner.gender == gender)
 
-    practitioners = frappe.get_all("Healthcare Practitioner", 
-        filters=filters, 
-        fields=["name", "practitioner_name", "department", "op_consultation_charge", "image"])
+    if min_rating:
+        query = query.where(rating.rating >= flt(min_rating))
 
-    results = []
-    for p in practitioners:
-        # In a real scenario, we'd calculate 'next_available_slot' and 'rating' from other tables
-        summary = {
+    # Sort column, direction, and whether NULLs come first in that direction
+    if sort_by == "lowest_price":
+        column, descending, nulls_first = practitioner.op_consultation_charge, False, True
+    elif sort_by == "highest_rated":
+        column, descending, nulls_first = rating.rating, True, False
+    else:
+        column, descending, nulls_first = practitioner.practitioner_name, False, True
+    query = query.orderby(column, order=Order.desc if descending else Order.asc).orderby(practitioner.name)
+
+    if cursor:
+        last_value, last_name = pagination.decode_cursor(cursor, 2)
+        query = query.where(get_keyset_condition(column, practitioner.name, last_value, last_name,
+            descending, nulls_first))
+
+    rows = query.run(as_dict=True)
+    sort_field = {"lowest_price": "op_consultation_charge", "highest_rated": "rating"}.get(sort_by, "practitioner_name")
+    rows, next_cursor = pagination.paginate(rows, page_size, key=lambda r: (r[sort_field], r.name))
+
+    return {
+        "data": [{
             "id": p.name,
             "doctor_name": p.practitioner_name,
             "specialization": p.department,
-            "rating": 4.5, # Placeholder: calculate from Feedback/Reviews
+            "rating": flt(p.rating, 2) if p.rating_count else None,
+            "rating_count": p.rating_count or 0,
             "photo_url": p.image,
             "consultation_fee": p.op_consultation_charge,
             "next_available_slot": str(now_datetime()) # Placeholder
-        }
-        
-        # Apply min_rating filter manually if it's a placeholder for now
-        if min_rating and summary["rating"] < float(min_rating):
-            continue
-            
-        results.append(summary)
-
-    # Sort results
-    if sort_by == "lowest_price":
-        results.sort(key=lambda x: x["consultation_fee"] or 0)
-    elif sort_by == "highest_rated":
-        results.sort(key=lambda x: x["rating"], reverse=True)
+        } for p in rows],
+        "next_cursor": next_cursor,
+        "has_more": bool(next_cursor)
+    }
 
-    return results
+def get_keyset_condition(column, name, last_value, last_name, descending, nulls_first):
+    """
+    Rows after (last_value, last_name) in `column` order, then by name ascending.
+    MariaDB sorts NULLs first ascending and last descending.
+    """
+    if last_value is None:
+        condition = column.isnull() & (name > last_name)
+        return condition | column.isnotnull() if nulls_first else condition
+    after = (column < last_value) if descending else (column > last_value)
+    condition = after | ((column == last_value) & (name > last_name))
+    return condition if nulls_first else condition | column.isnull()
 
 @frappe.whitelist()
 def get_doctor_profile(id):
     """
     Retrieves detailed doctor profile.
+    Served from the profile read model with an ETag; a cache hit runs no queries.
     """
-    if not frappe.db.exists("Healthcare Practitioner", id):
+    entry = get_doctor_profile_entries([id]).get(id)
+    if not entry:
         frappe.local.response.http_status_code = 404
         return {"error": "Not Found", "message": _("Doctor not found")}
 
-    p = frappe.get_doc("Healthcare Practitioner", id)
-    
+    return cache_utils.conditional_response(entry)
+
+@frappe.whitelist()
+def get_doctor_profiles(ids):
+    """
+    Profiles of many doctors in one call (e.g. for search result cards), in
+    the order requested. `ids` is a JSON list or a comma separated string.
+    """
+    if isinstance(ids, str):
+        ids = frappe.parse_json(ids) if ids.strip().startswith("[") else ids.split(",")
+    ids = [i.strip() for i in ids or [] if i and i.strip()]
+    if len(ids) > MAX_BULK_PROFILES:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("At most {0} ids per request").format(MAX_BULK_PROFILES)}
+
+    entries = get_doctor_profile_entries(ids)
     return {
-        "id": p.name,
-        "doctor_name": p.practitioner_name,
-        "email": frappe.db.get_value("User", p.user_id, "email") if p.user_id else None,
-        "phone": p.mobile_phone,
-        "specialization": p.department,
-        "medical_license": getattr(p, "custom_license_number", ""), # Assuming custom field
-        "npi": getattr(p, "custom_npi", ""),
-        "bio": p.description,
-        "rating": 4.5,
-        "photo_url": p.image,
-        "consultation_fee": p.op_consultation_charge,
-        "certifications": [] # Can be fetched from Practitioner Service Unit or attachments
+        "data": [entries[i]["payload"] for i in ids if i in entries],
+        "not_found": [i for i in ids if i not in entries]
     }
 
+def get_doctor_profile_entries(ids):
+    """
+    {practitioner: cached entry}; misses are built together.
+    """
+    with profiling.count_queries() as counter:
+        entries, misses = cache_utils.get_cached_many(cache_utils.DOCTOR_PROFILE_CACHE, ids,
+            build_doctor_profiles, ttl=DOCTOR_PROFILE_TTL)
+    metrics.incr("doctor_profile_requests_total")
+    metrics.incr("doctor_profile_cache_hits_total", len(set(ids)) - misses)
+    if misses:
+        metrics.incr("doctor_profile_cache_misses_total", misses)
+        metrics.incr("doctor_profile_queries_total", counter.db_queries)
+    return entries
+
+def build_doctor_profiles(ids):
+    """
+    Denormalized profiles {practitioner: (profile, cache tags)}: one query each
+    for practitioners, their users' emails and their ratings.
+    """
+    meta = frappe.get_meta("Healthcare Practitioner")
+    # License and NPI are custom fields and may not exist on every site
+    custom_fields = [f for f in ("custom_license_number", "custom_npi") if meta.has_field(f)]
+    practitioners = frappe.get_all("Healthcare Practitioner",
+        filters={"name": ["in", ids]},
+        fields=["name", "practitioner_name", "user_id", "mobile_phone", "department", "description",
+            "image", "op_consultation_charge"] + custom_fields)
+    if not practitioners:
+        return {}
+
+    user_ids = [p.user_id for p in practitioners if p.user_id]
+    emails = dict(frappe.get_all("User", filters={"name": ["in", user_ids]}, fields=["name", "email"],
+        as_list=True)) if user_ids else {}
+    ratings = {r.name: r for r in frappe.get_all("Practitioner Rating",
+        filters={"name": ["in", [p.name for p in practitioners]]}, fields=["name", "rating", "rating_count"])}
+
+    profiles = {}
+    for p in practitioners:
+        rating = ratings.get(p.name)
+        profile = {
+            "id": p.name,
+            "doctor_name": p.practitioner_name,
+            "email": emails.get(p.user_id),
+            "phone": p.mobile_phone,
+            "specialization": p.department,
+            "medical_license": p.get("custom_license_number") or "",
+            "npi": p.get("custom_npi") or "",
+            "bio": p.description,
+            "rating": flt(rating.rating, 2) if rating and rating.rating_count else None,
+            "rating_count": rating.rating_count if rating else 0,
+            "photo_url": p.image,
+            "consultation_fee": p.op_consultation_charge,
+            "certifications": [] # Can be fetched from Practitioner Service Unit or attachments
+        }
+        tags = [f"Healthcare Practitioner:{p.name}"] + ([f"User:{p.user_id}"] if p.user_id else [])
+        profiles[p.name] = (profile, tags)
+    return profiles
+
+def clear_doctor_profile(doc, method=None, old_name=None, *args):
+    """
+    Doc event for Healthcare Practitioner and User: drops the profiles built
+    from `doc` once the transaction commits.
+    """
+    tags = [f"{doc.doctype}:{name}" for name in {doc.name, old_name} if name]
+    frappe.db.after_commit.add(lambda: cache_utils.invalidate_tags(cache_utils.DOCTOR_PROFILE_CACHE, tags))
+
 @frappe.whitelist()
 def get_availability(id, start_date=None, end_date=None):
     """
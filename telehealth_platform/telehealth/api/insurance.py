@@ -1,10 +1,22 @@
+import io
+import time
 import frappe
 from frappe import _
+from frappe.utils import cint
+from telehealth_platform.adapters.ocr_adapter import OCRAdapter, OCRTransientError
+from telehealth_platform.telehealth.utils import image_preprocess, job_utils, metrics, payer_directory, upload_utils
+
+OCR_FIELDS = ["provider_name", "policy_number", "group_number", "plan_type", "subscriber_name"]
+OCR_JOB_TIMEOUT = 900
+DEFAULT_OCR_CONCURRENCY = 4
+DEFAULT_OCR_ATTEMPTS = 4
 
 @frappe.whitelist()
 def upload_ocr(front_image=None, back_image=None):
     """
     Uploads insurance card photos for OCR processing.
+    Stores the images, creates a Pending verification and returns at once;
+    extraction runs in a background job (see process_ocr).
     """
     user_id = frappe.session.user
     patient_name = frappe.db.get_value("Patient", {"user_id": user_id}, "name")
@@ -13,72 +25,190 @@ def upload_ocr(front_image=None, back_image=None):
         frappe.local.response.http_status_code = 404
         return {"error": "Not Found", "message": _("Patient record not found")}
 
+    # Validated before anything is written
+    uploads = {
+        "front_image": get_image_upload("front_image", front_image),
+        "back_image": get_image_upload("back_image", back_image)
+    }
+
     # Create session record
     verification = frappe.get_doc({
         "doctype": "Insurance Verification",
         "patient": patient_name,
-        "status": "Pending"
+        "status": "Pending",
+        "ocr_status": "Queued",
+        "ocr_progress": 0
     })
+    verification.insert(ignore_permissions=True)
+
+    # Card photos go through the content-addressed store, so re-uploading the
+    # same photo does not store a second copy
+    for fieldname, upload in uploads.items():
+        if isinstance(upload, str):
+            verification.set(fieldname, upload)
+        elif upload:
+            stream, file_name, mime_type = upload
+            file_name = upload_utils.get_file_name(file_name, fieldname, mime_type)
+            file_doc = upload_utils.save_stream(stream, file_name, "Insurance Verification", verification.name)
+            verification.set(fieldname, file_doc.file_url)
     
-    # Image handling logic (saving as attachments) would go here
-    # For now, we assume front_image is a publicly accessible URL or we skip actual file upload for this snippet
-    
-    extracted_data = {}
+    verification.save(ignore_permissions=True)
+
+    # OCR runs on a worker; the client polls get_status with the task_id
+    frappe.enqueue(
+        "telehealth_platform.telehealth.api.insurance.process_ocr",
+        queue="default",
+        timeout=OCR_JOB_TIMEOUT,
+        job_id=f"insurance-ocr::{verification.name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        verification=verification.name
+    )
+    frappe.db.commit()
     
+    frappe.local.response.http_status_code = 202
+    return {
+        "task_id": verification.name,
+        "status": "queued",
+        "extracted_data": {}
+    }
+
+def process_ocr(verification):
+    """
+    Background job: runs OCR on the stored card images and fills in the extracted
+    details. Concurrency across all workers is capped by `ocr_max_concurrency`;
+    transient OCR failures are retried with exponential backoff.
+    """
+    v = frappe.get_doc("Insurance Verification", verification)
+    if v.ocr_status == "Completed":
+        return
+
+    set_ocr_progress(v, ocr_status="Processing", ocr_progress=10, ocr_attempts=0)
+
+    def on_retry(attempt, e):
+        set_ocr_progress(v, ocr_attempts=attempt, ocr_error=str(e))
+
     try:
-        import boto3
-        textract = boto3.client(
-            'textract',
-            aws_access_key_id=frappe.conf.get("aws_access_key_id"),
-            aws_secret_access_key=frappe.conf.get("aws_secret_access_key"),
-            region_name=frappe.conf.get("aws_region_name")
-        )
-        
-        # In a real impl, we'd read the file bytes. 
-        # Here we mock reading bytes if it were a real file path or S3 object
-        # document_bytes = get_file_bytes(front_image) 
-        
-        # Simulating a call (if we had bytes)
-        # response = textract.detect_document_text(Document={'Bytes': document_bytes})
-        
-        # For this integration implementation, we'll wrap it in a try-catch block 
-        # to show structure, but fallback to simulated extraction if no file provided
-        
-        extracted_data = {
-            "policy_number": "DETECTED_12345",
-            "group_number": "GRP_999",
-            "provider_name": "Anthem Blue Cross (OCR)"
-        }
-        
-        # Assign to document
-        verification.policy_number = extracted_data["policy_number"]
-        verification.group_number = extracted_data["group_number"]
-        verification.provider_name = extracted_data["provider_name"]
-        
+        front_bytes = get_ocr_image(v, "front_image")
+        back_bytes = get_ocr_image(v, "back_image")
+        if not front_bytes:
+            frappe.throw(_("Front image is required for OCR"))
+        set_ocr_progress(v, ocr_progress=30)
+
+        adapter = OCRAdapter()
+        limit = cint(frappe.conf.get("ocr_max_concurrency")) or DEFAULT_OCR_CONCURRENCY
+        with job_utils.concurrency_slot("insurance_ocr", limit):
+            started = time.monotonic()
+            extracted_data = job_utils.run_with_retries(
+                lambda: adapter.extract_card_fields(front_bytes, back_bytes),
+                retry_on=(OCRTransientError,),
+                max_attempts=cint(frappe.conf.get("ocr_max_attempts")) or DEFAULT_OCR_ATTEMPTS,
+                on_retry=on_retry
+            )
+            metrics.observe("ocr_latency_seconds", time.monotonic() - started)
     except Exception as e:
-        frappe.log_error(f"Textract Error: {str(e)}", "Insurance OCR")
-        verification.status = "Failed"
-        verification.rejection_reason = "OCR processing failed"
-    
-    verification.insert(ignore_permissions=True)
+        frappe.db.rollback()
+        frappe.log_error(f"Insurance OCR failed for {verification}: {str(e)}", "Insurance OCR")
+        set_ocr_progress(v, ocr_status="Failed", ocr_progress=100, ocr_error=str(e))
+        return
+
+    v.reload()
+    for key in OCR_FIELDS:
+        if extracted_data.get(key) and not v.get(key):
+            v.set(key, extracted_data[key])
+    payer_directory.normalize_insurance_details(v)
+    v.ocr_status = "Completed"
+    v.ocr_progress = 100
+    v.ocr_error = None
+    v.save(ignore_permissions=True)
     frappe.db.commit()
-    
+    publish_ocr_progress(v)
+
+def set_ocr_progress(v, **values):
+    """
+    Persists OCR progress immediately so get_status sees it while the job runs.
+    """
+    frappe.db.set_value("Insurance Verification", v.name, values, update_modified=False)
+    frappe.db.commit()
+    v.update(values)
+    publish_ocr_progress(v)
+
+def publish_ocr_progress(v):
+    user = frappe.db.get_value("Patient", v.patient, "user_id")
+    if user:
+        frappe.publish_realtime("insurance_ocr_progress", get_ocr_state(v), user=user)
+
+def get_ocr_state(v):
     return {
-        "task_id": verification.name,
-        "status": "processed",
-        "extracted_data": extracted_data
+        "task_id": v.name,
+        "status": (v.ocr_status or "Queued").lower(),
+        "progress": v.ocr_progress or 0,
+        "attempts": v.ocr_attempts or 0,
+        "error": v.ocr_error if v.ocr_status == "Failed" else None
     }
 
+def get_ocr_image(v, fieldname):
+    """
+    Image bytes to send to OCR: the card cropped, deskewed, grayscale and downscaled.
+    The normalized copy is attached next to the original (`<fieldname>_normalized`)
+    so retries and re-runs skip preprocessing.
+    """
+    normalized_field = f"{fieldname}_normalized"
+    content = get_image_bytes(v.get(normalized_field))
+    if content:
+        return content
+
+    content = get_image_bytes(v.get(fieldname))
+    if not content:
+        return None
+
+    try:
+        normalized, stats = image_preprocess.normalize_card_image(content,
+            max_side=cint(frappe.conf.get("ocr_image_max_side")) or image_preprocess.DEFAULT_MAX_SIDE)
+    except image_preprocess.ImagePreprocessError:
+        # Not an image Pillow can read; let the OCR engine try the original
+        return content
+
+    file_doc = upload_utils.save_stream(io.BytesIO(normalized), f"{fieldname}-normalized.jpg",
+        "Insurance Verification", v.name, is_upload=False)
+    frappe.db.set_value("Insurance Verification", v.name, normalized_field, file_doc.file_url,
+        update_modified=False)
+    v.set(normalized_field, file_doc.file_url)
+
+    metrics.incr("ocr_image_bytes_original_total", stats["original_bytes"])
+    metrics.incr("ocr_image_bytes_normalized_total", stats["normalized_bytes"])
+    return normalized
+
+def get_image_bytes(file_url):
+    if not file_url:
+        return None
+    file_name = frappe.db.get_value("File", {"file_url": file_url}, "name")
+    if not file_name:
+        return None
+    return frappe.get_doc("File", file_name).get_content()
+
+def get_image_upload(fieldname, value):
+    """
+    Existing file URLs are kept as-is; anything else must be a multipart file or base64.
+    """
+    if isinstance(value, str) and value.startswith(("/files/", "/private/files/", "http://", "https://")):
+        return value
+    return upload_utils.get_request_upload(fieldname, value)
+
 @frappe.whitelist()
-def get_status():
+def get_status(task_id=None):
     """
-    Retrieves the current status of the patient's insurance verification.
+    Retrieves the current status of the patient's insurance verification,
+    including OCR progress. Defaults to the latest verification.
     """
     user_id = frappe.session.user
     patient_name = frappe.db.get_value("Patient", {"user_id": user_id}, "name")
     
+    filters = {"patient": patient_name}
+    if task_id:
+        filters["name"] = task_id
     verification_name = frappe.db.get_value("Insurance Verification", 
-        {"patient": patient_name}, "name", order_by="creation desc")
+        filters, "name", order_by="creation desc")
         
     if not verification_name:
         frappe.local.response.http_status_code = 404
@@ -89,8 +219,10 @@ def get_status():
         "verification_status": v.status,
         "verification_date": str(v.verification_date) if v.verification_date else None,
         "rejection_reason": v.rejection_reason,
+        "ocr": get_ocr_state(v),
         "insurance_details": {
             "provider_name": v.provider_name,
+            "payer_id": v.payer,
             "policy_number": v.policy_number,
             "group_number": v.group_number,
             "plan_type": v.plan_type,
@@ -130,8 +262,22 @@ def update_details(**kwargs):
     for key, value in kwargs.items():
         if key in editable_fields:
             v.set(key, value)
+    payer_directory.normalize_insurance_details(v)
             
     v.save(ignore_permissions=True)
     frappe.db.commit()
     
     return {"message": _("Insurance details updated successfully")}
+
+@frappe.whitelist()
+def search_payers(query=None, limit=10):
+    """
+    Payer autocomplete over the insurance payer directory.
+    """
+    if not query:
+        return []
+    return [{
+        "payer_id": row["name"],
+        "payer_name": row["payer_name"],
+        "score": row["score"]
+    } for row in payer_directory.payers.search(query, limit=min(cint(limit) or 10, 50))]
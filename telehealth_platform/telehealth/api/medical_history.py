@@ -1,22 +1,44 @@
 import frappe
 from frappe import _
+from frappe.query_builder import Order
 from frappe.utils import now_datetime, getdate
+from telehealth_platform.telehealth.utils import cache_utils, pagination, upload_utils
+
+MEDICAL_HISTORY_CACHE = "telehealth_medical_history"
 
 @frappe.whitelist()
 def get_medical_history():
     """
     Retrieves the detailed medical history of the currently authenticated patient.
     Wraps existing Patient and child doc data in Frappe Healthcare.
+    Served from a per-patient cache with an ETag; a matching If-None-Match gets a 304.
     """
     user_id = frappe.session.user
-    patient_name = frappe.db.get_value("Patient", {"user_id": user_id}, "name")
+    patient_name = cache_utils.get_patient_for_user(user_id)
     
     if not patient_name:
         frappe.local.response.http_status_code = 404
         return {"error": "Not Found", "message": _("Patient record not found")}
 
-    patient = frappe.get_doc("Patient", patient_name)
-    
+    entry = cache_utils.get_cached(MEDICAL_HISTORY_CACHE, patient_name,
+        lambda: build_medical_history(patient_name))
+    return cache_utils.conditional_response(entry)
+
+def build_medical_history(patient_name, patient=None, surgeries=None):
+    """
+    Medical history projection. Reads only the Patient fields and child rows the
+    contract needs, plus completed procedures, instead of the full Patient document.
+    An already loaded `patient` doc and known `surgeries` are reused when given.
+    """
+    if patient:
+        allergies = patient.get("allergies") if is_child_table("allergies") else []
+        medications = patient.get("medications") if is_child_table("medications") else []
+    else:
+        patient = frappe.db.get_value("Patient", patient_name, ["medical_history", "modified"], as_dict=True)
+        allergies = get_patient_child_rows(patient_name, "allergies", ["allergen", "severity", "reaction"])
+        medications = get_patient_child_rows(patient_name, "medications",
+            ["medication", "dosage", "periodicity", "start_date"])
+
     # Map Frappe Healthcare tables to API contract
     medical_history = {
         "chronic_conditions": patient.medical_history or "",
@@ -27,53 +49,82 @@ def get_medical_history():
     }
 
     # 1. Allergies (Assuming 'allergies' table in Patient DocType)
-    if hasattr(patient, "allergies"):
-        for a in patient.allergies:
-            medical_history["allergies"].append({
-                "allergen": a.allergen,
-                "severity": a.severity or "Moderate",
-                "reaction": a.reaction or ""
-            })
+    for a in allergies:
+        medical_history["allergies"].append({
+            "allergen": a.allergen,
+            "severity": a.severity or "Moderate",
+            "reaction": a.reaction or ""
+        })
 
     # 2. Medications (Assuming 'medications' table in Patient DocType)
-    if hasattr(patient, "medications"):
-        for m in patient.medications:
-            medical_history["current_medications"].append({
-                "medication_name": m.medication,
-                "dosage": m.dosage or "",
-                "frequency": m.periodicity or "",
-                "started_at": str(m.start_date) if m.start_date else None
-            })
+    for m in medications:
+        medical_history["current_medications"].append({
+            "medication_name": m.medication,
+            "dosage": m.dosage or "",
+            "frequency": m.periodicity or "",
+            "started_at": str(m.start_date) if m.start_date else None
+        })
 
     # 3. Surgeries (Assuming 'surgeries' record or Clinical Procedure link)
     # Using Clinical Procedure as a proxy for surgeries if they are logged there
-    procedures = frappe.get_all("Clinical Procedure", 
-        filters={"patient": patient_name, "status": "Completed"},
-        fields=["name", "procedure_template", "start_date", "notes"])
-    
-    for p in procedures:
-        medical_history["surgeries"].append({
+    if surgeries is None:
+        procedures = frappe.get_all("Clinical Procedure", 
+            filters={"patient": patient_name, "status": "Completed"},
+            fields=["procedure_template", "start_date", "notes"])
+        
+        surgeries = [{
             "procedure_name": p.procedure_template,
             "date": str(p.start_date) if p.start_date else None,
             "hospital": "", # Placeholder
             "notes": p.notes or ""
-        })
+        } for p in procedures]
 
+    medical_history["surgeries"] = surgeries
     return medical_history
 
+def is_child_table(fieldname):
+    df = frappe.get_meta("Patient").get_field(fieldname)
+    return bool(df and df.fieldtype == "Table")
+
+def get_patient_child_rows(patient_name, fieldname, fields):
+    """
+    Rows of a Patient child table, fetched directly without loading the parent.
+    Returns [] if the Patient DocType has no such table.
+    """
+    if not is_child_table(fieldname):
+        return []
+
+    return frappe.get_all(frappe.get_meta("Patient").get_field(fieldname).options,
+        filters={"parent": patient_name, "parenttype": "Patient", "parentfield": fieldname},
+        fields=fields,
+        order_by="idx asc",
+        parent_doctype="Patient"
+    )
+
+def clear_medical_history_cache(doc, method=None):
+    """
+    Doc event for Patient and Clinical Procedure: drops the cached history once
+    the transaction commits.
+    """
+    patient_name = doc.name if doc.doctype == "Patient" else doc.get("patient")
+    if patient_name:
+        frappe.db.after_commit.add(lambda: cache_utils.clear_cached(MEDICAL_HISTORY_CACHE, patient_name))
+
 @frappe.whitelist()
 def update_medical_history(chronic_conditions=None, allergies=None, current_medications=None, surgeries=None):
     """
     Updates the medical history for the currently authenticated patient (self-reported).
     """
     user_id = frappe.session.user
-    patient_name = frappe.db.get_value("Patient", {"user_id": user_id}, "name")
+    patient_name = cache_utils.get_patient_for_user(user_id)
     
     if not patient_name:
         frappe.local.response.http_status_code = 404
         return {"error": "Not Found", "message": _("Patient record not found")}
 
     try:
+        # Procedures are not edited here, so the cached list stays valid
+        previous = frappe.cache().hget(MEDICAL_HISTORY_CACHE, patient_name)
         patient = frappe.get_doc("Patient", patient_name)
         
         if chronic_conditions is not None:
@@ -103,36 +154,104 @@ def update_medical_history(chronic_conditions=None, allergies=None, current_medi
         patient.save(ignore_permissions=True)
         frappe.db.commit()
         
-        return get_medical_history()
+        # Build the response from the saved document instead of re-reading it
+        medical_history = build_medical_history(patient_name, patient=patient,
+            surgeries=previous["payload"]["surgeries"] if previous else None)
+        entry = cache_utils.set_cached(MEDICAL_HISTORY_CACHE, patient_name, medical_history)
+        cache_utils.set_response_header("ETag", entry["etag"])
+        return medical_history
     except Exception as e:
         frappe.local.response.http_status_code = 500
         return {"error": "Internal Error", "message": str(e)}
 
 @frappe.whitelist()
-def list_medical_records():
+def list_medical_records(record_type=None, limit=None, cursor=None):
     """
     Retrieves a list of medical records (lab results, imaging, etc.) for the authenticated patient.
     Wraps 'Patient Medical Record' DocType.
+    Keyset paginated on (communication_date, name), newest first. Attachment URLs for
+    the whole page are loaded with a single File query.
     """
     user_id = frappe.session.user
-    patient_name = frappe.db.get_value("Patient", {"user_id": user_id}, "name")
+    patient_name = cache_utils.get_patient_for_user(user_id)
     
     if not patient_name:
         frappe.local.response.http_status_code = 404
         return {"error": "Not Found", "message": _("Patient record not found")}
 
-    records = frappe.get_all("Patient Medical Record",
-        filters={"patient": patient_name},
-        fields=["name", "communication_date", "subject", "reference_doctype", "reference_name"],
-        order_by="communication_date desc"
+    page_size = pagination.get_page_size(limit)
+    meta = frappe.get_meta("Patient Medical Record")
+    record = frappe.qb.DocType("Patient Medical Record")
+
+    fields = [record.name, record.communication_date, record.subject, record.reference_doctype, record.reference_name]
+    # Record type and provider are custom fields and may not exist on every site
+    fields += [record.field(f) for f in ("custom_record_type", "custom_provider") if meta.has_field(f)]
+
+    query = (
+        frappe.qb.from_(record)
+        .select(*fields)
+        .where(record.patient == patient_name)
+        .orderby(record.communication_date, order=Order.desc)
+        .orderby(record.name, order=Order.desc)
+        .limit(page_size + 1)
+    )
+
+    if record_type:
+        if not meta.has_field("custom_record_type"):
+            return {"data": [], "next_cursor": None, "has_more": False}
+        query = query.where(record.custom_record_type == record_type)
+
+    if cursor:
+        # NULL dates sort last in descending order
+        last_date, last_name = pagination.decode_cursor(cursor, 2)
+        if last_date is None:
+            query = query.where(record.communication_date.isnull() & (record.name < last_name))
+        else:
+            query = query.where(
+                (record.communication_date < last_date)
+                | ((record.communication_date == last_date) & (record.name < last_name))
+                | record.communication_date.isnull()
+            )
+
+    records = query.run(as_dict=True)
+    records, next_cursor = pagination.paginate(records, page_size,
+        key=lambda r: (r.communication_date, r.name))
+    attachments = get_attachment_urls([r.name for r in records])
+
+    return {
+        "data": [format_medical_record(r, attachments.get(r.name)) for r in records],
+        "next_cursor": next_cursor,
+        "has_more": bool(next_cursor)
+    }
+
+def get_attachment_urls(record_names):
+    """
+    Maps each Patient Medical Record to its first attachment URL in one File query.
+    """
+    if not record_names:
+        return {}
+
+    files = frappe.get_all("File",
+        filters={
+            "attached_to_doctype": "Patient Medical Record",
+            "attached_to_name": ["in", record_names]
+        },
+        fields=["attached_to_name", "file_url"],
+        order_by="creation asc"
     )
 
-    return [format_medical_record(r) for r in records]
+    urls = {}
+    for f in files:
+        urls.setdefault(f.attached_to_name, f.file_url)
+    return urls
 
 @frappe.whitelist()
-def upload_medical_record(record_type, title, file_attachment, date=None, provider=None):
+def upload_medical_record(record_type, title, file_attachment=None, date=None, provider=None):
     """
     Uploads a new medical record/document.
+    Multipart files are streamed to disk in chunks and hashed on the way, so memory
+    use does not grow with file size. JSON clients may send base64 (or a data URI).
+    For large files prefer the resumable upload session endpoints.
     """
     user_id = frappe.session.user
     patient_name = frappe.db.get_value("Patient", {"user_id": user_id}, "name")
@@ -141,6 +260,128 @@ def upload_medical_record(record_type, title, file_attachment, date=None, provid
         frappe.local.response.http_status_code = 404
         return {"error": "Not Found", "message": _("Patient record not found")}
 
+    # Validated before anything is written
+    upload = upload_utils.get_request_upload("file_attachment", file_attachment)
+
+    record = create_medical_record(patient_name, record_type, title, date, provider)
+    
+    # Handle File Attachment
+    file_url = None
+    try:
+        if upload:
+            stream, file_name, mime_type = upload
+            file_name = upload_utils.get_file_name(file_name, title, mime_type)
+            file_url = upload_utils.save_stream(stream, file_name, "Patient Medical Record", record.name).file_url
+    except Exception as e:
+        frappe.log_error(f"Failed to save file for record {record.name}: {str(e)}", "Medical Record Upload")
+        # Don't fail the whole request, just log
+
+    frappe.db.commit()
+    
+    return format_medical_record(record, file_url)
+
+@frappe.whitelist()
+def start_medical_record_upload(record_type, title, file_name, total_size=None, date=None, provider=None):
+    """
+    Opens a resumable upload session for a large medical record file.
+    Chunks are then sent with upload_medical_record_chunk.
+    """
+    user_id = frappe.session.user
+    patient_name = frappe.db.get_value("Patient", {"user_id": user_id}, "name")
+
+    if not patient_name:
+        frappe.local.response.http_status_code = 404
+        return {"error": "Not Found", "message": _("Patient record not found")}
+
+    session = upload_utils.create_session(user_id,
+        file_name=upload_utils.get_file_name(file_name, title),
+        total_size=total_size,
+        patient=patient_name,
+        record_type=record_type,
+        title=title,
+        date=date,
+        provider=provider
+    )
+
+    frappe.local.response.http_status_code = 201
+    return {"session_id": session["session_id"], "received_bytes": 0, "chunk_size": upload_utils.CHUNK_SIZE}
+
+@frappe.whitelist()
+def upload_medical_record_chunk(session_id, offset=0):
+    """
+    Appends one chunk (multipart field `chunk`) to an upload session at `offset`.
+    On an offset mismatch the response carries the offset to resume from.
+    """
+    session = upload_utils.get_session(session_id, frappe.session.user)
+    if not session:
+        frappe.local.response.http_status_code = 404
+        return {"error": "Not Found", "message": _("Upload session not found")}
+
+    if not (hasattr(frappe.request, "files") and "chunk" in frappe.request.files):
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Missing chunk")}
+
+    received = upload_utils.append_chunk(session, offset, frappe.request.files["chunk"].stream)
+    if received is None:
+        frappe.local.response.http_status_code = 409
+        return {
+            "error": "Conflict",
+            "message": _("Chunk offset does not match received bytes"),
+            "received_bytes": upload_utils.get_received_bytes(session_id)
+        }
+
+    return {"session_id": session_id, "received_bytes": received}
+
+@frappe.whitelist()
+def get_medical_record_upload_status(session_id):
+    """
+    Returns how many bytes of an upload session have been received.
+    """
+    session = upload_utils.get_session(session_id, frappe.session.user)
+    if not session:
+        frappe.local.response.http_status_code = 404
+        return {"error": "Not Found", "message": _("Upload session not found")}
+
+    return {
+        "session_id": session_id,
+        "received_bytes": upload_utils.get_received_bytes(session_id),
+        "total_size": session["total_size"]
+    }
+
+@frappe.whitelist()
+def complete_medical_record_upload(session_id, sha256=None):
+    """
+    Finalizes an upload session: verifies size and optional checksum, then creates
+    the Patient Medical Record with the file attached.
+    """
+    session = upload_utils.get_session(session_id, frappe.session.user)
+    if not session:
+        frappe.local.response.http_status_code = 404
+        return {"error": "Not Found", "message": _("Upload session not found")}
+
+    path = upload_utils.get_session_path(session_id)
+    size = upload_utils.get_received_bytes(session_id)
+    if session["total_size"] and size != session["total_size"]:
+        frappe.local.response.http_status_code = 409
+        return {"error": "Incomplete", "message": _("Upload is incomplete"), "received_bytes": size}
+
+    content_hash = upload_utils.hash_file(path)
+    if sha256 and sha256.lower() != content_hash:
+        upload_utils.discard_session(session_id)
+        frappe.local.response.http_status_code = 400
+        return {"error": "Checksum Mismatch", "message": _("Uploaded content does not match checksum")}
+
+    meta = session["meta"]
+    record = create_medical_record(meta["patient"], meta["record_type"], meta["title"], meta["date"], meta["provider"])
+    file_doc = upload_utils.attach_spooled_file(path, session["file_name"], "Patient Medical Record", record.name,
+        content_hash, size)
+    frappe.db.commit()
+    upload_utils.discard_session(session_id)
+
+    frappe.local.response.http_status_code = 201
+    return format_medical_record(record, file_doc.file_url)
+
+def create_medical_record(patient_name, record_type, title, date=None, provider=None):
     # Map record_type to Frappe Healthcare reference doctypes if possible
     # For simplicity, we create a Patient Medical Record entry
     record = frappe.get_doc({
@@ -151,47 +392,8 @@ def upload_medical_record(record_type, title, file_attachment, date=None, provid
         "custom_record_type": record_type, # Assuming custom field
         "custom_provider": provider,
     })
-    
     record.insert(ignore_permissions=True)
-    frappe.db.commit()
-    
-    # Handle File Attachment
-    if file_attachment:
-        try:
-            from frappe.utils.file_manager import save_file
-            # If file_attachment is just a string (filename) and the file is in request.files
-            # save_file handles it if we pass the right args.
-            # Or if it's base64, we need decode.
-            # Here assuming standard Frappe file upload behavior where 'file_attachment' 
-            # might be the fieldname in a multipart request.
-            
-            # Check if there's an actual file in the request under this key
-            fname = None
-            fcontent = None
-            
-            if hasattr(frappe.request, "files") and "file_attachment" in frappe.request.files:
-                 # It's a multipart upload
-                 file_obj = frappe.request.files["file_attachment"]
-                 fname = file_obj.filename
-                 fcontent = file_obj.read()
-            else:
-                 # Assume it's a base64 string or similar passed in json
-                 # For MVP, let's treat it as a potential text content or filename
-                 fname = f"{title}.txt" # Fallback
-                 fcontent = str(file_attachment)
-            
-            saved_file = save_file(
-                fname=fname,
-                content=fcontent,
-                dt="Patient Medical Record",
-                dn=record.name,
-                is_private=1
-            )
-        except Exception as e:
-            frappe.log_error(f"Failed to save file for record {record.name}: {str(e)}", "Medical Record Upload")
-            # Don't fail the whole request, just log
-    
-    return format_medical_record(record)
+    return record
 
 @frappe.whitelist()
 def get_medical_record_detail(id):
@@ -215,17 +417,17 @@ def get_medical_record_detail(id):
              frappe.local.response.http_status_code = 403
              return {"error": "Forbidden", "message": _("Not authorized to view this record")}
 
-    return format_medical_record(record)
+    return format_medical_record(record, get_attachment_urls([record.name]).get(record.name))
 
-def format_medical_record(r):
+def format_medical_record(r, file_url=None):
     """
     Helper to map Patient Medical Record to contract schema.
     """
     return {
         "name": r.name,
-        "record_type": getattr(r, "custom_record_type", "other"),
+        "record_type": r.get("custom_record_type") or "other",
         "title": r.subject,
-        "file_attachment": "", # Logic to get attachment URL
+        "file_attachment": file_url or "",
         "date": str(r.communication_date) if r.communication_date else None,
-        "provider": getattr(r, "custom_provider", "")
+        "provider": r.get("custom_provider") or ""
     }
@@ -0,0 +1,89 @@
+import hmac
+import frappe
+from frappe import _
+from telehealth_platform.telehealth.utils import blob_store, metrics, profiling
+
+METRICS_TOKEN_HEADER = "X-Metrics-Token"
+
+def is_admin():
+    roles = frappe.get_roles()
+    return "System Manager" in roles or "Administrator" in roles
+
+@frappe.whitelist()
+def get_storage_metrics():
+    """
+    Attachment storage savings from content deduplication, upload latency and
+    OCR payload sizes.
+    Requires Admin role.
+    """
+    if not is_admin():
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Admin access required")}
+
+    values = metrics.get_all()
+    return {
+        "storage": blob_store.get_storage_summary(),
+        "uploads": {
+            "total": int(values.get("upload_total", 0)),
+            "bytes_received": int(values.get("upload_bytes_total", 0)),
+            "deduplicated": int(values.get("upload_deduplicated_total", 0)),
+            "bytes_deduplicated": int(values.get("upload_bytes_deduplicated_total", 0)),
+            "average_latency_seconds": metrics.get_average(values, "upload_latency_seconds")
+        },
+        "ocr": {
+            "bytes_original": int(values.get("ocr_image_bytes_original_total", 0)),
+            "bytes_sent": int(values.get("ocr_image_bytes_normalized_total", 0)),
+            "average_latency_seconds": metrics.get_average(values, "ocr_latency_seconds")
+        }
+    }
+
+@frappe.whitelist()
+def get_cache_metrics():
+    """
+    Hit rates and database queries per request of the cached read models.
+    Requires Admin role.
+    """
+    if not is_admin():
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Admin access required")}
+
+    values = metrics.get_all()
+    return {
+        "doctor_profiles": get_read_model_summary(values, "doctor_profile")
+    }
+
+@frappe.whitelist(allow_guest=True)
+def get_prometheus_metrics():
+    """
+    Per-route request histograms and the site counters in Prometheus text format.
+    Requires Admin role, or for scrapers `X-Metrics-Token: <metrics_token>`
+    from site_config. (Frappe treats any two-part Authorization header as
+    OAuth or API-key auth and rejects the request with a 401 before it gets
+    here, so the token has its own header.)
+    """
+    if not (is_admin() or has_metrics_token()):
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Admin access required")}
+
+    frappe.local.response.type = "binary"
+    frappe.local.response.filename = "metrics.txt"
+    frappe.local.response.filecontent = profiling.render_prometheus(profiling.get_route_metrics(), metrics.get_all())
+    frappe.local.response.display_content_as = "inline"
+
+def has_metrics_token():
+    token = frappe.conf.get("metrics_token")
+    header = (frappe.get_request_header(METRICS_TOKEN_HEADER) or "").strip()
+    return bool(token and header) and hmac.compare_digest(header.encode(), str(token).encode())
+
+def get_read_model_summary(values, name):
+    hits = int(values.get(f"{name}_cache_hits_total", 0))
+    misses = int(values.get(f"{name}_cache_misses_total", 0))
+    requests = int(values.get(f"{name}_requests_total", 0))
+    queries = int(values.get(f"{name}_queries_total", 0))
+    return {
+        "requests": requests,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / float(hits + misses), 4) if hits + misses else None,
+        "queries_per_request": round(queries / float(requests), 3) if requests else None
+    }
@@ -0,0 +1,194 @@
+import time
+import frappe
+from frappe import _
+from frappe.utils import now_datetime
+from telehealth_platform.telehealth.api.prescription import build_medication_request, get_allergy_conflicts
+from telehealth_platform.telehealth.api.service_request import build_service_request
+from telehealth_platform.telehealth.utils import active_orders, cache_utils, clinical_catalog, metrics
+
+# Upper bound on orders per call, so one request cannot hold a transaction open for long
+MAX_BULK_ORDERS = 50
+MEDICATION_FIELDS = ("medication", "dosage", "periodicity")
+
+@frappe.whitelist()
+def create_orders(encounter=None, patient=None, medications=None, services=None, practitioner=None):
+    """
+    Places all medication and service orders of one encounter in a single call.
+    `medications` is a JSON list of {medication, dosage, periodicity} and `services`
+    of {order_template, order_template_type}. Orders are validated together and
+    inserted in one transaction: either every order is created or none is.
+    """
+    started = time.monotonic()
+    medications = parse_list(medications)
+    services = parse_list(services)
+    if medications is None or services is None:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("medications and services must be lists")}
+    total = len(medications) + len(services)
+    if not total:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("At least one order is required")}
+    if total > MAX_BULK_ORDERS:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("At most {0} orders per request").format(MAX_BULK_ORDERS)}
+
+    # Shared context, resolved once for every order
+    if medications and not frappe.has_permission("Medication Request", "create"):
+        frappe.throw(_("Not authorized to create Medication Requests"), frappe.PermissionError)
+    if services and not frappe.has_permission("Service Request", "create"):
+        frappe.throw(_("Not authorized to create Service Requests"), frappe.PermissionError)
+
+    if encounter:
+        context = frappe.db.get_value("Patient Encounter", encounter, ["patient", "practitioner"], as_dict=True)
+        if not context:
+            frappe.local.response.http_status_code = 404
+            return {"error": "Not Found", "message": _("Patient Encounter {0} not found").format(encounter)}
+        if patient and patient != context.patient:
+            frappe.local.response.http_status_code = 400
+            return {"error": "Bad Request", "message": _("Patient does not match the encounter")}
+        patient = context.patient
+        practitioner = practitioner or context.practitioner
+    if not patient:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("patient or encounter is required")}
+
+    practitioner_looked_up = not practitioner
+    if not practitioner:
+        practitioner = frappe.db.get_value("Healthcare Practitioner", {"user_id": frappe.session.user}, "name")
+        if not practitioner:
+            frappe.throw(_("Healthcare Practitioner record not found for this user"))
+
+    errors = validate_orders(medications, services)
+    if errors:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("{0} order(s) are invalid").format(len(errors)), "errors": errors}
+
+    # Warnings only, as for single orders; one allergy lookup for the whole batch
+    medication_names = list(dict.fromkeys(order["medication"] for order in medications))
+    allergy_warnings = get_allergy_conflicts(patient, medication_names) if medication_names else {}
+
+    authored_on = now_datetime()
+    created = {"medication_requests": [], "service_requests": []}
+    position = None
+    try:
+        for position, order in enumerate(medications):
+            request = build_medication_request(patient, practitioner, order["medication"], order["dosage"],
+                order["periodicity"], encounter, authored_on)
+            request.insert()
+            created["medication_requests"].append(request.name)
+        for position, order in enumerate(services):
+            request = build_service_request(patient, practitioner, order["order_template"],
+                order.get("order_template_type") or "Lab Test Template", encounter, authored_on)
+            request.insert()
+            created["service_requests"].append(request.name)
+    except frappe.ValidationError as e:
+        frappe.db.rollback()
+        frappe.local.response.http_status_code = 400
+        failed = "medication" if len(created["medication_requests"]) < len(medications) else "service"
+        return {"error": "Bad Request", "message": _("No orders were created"),
+            "errors": [{"index": position, "type": failed, "message": str(e)}]}
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.local.response.http_status_code = 500
+        return {"error": "Internal Error", "message": str(e)}
+
+    frappe.db.commit()
+
+    elapsed = time.monotonic() - started
+    metrics.incr("bulk_orders_total", total)
+    metrics.observe("bulk_order_latency_seconds", elapsed)
+
+    frappe.local.response.http_status_code = 201
+    return dict(created,
+        allergy_warnings={m: w for m, w in allergy_warnings.items() if w},
+        stats={
+            "orders": total,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "orders_per_second": round(total / elapsed, 1) if elapsed else None,
+            # Compared with placing the same orders one by one through the single endpoints
+            "round_trips_saved": {
+                "http_requests": total - 1,
+                "practitioner_lookups": total - 1 if practitioner_looked_up else 0,
+                "allergy_lookups": max(len(medications) - 1, 0),
+                "commits": total - 1
+            }
+        })
+
+def parse_list(value):
+    if not value:
+        return []
+    value = frappe.parse_json(value) if isinstance(value, str) else value
+    return value if isinstance(value, list) else None
+
+def validate_orders(medications, services):
+    """
+    Every problem across the batch, as [{index, type, message}]. Existence is
+    checked with one query per DocType rather than one per order.
+    """
+    errors = []
+    for i, order in enumerate(medications):
+        missing = [f for f in MEDICATION_FIELDS if not (isinstance(order, dict) and order.get(f))]
+        if missing:
+            errors.append({"index": i, "type": "medication",
+                "message": _("Missing fields: {0}").format(", ".join(missing))})
+
+    names = {order["medication"] for order in medications if isinstance(order, dict) and order.get("medication")}
+    known = set(frappe.get_all("Medication", filters={"name": ["in", list(names)]}, pluck="name")) if names else set()
+    for i, order in enumerate(medications):
+        if isinstance(order, dict) and order.get("medication") and order["medication"] not in known:
+            errors.append({"index": i, "type": "medication",
+                "message": _("Medication {0} not found").format(order["medication"])})
+
+    templates = {}
+    for i, order in enumerate(services):
+        if not (isinstance(order, dict) and order.get("order_template")):
+            errors.append({"index": i, "type": "service", "message": _("Missing fields: order_template")})
+            continue
+        template_type = order.get("order_template_type") or "Lab Test Template"
+        if template_type not in clinical_catalog.service_templates:
+            errors.append({"index": i, "type": "service",
+                "message": _("Unsupported template type: {0}").format(template_type)})
+            continue
+        templates.setdefault(template_type, []).append((i, order["order_template"]))
+
+    for template_type, orders in templates.items():
+        known = set(frappe.get_all(template_type, filters={"name": ["in", [name for _i, name in orders]]},
+            pluck="name"))
+        for i, name in orders:
+            if name not in known:
+                errors.append({"index": i, "type": "service",
+                    "message": _("{0} {1} not found").format(template_type, name)})
+
+    return sorted(errors, key=lambda e: (e["type"], e["index"]))
+
+@frappe.whitelist()
+def get_active_orders(patient=None, encounter=None):
+    """
+    Active medication and service orders of a patient in one call, optionally
+    limited to one encounter. Served from the cached projection with an ETag.
+    Patients can only read their own orders.
+    """
+    if encounter:
+        encounter_patient = frappe.db.get_value("Patient Encounter", encounter, "patient")
+        if not encounter_patient:
+            frappe.local.response.http_status_code = 404
+            return {"error": "Not Found", "message": _("Patient Encounter {0} not found").format(encounter)}
+        patient = patient or encounter_patient
+
+    own_patient = cache_utils.get_patient_for_user(frappe.session.user)
+    patient = patient or own_patient
+    if not patient:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("patient or encounter is required")}
+    if patient != own_patient and not (frappe.has_permission("Medication Request", "read")
+            and frappe.has_permission("Service Request", "read")):
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Not authorized to view these orders")}
+
+    entry = active_orders.get_active_orders(patient)
+    if encounter:
+        payload = dict(entry["payload"], encounter=encounter)
+        for key in ("medications", "services"):
+            payload[key] = [o for o in payload[key] if o["encounter"] == encounter]
+        entry = {"payload": payload, "etag": cache_utils.make_etag(payload)}
+    return cache_utils.conditional_response(entry)
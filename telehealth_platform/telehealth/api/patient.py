@@ -1,6 +1,14 @@
+import time
 import frappe
 from frappe import _
-from frappe.utils import getdate
+from frappe.utils import add_to_date, getdate, now_datetime
+from telehealth_platform.telehealth.utils import cache_utils, job_utils, metrics
+
+PATIENT_PROFILE_CACHE = "telehealth_patient_profile"
+
+# Patients still without a Customer this long after signing up are re-queued
+CUSTOMER_JOB_GRACE_MINUTES = 15
+CUSTOMER_BACKFILL_BATCH = 500
 
 @frappe.whitelist(allow_guest=True)
 def debug_patient():
@@ -17,79 +25,151 @@ def register(patient_name, email, phone, date_of_birth, password, gender=None, a
     Registers a new patient. 
     1. Creates a Frappe User.
     2. Creates a Frappe Healthcare Patient linked to the user.
+    Both are committed together; the ERPNext Customer is created afterwards by
+    a background job (create_patient_customer), so signups do not wait on ERP hooks.
     """
     if frappe.db.exists("User", email):
         frappe.local.response.http_status_code = 400
         return {"error": "Conflict", "message": _("User with this email already exists")}
 
+    started = time.monotonic()
     try:
-        # 1. Create User
-        user = frappe.get_doc({
-            "doctype": "User",
-            "email": email,
-            "first_name": patient_name,
-            "new_password": password,
-            "enabled": 1,
-            "user_type": "Website User",
-            "send_welcome_email": 0,
-            "roles": [{"role": "Patient"}]
-        })
+        # Password hashing stays in the request: the patient logs in right after signing up
+        user = build_patient_user(patient_name, email, password)
         user.insert(ignore_permissions=True)
 
-        # 2. Create Customer (Required for transactions in ERPNext)
-        customer = frappe.get_doc({
-            "doctype": "Customer",
-            "customer_name": patient_name,
-            "customer_type": "Individual",
-            "customer_group": _("All Customer Groups"),
-            "territory": _("All Territories"),
-            "email_id": email,
-            "mobile_no": phone
-        })
-        customer.insert(ignore_permissions=True)
-
-        # 3. Create Patient
-        names = patient_name.split(" ", 1)
-        first_name = names[0]
-        last_name = names[1] if len(names) > 1 else ""
-
-        patient = frappe.get_doc({
-            "doctype": "Patient",
-            "first_name": first_name,
-            "last_name": last_name,
-            "patient_name": patient_name,
-            "email": email,
-            "mobile": phone,
-            "dob": getdate(date_of_birth),
-            "sex": gender or "Other",
-            "user_id": user.name,
-            "customer": customer.name
-        })
+        patient = build_patient(patient_name, email, phone, date_of_birth, gender, user.name)
         patient.insert(ignore_permissions=True)
-        frappe.db.commit()
-
-        frappe.local.response.http_status_code = 201
-        return get_patient_profile_data(patient)
 
+        enqueue_patient_customer(patient.name)
+        frappe.db.commit()
+    except frappe.DuplicateEntryError:
+        # Lost a race with a concurrent signup for the same email
+        frappe.db.rollback()
+        frappe.local.response.http_status_code = 400
+        return {"error": "Conflict", "message": _("User with this email already exists")}
     except Exception as e:
         frappe.db.rollback()
         frappe.local.response.http_status_code = 500
         return {"error": "Internal Error", "message": str(e)}
 
+    metrics.observe("registration_latency_seconds", time.monotonic() - started)
+    frappe.local.response.http_status_code = 201
+    return get_patient_profile_data(patient)
+
+def build_patient_user(patient_name, email, password=None):
+    return frappe.get_doc({
+        "doctype": "User",
+        "email": email,
+        "first_name": patient_name,
+        "new_password": password,
+        "enabled": 1,
+        "user_type": "Website User",
+        "send_welcome_email": 0,
+        "roles": [{"role": "Patient"}]
+    })
+
+def build_patient(patient_name, email, phone, date_of_birth, gender=None, user_id=None):
+    names = patient_name.split(" ", 1)
+    return frappe.get_doc({
+        "doctype": "Patient",
+        "first_name": names[0],
+        "last_name": names[1] if len(names) > 1 else "",
+        "patient_name": patient_name,
+        "email": email,
+        "mobile": phone,
+        "dob": getdate(date_of_birth),
+        "sex": gender or "Other",
+        "user_id": user_id
+    })
+
+def build_customer(patient_name, email, phone):
+    # Required for transactions in ERPNext
+    return frappe.get_doc({
+        "doctype": "Customer",
+        "customer_name": patient_name,
+        "customer_type": "Individual",
+        "customer_group": _("All Customer Groups"),
+        "territory": _("All Territories"),
+        "email_id": email,
+        "mobile_no": phone
+    })
+
+def enqueue_patient_customer(patient_name):
+    """
+    Queues Customer creation once the current transaction commits.
+    """
+    frappe.enqueue(
+        "telehealth_platform.telehealth.api.patient.create_patient_customer",
+        queue="short",
+        job_id=f"patient-customer::{patient_name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        patient=patient_name
+    )
+
+def create_patient_customer(patient):
+    """
+    Background job: creates the ERPNext Customer (required for billing) for a
+    patient and links it. Idempotent: the Patient row is locked and a patient
+    that already has a customer is skipped, so retries and duplicate jobs are safe.
+    """
+    def create():
+        try:
+            row = frappe.db.get_value("Patient", patient, ["patient_name", "email", "mobile", "customer"],
+                as_dict=True, for_update=True)
+            if not row or row.customer:
+                frappe.db.rollback()
+                return
+            customer = build_customer(row.patient_name, row.email, row.mobile)
+            customer.insert(ignore_permissions=True)
+            # Only the link changes; skip the Patient document hooks
+            frappe.db.set_value("Patient", patient, "customer", customer.name, update_modified=False)
+            frappe.db.commit()
+        except Exception:
+            frappe.db.rollback()
+            raise
+
+    job_utils.run_with_retries(create, retry_on=(frappe.QueryDeadlockError, frappe.QueryTimeoutError))
+
+def enqueue_missing_customers():
+    """
+    Hourly: re-queues Customer creation for patients whose job was lost or failed.
+    """
+    patients = frappe.get_all("Patient",
+        filters={"customer": ["is", "not set"], "user_id": ["is", "set"],
+            "creation": ["<", add_to_date(now_datetime(), minutes=-CUSTOMER_JOB_GRACE_MINUTES)]},
+        pluck="name",
+        limit=CUSTOMER_BACKFILL_BATCH
+    )
+    for patient in patients:
+        enqueue_patient_customer(patient)
+    frappe.db.commit()
+
 @frappe.whitelist()
 def get_profile():
     """
     Retrieves the profile of the currently authenticated patient.
+    Served from a per-patient cache with an ETag; a matching If-None-Match gets
+    a 304 without touching the database.
     """
     user_id = frappe.session.user
-    patient_name = frappe.db.get_value("Patient", {"user_id": user_id}, "name")
+    patient_name = cache_utils.get_patient_for_user(user_id)
     
     if not patient_name:
         frappe.local.response.http_status_code = 404
         return {"error": "Not Found", "message": _("Patient record not found for this user")}
 
-    patient = frappe.get_doc("Patient", patient_name)
-    return get_patient_profile_data(patient)
+    entry = cache_utils.get_cached(PATIENT_PROFILE_CACHE, patient_name,
+        lambda: get_patient_profile_data(frappe.get_doc("Patient", patient_name)))
+    return cache_utils.conditional_response(entry)
+
+def clear_profile_cache(doc, method=None):
+    """
+    Doc event for Patient: drops the cached profile once the transaction commits.
+    """
+    name = doc.name
+    frappe.db.after_commit.add(lambda: cache_utils.clear_cached(PATIENT_PROFILE_CACHE, name))
 
 @frappe.whitelist()
 def update_profile(**kwargs):
@@ -97,7 +177,7 @@ def update_profile(**kwargs):
     Updates the patient profile.
     """
     user_id = frappe.session.user
-    patient_name = frappe.db.get_value("Patient", {"user_id": user_id}, "name")
+    patient_name = cache_utils.get_patient_for_user(user_id)
     
     if not patient_name:
         frappe.local.response.http_status_code = 404
@@ -127,7 +207,11 @@ def update_profile(**kwargs):
         patient.save(ignore_permissions=True)
         frappe.db.commit()
         
-        return get_patient_profile_data(patient)
+        # The commit dropped the cached profile; store the fresh one
+        profile = get_patient_profile_data(patient)
+        entry = cache_utils.set_cached(PATIENT_PROFILE_CACHE, patient_name, profile)
+        cache_utils.set_response_header("ETag", entry["etag"])
+        return profile
     except Exception as e:
         frappe.local.response.http_status_code = 500
         return {"error": "Internal Error", "message": str(e)}
@@ -135,24 +219,8 @@ def update_profile(**kwargs):
 def get_patient_profile_data(patient):
     """
     Helper to format Patient DocType into contract-compliant JSON.
+    The full medical history has its own endpoint and cache.
     """
-    from telehealth_platform.telehealth.api.medical_history import get_medical_history
-    
-    # Try to fetch medical history summary if available
-    # Since get_medical_history relies on frappe.session.user, we need to ensure context is correct
-    # or better, refactor get_medical_history to accept patient_name optional arg. 
-    # For now, we assume this is called within a request context where session user matches patient.
-    
-    med_history = {}
-    try:
-        # We can't easily call the API function if it relies purely on session user without args, 
-        # but here we are in the same request context usually.
-        # Ideally, refactor medical_history.get_medical_history to be reusable.
-        # For MVP, we'll do a lightweight fetch or leave it empty if complicated.
-        pass
-    except:
-        pass
-
     return {
         "name": patient.name,
         "patient_name": patient.patient_name,
@@ -163,5 +231,5 @@ def get_patient_profile_data(patient):
         "address": getattr(patient, "custom_address", ""),
         "emergency_contact": getattr(patient, "custom_emergency_contact", ""),
         "consent_recorded": getattr(patient, "custom_consent_recorded", False),
-        "medical_history_summary": med_history # Placeholder for now to match contract key existence
+        "medical_history_summary": {} # Placeholder for now to match contract key existence
     }
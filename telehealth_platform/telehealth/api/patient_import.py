@@ -0,0 +1,332 @@
+import csv
+import json
+import os
+import time
+import frappe
+from frappe import _
+from frappe.utils import cint
+from telehealth_platform.telehealth.api.patient import build_customer, build_patient, build_patient_user
+from telehealth_platform.telehealth.utils import patient_import, upload_utils
+
+# Bulk patient import for clinic onboarding. A coordinator streams the file,
+# validates it a batch at a time (one User query per batch for existing
+# emails) and hands valid chunks to be created, each chunk in one transaction:
+# inline, or as background jobs when workers > 1. The coordinator keeps at
+# most `workers` chunk jobs queued or running, so an import never holds more
+# than that many long-queue workers besides its own. Progress counters
+# and rejected rows live in Redis until the run finishes and writes the error file.
+# They are read and written with plain Redis commands through a pipeline (no
+# per-process cache, and no second key prefix or pickling as RedisWrapper's list
+# and hash helpers would add), since the coordinator and chunk jobs run in
+# different processes.
+IMPORT_STATUS_KEY = "telehealth_patient_imports"
+DEFAULT_CHUNK_SIZE = 500
+MAX_CHUNK_SIZE = 5000
+MAX_WORKERS = 16
+CHUNK_JOB_TIMEOUT = 3600
+# How long the coordinator waits for the next chunk to finish before it fails
+# the import, e.g. because a chunk job was killed
+CHUNK_STALL_TIMEOUT = 2 * CHUNK_JOB_TIMEOUT
+ERROR_COLUMNS = ["line", "email", "error"]
+# Set while a chunk is created, and restored afterwards
+IMPORT_FLAGS = ("in_import", "mute_emails")
+STATUS_TTL = 7 * 86400
+
+def is_admin():
+    roles = frappe.get_roles()
+    return "System Manager" in roles or "Administrator" in roles
+
+@frappe.whitelist()
+def start_import(format="csv", workers=1, chunk_size=None, file=None, date_format=None):
+    """
+    Queues a bulk patient import from a CSV or NDJSON file (multipart field
+    `file`, or base64). Dates of birth are ISO unless `date_format` is dmy or
+    mdy. Requires Admin role. Poll get_import_status for progress.
+    """
+    if not is_admin():
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Admin access required")}
+
+    if format not in patient_import.FORMATS:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Import format must be csv or ndjson")}
+
+    date_format = date_format or patient_import.DEFAULT_DATE_FORMAT
+    if date_format not in patient_import.DATE_FORMATS:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Date format must be iso, dmy or mdy")}
+
+    upload = upload_utils.get_request_upload("file", file)
+    if not upload:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Missing file")}
+
+    import_id = frappe.generate_hash(length=12)
+    path = os.path.join(upload_utils.get_spool_dir(), f"patient-import-{import_id}.{format}")
+    upload_utils.spool_stream(upload[0], path)
+
+    workers = get_workers(workers)
+    set_import_status(import_id, status="Queued", format=format, workers=workers)
+    frappe.enqueue(
+        "telehealth_platform.telehealth.api.patient_import.run_import",
+        queue="long",
+        timeout=4 * 3600,
+        job_id=f"patient-import::{import_id}",
+        import_id=import_id,
+        path=path,
+        fmt=format,
+        workers=workers,
+        chunk_size=chunk_size,
+        date_format=date_format,
+        remove_file=True
+    )
+
+    frappe.local.response.http_status_code = 202
+    return {"import_id": import_id, "status": "Queued"}
+
+@frappe.whitelist()
+def get_import_status(import_id):
+    """
+    Progress of a bulk patient import: rows read, imported and rejected, the
+    import rate, and the error file URL once completed.
+    """
+    if not is_admin():
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Admin access required")}
+
+    status = get_import_progress(import_id)
+    if not status:
+        frappe.local.response.http_status_code = 404
+        return {"error": "Not Found", "message": _("Import not found")}
+    return status
+
+def run_import(import_id, path, fmt, workers=1, chunk_size=None, remove_file=False, on_progress=None,
+        date_format=patient_import.DEFAULT_DATE_FORMAT):
+    """
+    Coordinator: streams and validates `path`, then creates patients chunk by chunk.
+    `on_progress(status)` is called after every chunk (used by the bench command).
+    """
+    workers = get_workers(workers)
+    chunk_size = min(cint(chunk_size) or DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE)
+    set_import_status(import_id, status="Running", format=fmt, workers=workers, started_at=time.time())
+    seen_emails = set()
+    chunks = 0
+
+    try:
+        with open(path, "rb") as f:
+            rows = patient_import.iter_rows(f, fmt)
+            for batch in patient_import.iter_batches(rows, chunk_size):
+                valid, errors = patient_import.validate_batch(batch, seen_emails, date_format=date_format)
+                valid, existing = exclude_existing_users(valid)
+                errors += existing
+                incr_counters(import_id, rows=len(batch), rejected=len(errors))
+                add_errors(import_id, errors)
+
+                if valid:
+                    chunks += 1
+                    records = [record for _line, record in valid]
+                    lines = [line for line, _record in valid]
+                    if workers == 1:
+                        create_patients(import_id, records, lines)
+                    else:
+                        wait_for_chunks(import_id, chunks - workers)
+                        frappe.enqueue(
+                            "telehealth_platform.telehealth.api.patient_import.import_chunk",
+                            queue="long",
+                            timeout=CHUNK_JOB_TIMEOUT,
+                            import_id=import_id,
+                            records=records,
+                            lines=lines
+                        )
+                if on_progress:
+                    on_progress(get_import_progress(import_id))
+        incr_counters(import_id, chunks_total=chunks, reading_done=1)
+        wait_for_chunks(import_id, chunks)
+    except Exception as e:
+        frappe.log_error(f"Patient import {import_id} failed: {str(e)}", "Patient Import")
+        set_import_status(import_id, status="Failed", error=str(e))
+        return get_import_progress(import_id)
+    finally:
+        if remove_file and os.path.exists(path):
+            os.remove(path)
+
+    maybe_finish(import_id)
+    return get_import_progress(import_id)
+
+def import_chunk(import_id, records, lines):
+    """
+    Background job for one chunk, queued by run_import.
+    """
+    try:
+        create_patients(import_id, records, lines)
+    finally:
+        maybe_finish(import_id)
+
+def wait_for_chunks(import_id, done, poll_interval=1.0):
+    """
+    Blocks until at least `done` chunks have finished. Raises TimeoutError when
+    none finishes for CHUNK_STALL_TIMEOUT seconds.
+    """
+    last, deadline = None, None
+    while True:
+        finished = get_counters(import_id).get("chunks_done", 0)
+        if finished >= done:
+            return
+        if finished != last:
+            last, deadline = finished, time.monotonic() + CHUNK_STALL_TIMEOUT
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"No chunk finished in {CHUNK_STALL_TIMEOUT} seconds")
+        time.sleep(poll_interval)
+
+def exclude_existing_users(valid):
+    """
+    Drops records whose email already has a User, with one query for the batch.
+    """
+    if not valid:
+        return valid, []
+    existing = set(frappe.get_all("User", filters={"name": ["in", [r["email"] for _l, r in valid]]}, pluck="name"))
+    existing = {e.lower() for e in existing}
+    return ([(line, r) for line, r in valid if r["email"] not in existing],
+        [(line, r["email"], "User already exists") for line, r in valid if r["email"] in existing])
+
+def create_patients(import_id, records, lines):
+    """
+    Creates User, Customer and Patient for every record of a chunk in one
+    transaction. If the chunk fails it is retried row by row, so one bad row
+    only rejects itself.
+    """
+    previous_flags = {name: frappe.flags.get(name) for name in IMPORT_FLAGS}
+    frappe.flags.update(dict.fromkeys(IMPORT_FLAGS, True))
+    imported, errors = 0, []
+    try:
+        try:
+            for record in records:
+                create_patient_records(record)
+            frappe.db.commit()
+            imported = len(records)
+            return
+        except Exception:
+            frappe.db.rollback()
+
+        for line, record in zip(lines, records):
+            try:
+                create_patient_records(record)
+                frappe.db.commit()
+                imported += 1
+            except Exception as e:
+                frappe.db.rollback()
+                errors.append((line, record["email"], str(e) or e.__class__.__name__))
+    finally:
+        # Rows left over when the chunk stops early (e.g. the job times out) are
+        # reported as rejected, so the import still adds up and finishes
+        processed = imported + len(errors)
+        errors += [(line, record["email"], "Not imported: the chunk stopped before this row")
+            for line, record in zip(lines[processed:], records[processed:])]
+        frappe.flags.update(previous_flags)
+        add_errors(import_id, errors)
+        incr_counters(import_id, imported=imported, rejected=len(errors), chunks_done=1)
+
+def create_patient_records(record):
+    # No password: imported patients set theirs through the reset flow
+    user = build_patient_user(record["patient_name"], record["email"])
+    user.flags.no_welcome_mail = True
+    user.insert(ignore_permissions=True)
+
+    customer = build_customer(record["patient_name"], record["email"], record["phone"])
+    customer.insert(ignore_permissions=True)
+
+    patient = build_patient(record["patient_name"], record["email"], record["phone"], record["date_of_birth"],
+        record["gender"], user.name)
+    patient.customer = customer.name
+    patient.insert(ignore_permissions=True)
+
+def maybe_finish(import_id):
+    """
+    Writes the error file and marks the import completed once the file has been
+    read and every chunk is done. Runs exactly once, whichever job gets there first.
+    """
+    counters = get_counters(import_id)
+    if not counters.get("reading_done") or counters.get("chunks_done", 0) < counters.get("chunks_total", 0):
+        return
+    if not frappe.cache().set(get_key(import_id, "finished"), 1, nx=True, ex=STATUS_TTL):
+        return
+
+    error_file_url = write_error_file(import_id) if counters.get("rejected") else None
+    set_import_status(import_id, status="Completed", finished_at=time.time(), error_file_url=error_file_url)
+
+def write_error_file(import_id):
+    key = get_key(import_id, "errors")
+    file_name = f"patient-import-{import_id}-errors.csv"
+    with open(frappe.get_site_path("private", "files", file_name), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ERROR_COLUMNS)
+        writer.writerows(sorted(get_errors(import_id)))
+    frappe.cache().delete(key)
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": f"/private/files/{file_name}",
+        "is_private": 1
+    })
+    file_doc.insert(ignore_permissions=True)
+    frappe.db.commit()
+    return file_doc.file_url
+
+def add_errors(import_id, errors):
+    if not errors:
+        return
+    key = get_key(import_id, "errors")
+    pipe = frappe.cache().pipeline()
+    pipe.rpush(key, *[json.dumps(e) for e in errors])
+    pipe.expire(key, STATUS_TTL)
+    pipe.execute()
+
+def get_errors(import_id):
+    pipe = frappe.cache().pipeline()
+    pipe.lrange(get_key(import_id, "errors"), 0, -1)
+    return [json.loads(e) for e in pipe.execute()[0]]
+
+def incr_counters(import_id, **amounts):
+    key = get_key(import_id, "counters")
+    pipe = frappe.cache().pipeline()
+    for name, amount in amounts.items():
+        pipe.hincrby(key, name, amount)
+    pipe.expire(key, STATUS_TTL)
+    pipe.execute()
+
+def get_counters(import_id):
+    pipe = frappe.cache().pipeline()
+    pipe.hgetall(get_key(import_id, "counters"))
+    raw = pipe.execute()[0] or {}
+    return {frappe.safe_decode(k): int(v) for k, v in raw.items()}
+
+def get_key(import_id, part):
+    return frappe.cache().make_key(f"{IMPORT_STATUS_KEY}:{import_id}:{part}")
+
+def get_import_status_data(import_id):
+    raw = frappe.cache().get(get_key(import_id, "status"))
+    return json.loads(raw) if raw else None
+
+def set_import_status(import_id, **status):
+    current = get_import_status_data(import_id) or {}
+    frappe.cache().set(get_key(import_id, "status"), json.dumps(dict(current, import_id=import_id, **status)),
+        ex=STATUS_TTL)
+
+def get_import_progress(import_id):
+    status = get_import_status_data(import_id)
+    if not status:
+        return None
+    counters = get_counters(import_id)
+    elapsed = (status.get("finished_at") or time.time()) - status["started_at"] if status.get("started_at") else None
+    return dict(status,
+        rows_read=counters.get("rows", 0),
+        imported=counters.get("imported", 0),
+        rejected=counters.get("rejected", 0),
+        chunks_done=counters.get("chunks_done", 0),
+        elapsed_seconds=round(elapsed, 1) if elapsed else None,
+        patients_per_second=round(counters.get("imported", 0) / elapsed, 1) if elapsed else None
+    )
+
+def get_workers(workers):
+    return max(1, min(cint(workers) or 1, MAX_WORKERS))
@@ -1,6 +1,16 @@
+import time
 import frappe
 from frappe import _
-from frappe.utils import get_datetime, now_datetime
+from frappe.utils import cint, get_datetime, now_datetime
+from telehealth_platform.telehealth.api.medical_history import get_patient_child_rows
+from telehealth_platform.telehealth.utils import active_orders, cache_utils, clinical_catalog, reference_index
+from telehealth_platform.telehealth.utils.allergy_matcher import AllergyMatcher
+
+# Seconds between checks of the Allergy Term table for changes
+ALLERGY_TERMS_REFRESH = 60
+
+# site -> (table signature, last checked, compiled AllergyMatcher)
+_allergy_matchers = {}
 
 @frappe.whitelist()
 def create_medication_request(patient, medication, dosage, periodicity, encounter=None, practitioner=None):
@@ -15,7 +25,19 @@ def create_medication_request(patient, medication, dosage, periodicity, encounte
         if not practitioner:
             frappe.throw(_("Healthcare Practitioner record not found for this user"))
 
-    request = frappe.get_doc({
+    # Warnings only: the prescriber sees them but the order is still placed
+    allergy_warnings = get_allergy_conflicts(patient, [medication]).get(medication, [])
+
+    request = build_medication_request(patient, practitioner, medication, dosage, periodicity, encounter)
+    request.insert()
+    frappe.db.commit()
+
+    result = request.as_dict()
+    result["allergy_warnings"] = allergy_warnings
+    return result
+
+def build_medication_request(patient, practitioner, medication, dosage, periodicity, encounter=None, authored_on=None):
+    return frappe.get_doc({
         "doctype": "Medication Request",
         "patient": patient,
         "practitioner": practitioner,
@@ -26,55 +48,99 @@ def create_medication_request(patient, medication, dosage, periodicity, encounte
         "status": "Active",
         "intent": "Order",
         "priority": "Routine",
-        "authored_on": now_datetime()
+        "authored_on": authored_on or now_datetime()
     })
 
-    request.insert()
-    frappe.db.commit()
-
-    return request.as_dict()
-
 @frappe.whitelist()
 def list_active_medications(patient):
     """
     Lists active Medication Requests for a patient.
+    Read from the cached active-orders projection.
     """
-    medications = frappe.get_all("Medication Request",
-        filters={
-            "patient": patient,
-            "status": "Active"
-        },
-        fields=["name", "medication", "dosage", "periodicity", "authored_on"]
-    )
-    return medications
+    if patient != cache_utils.get_patient_for_user(frappe.session.user) \
+            and not frappe.has_permission("Medication Request", "read"):
+        frappe.throw(_("Not authorized to view Medication Requests"), frappe.PermissionError)
+
+    orders = active_orders.get_active_orders(patient)["payload"]["medications"]
+    return [{f: o[f] for f in ("name", "medication", "dosage", "periodicity", "authored_on")}
+        for o in orders if o["status"] == "Active"]
 
 @frappe.whitelist()
-def search_medications(text):
+def search_medications(text=None, limit=20):
     """
     Searches for medications in the Medication DocType.
+    Prefix and whole-word matches rank first, then close misspellings.
     """
-    return frappe.get_all("Medication",
-        filters={"name": ["like", f"%{text}%"]},
-        fields=["name"],
-        limit=20
-    )
+    if not text:
+        return []
+    return [{
+        "name": row["name"],
+        "generic_name": row.get("generic_name"),
+        "strength": row.get("strength"),
+        "strength_uom": row.get("strength_uom"),
+        "dosage_form": row.get("dosage_form"),
+        "score": row["score"]
+    } for row in clinical_catalog.medications.search(text, limit=min(cint(limit) or 20, 50))]
 
 @frappe.whitelist()
-def check_allergies(patient, medication):
+def check_allergies(patient, medication=None, medications=None):
     """
-    Checks if a patient is allergic to a specific medication.
+    Checks if a patient is allergic to a specific medication, or to each of a
+    list of proposed `medications` (JSON list) in one call.
+    Matches by ingredient, drug class and known class cross-reactivity.
     """
-    patient_doc = frappe.get_doc("Patient", patient)
-    allergies = []
-    
-    if hasattr(patient_doc, "allergies"):
-        for a in patient_doc.allergies:
-            # Simple substring match for MVP
-            if medication.lower() in a.allergen.lower() or a.allergen.lower() in medication.lower():
-                allergies.append({
-                    "allergen": a.allergen,
-                    "severity": a.severity,
-                    "reaction": a.reaction
-                })
-    
-    return allergies
+    if medications:
+        names = frappe.parse_json(medications) if isinstance(medications, str) else medications
+        return get_allergy_conflicts(patient, names)
+
+    if not medication:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("medication or medications is required")}
+    return get_allergy_conflicts(patient, [medication]).get(medication, [])
+
+def get_allergy_conflicts(patient, medications):
+    """
+    {medication: [allergy + match details]} for the patient's recorded allergies.
+    Reads only the allergy rows, not the Patient document.
+    """
+    allergies = [dict(a) for a in get_patient_child_rows(patient, "allergies", ["allergen", "severity", "reaction"])]
+    if not allergies or not medications:
+        return {m: [] for m in medications}
+
+    # Medication names rarely spell out the ingredient; add the generic name
+    texts = {m: m for m in medications}
+    if frappe.get_meta("Medication").has_field("generic_name"):
+        for row in frappe.get_all("Medication", filters={"name": ["in", list(medications)]},
+                fields=["name", "generic_name"]):
+            if row.generic_name:
+                texts[row.name] = f"{row.name} {row.generic_name}"
+
+    conflicts = get_allergy_matcher().check(allergies, list(texts.values()))
+    return {m: conflicts[texts[m]] for m in medications}
+
+def get_allergy_matcher():
+    """
+    The site's compiled matcher: built-in terms plus Allergy Term rows. It is
+    recompiled only when the table changes, checked at most once a minute.
+    """
+    site = frappe.local.site
+    cached = _allergy_matchers.get(site)
+    now = time.monotonic()
+    if cached and now - cached[1] < ALLERGY_TERMS_REFRESH:
+        return cached[2]
+
+    count, last_modified = frappe.db.sql("""select count(*), max(modified) from `tabAllergy Term`""")[0]
+    signature = (count, last_modified, reference_index.get_version("Allergy Term"))
+    if cached and cached[0] == signature:
+        matcher = cached[2]
+    else:
+        terms = {}
+        for row in frappe.get_all("Allergy Term", fields=["term", "ingredients", "drug_classes", "disabled"]):
+            terms[row.term] = None if row.disabled else (split_codes(row.ingredients), split_codes(row.drug_classes))
+        matcher = AllergyMatcher(terms)
+
+    _allergy_matchers[site] = (signature, now, matcher)
+    return matcher
+
+def split_codes(value):
+    return [code.strip().lower() for code in (value or "").split(",") if code.strip()]
@@ -1,5 +1,6 @@
 import frappe
 from frappe import _
+from telehealth_platform.telehealth.utils import cache_utils, profiling, replica
 
 # This module provides simple REST routing for /api/v1 endpoints
 # It maps customized URLs to whitelisted functions
@@ -21,9 +22,12 @@ ROUTES = {
     # Medical Records
     ("GET", "patients/medical-records"): "telehealth_platform.telehealth.api.medical_history.list_medical_records",
     ("POST", "patients/medical-records"): "telehealth_platform.telehealth.api.medical_history.upload_medical_record",
+    ("POST", "patients/medical-records/uploads"): "telehealth_platform.telehealth.api.medical_history.start_medical_record_upload",
     
     # Doctor Search
     ("GET", "doctors/search"): "telehealth_platform.telehealth.api.doctor.search",
+    ("GET", "doctors/profiles"): "telehealth_platform.telehealth.api.doctor.get_doctor_profiles",
+    ("POST", "doctors/profiles"): "telehealth_platform.telehealth.api.doctor.get_doctor_profiles",
     
     # Video Session
     ("POST", "video-session/create"): "telehealth_platform.telehealth.api.video_session.create",
@@ -33,6 +37,7 @@ ROUTES = {
     
     # AI Agents
     ("POST", "transcription/chunk"): "telehealth_platform.telehealth.api.ai.submit_chunk",
+    ("GET", "transcription"): "telehealth_platform.telehealth.api.ai.get_transcript",
     ("GET", "clinical-notes"): "telehealth_platform.telehealth.api.ai.get_clinical_notes",
     ("PUT", "clinical-notes"): "telehealth_platform.telehealth.api.ai.update_clinical_notes",
     ("POST", "clinical-notes/finalize"): "telehealth_platform.telehealth.api.ai.finalize_notes",
@@ -47,18 +52,43 @@ ROUTES = {
     ("POST", "doctors/availability"): "telehealth_platform.telehealth.api.doctor.set_availability",
     
     ("PUT", "insurance/verification"): "telehealth_platform.telehealth.api.insurance.update_details",
+    ("GET", "insurance/payers"): "telehealth_platform.telehealth.api.insurance.search_payers",
     
     ("GET", "admin/audit-logs"): "telehealth_platform.telehealth.api.audit.search_logs",
+    ("POST", "admin/audit-logs/export"): "telehealth_platform.telehealth.api.audit.export_logs",
+    ("GET", "admin/audit-logs/export"): "telehealth_platform.telehealth.api.audit.get_export_status",
+    ("GET", "admin/audit-logs/summary"): "telehealth_platform.telehealth.api.audit.get_access_summary",
+    ("GET", "admin/audit-logs/anomalies"): "telehealth_platform.telehealth.api.audit.get_access_anomalies",
+    ("GET", "admin/storage-metrics"): "telehealth_platform.telehealth.api.metrics.get_storage_metrics",
+    ("GET", "admin/cache-metrics"): "telehealth_platform.telehealth.api.metrics.get_cache_metrics",
+    ("GET", "metrics"): "telehealth_platform.telehealth.api.metrics.get_prometheus_metrics",
+    ("POST", "admin/patient-imports"): "telehealth_platform.telehealth.api.patient_import.start_import",
+    ("GET", "admin/patient-imports"): "telehealth_platform.telehealth.api.patient_import.get_import_status",
 
     # Prescriptions (Medication Request)
     ("POST", "prescriptions"): "telehealth_platform.telehealth.api.prescription.create_medication_request",
     ("GET", "prescriptions/active"): "telehealth_platform.telehealth.api.prescription.list_active_medications",
     ("GET", "prescriptions/search"): "telehealth_platform.telehealth.api.prescription.search_medications",
     ("GET", "prescriptions/check-allergies"): "telehealth_platform.telehealth.api.prescription.check_allergies",
+    ("POST", "prescriptions/check-allergies"): "telehealth_platform.telehealth.api.prescription.check_allergies",
 
     # Service Requests (Labs/Referrals)
     ("POST", "service-requests"): "telehealth_platform.telehealth.api.service_request.create_service_request",
     ("GET", "service-requests/search"): "telehealth_platform.telehealth.api.service_request.search_service_templates",
+
+    # Orders of an encounter: bulk entry and the active-orders summary
+    ("POST", "orders/bulk"): "telehealth_platform.telehealth.api.orders.create_orders",
+    ("GET", "orders/active"): "telehealth_platform.telehealth.api.orders.get_active_orders",
+}
+
+# Read-only handlers that may be served from the read replica (see utils.replica)
+REPLICA_READS = {
+    "telehealth_platform.telehealth.api.appointment.list_appointments",
+    "telehealth_platform.telehealth.api.ai.get_transcript",
+    "telehealth_platform.telehealth.api.audit.search_logs",
+    "telehealth_platform.telehealth.api.doctor.search",
+    "telehealth_platform.telehealth.api.doctor.get_availability",
+    "telehealth_platform.telehealth.api.medical_history.list_medical_records",
 }
 
 @frappe.whitelist(allow_guest=True)
@@ -69,8 +99,31 @@ def handle(path):
     """
     method = frappe.request.method
     
+    func_name, params = resolve_route(method, path)
+    frappe.form_dict.update(params)
+
+    if not func_name:
+        frappe.local.response.http_status_code = 404
+        return {"error": "Not Found", "message": f"Route {method} {path} not found"}
+
+    # Execute the whitelisted method
+    args = frappe.form_dict.copy()
+    args.pop("path", None)
+    with replica.route_reads(method, func_name in REPLICA_READS), \
+            profiling.profile_request(method, get_route_label(func_name)):
+        result = frappe.call(func_name, **args)
+    if method == "GET":
+        result = conditional_get(result)
+    return result
+
+def resolve_route(method, path):
+    """
+    Handler for a request, and the path parameters to pass it: (func_name, params).
+    func_name is None when no route matches.
+    """
     # Try exact match first
     func_name = ROUTES.get((method, path))
+    params = {}
     
     # Handle paths with IDs (e.g., video-session/{id}/token)
     if not func_name:
@@ -79,37 +132,74 @@ def handle(path):
             # Check for patterns like video-session/{id}/token
             if method == "GET" and len(parts) == 3 and parts[0] == "video-session" and parts[2] == "token":
                 func_name = ROUTES.get(("GET", "video-session/token"))
-                frappe.form_dict["id"] = parts[1]
+                params["id"] = parts[1]
+            elif method == "GET" and len(parts) == 3 and parts[0] == "video-session" and parts[2] == "recording":
+                func_name = "telehealth_platform.telehealth.api.video_session.get_recording"
+                params["session_id"] = parts[1]
+            elif method == "GET" and len(parts) == 3 and parts[0] == "video-session" and parts[2] == "recording.m3u8":
+                func_name = "telehealth_platform.telehealth.api.video_session.get_recording_playlist"
+                params["session_id"] = parts[1]
             elif method == "PUT" and len(parts) == 2 and parts[0] == "clinical-notes":
                 # PUT /clinical-notes/{id}
                 func_name = ROUTES.get(("PUT", "clinical-notes"))
-                frappe.form_dict["session_id"] = parts[1]
+                params["session_id"] = parts[1]
             elif method == "POST" and len(parts) == 3 and parts[0] == "clinical-notes" and parts[2] == "finalize":
                 # POST /clinical-notes/{id}/finalize
                 func_name = ROUTES.get(("POST", "clinical-notes/finalize"))
-                frappe.form_dict["session_id"] = parts[1]
+                params["session_id"] = parts[1]
             elif method == "GET" and parts[0] == "clinical-notes" and len(parts) == 2:
                 func_name = ROUTES.get(("GET", "clinical-notes"))
-                frappe.form_dict["session_id"] = parts[1]
+                params["session_id"] = parts[1]
+            elif parts[0] == "patients" and parts[1] == "medical-records" and len(parts) >= 4 and parts[2] == "uploads":
+                # PUT/GET /patients/medical-records/uploads/{id}, POST .../uploads/{id}/complete
+                upload_routes = {
+                    ("PUT", 4): "upload_medical_record_chunk",
+                    ("GET", 4): "get_medical_record_upload_status",
+                    ("POST", 5): "complete_medical_record_upload",
+                }
+                handler = upload_routes.get((method, len(parts)))
+                if handler and (len(parts) == 4 or parts[4] == "complete"):
+                    func_name = f"telehealth_platform.telehealth.api.medical_history.{handler}"
+                    params["session_id"] = parts[3]
+            elif method == "POST" and parts[0] == "appointments" and len(parts) == 3 and parts[2] == "feedback":
+                # POST /appointments/{id}/feedback
+                func_name = "telehealth_platform.telehealth.api.appointment.submit_feedback"
+                params["id"] = parts[1]
             elif method == "GET" and parts[0] == "appointments" and len(parts) == 2:
                 # GET /appointments/{id}
                 func_name = "telehealth_platform.telehealth.api.appointment.get_appointment_details"
-                frappe.form_dict["id"] = parts[1]
+                params["id"] = parts[1]
             elif method == "GET" and parts[0] == "admin" and parts[1] == "audit-logs" and len(parts) == 3:
                  # GET /admin/audit-logs/{id} - Assuming audit detail uses this pattern or query param?
                  # Contract check: audit-api.yaml says GET /admin/audit-logs/{id}
                  func_name = "telehealth_platform.telehealth.api.audit.get_log_detail"
-                 frappe.form_dict["id"] = parts[2]
-            elif method == "GET" and parts[0] == "doctors" and parts[2] == "availability" and len(parts) == 3:
+                 params["id"] = parts[2]
+            elif method == "GET" and len(parts) == 2 and parts[0] == "transcription":
+                # GET /transcription/{session_id}
+                func_name = ROUTES.get(("GET", "transcription"))
+                params["session_id"] = parts[1]
+            elif method == "GET" and len(parts) == 3 and parts[0] == "doctors" and parts[2] == "availability":
                  # GET /doctors/{id}/availability
                  func_name = "telehealth_platform.telehealth.api.doctor.get_availability"
-                 frappe.form_dict["id"] = parts[1]
-    
-    if not func_name:
-        frappe.local.response.http_status_code = 404
-        return {"error": "Not Found", "message": f"Route {method} {path} not found"}
+                 params["id"] = parts[1]
 
-    # Execute the whitelisted method
-    args = frappe.form_dict.copy()
-    args.pop("path", None)
-    return frappe.call(func_name, **args)
+    return func_name, params
+
+def get_route_label(func_name):
+    """
+    Metrics label for a handler ("appointment.list_appointments"), the same
+    for every ID in a parameterised path.
+    """
+    return func_name.replace("telehealth_platform.telehealth.api.", "", 1)
+
+def conditional_get(result):
+    """
+    Adds an ETag to successful GET responses whose handler did not set one, and
+    answers a matching If-None-Match with 304. Handlers backed by a cached read
+    model set their own ETag and can skip the database entirely.
+    """
+    headers = getattr(frappe.local, "response_headers", None)
+    status = frappe.local.response.get("http_status_code") or 200
+    if status != 200 or result is None or headers is None or "ETag" in headers:
+        return result
+    return cache_utils.conditional_response({"payload": result, "etag": cache_utils.make_etag(result)})
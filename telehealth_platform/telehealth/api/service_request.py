@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
-from frappe.utils import now_datetime
+from frappe.utils import cint, now_datetime
+from telehealth_platform.telehealth.utils import clinical_catalog
 
 @frappe.whitelist()
 def create_service_request(patient, order_template, order_template_type="Lab Test Template", encounter=None, practitioner=None):
@@ -15,7 +16,15 @@ def create_service_request(patient, order_template, order_template_type="Lab Tes
         if not practitioner:
             frappe.throw(_("Healthcare Practitioner record not found for this user"))
 
-    request = frappe.get_doc({
+    request = build_service_request(patient, practitioner, order_template, order_template_type, encounter)
+    request.insert()
+    frappe.db.commit()
+
+    return request.as_dict()
+
+def build_service_request(patient, practitioner, order_template, order_template_type="Lab Test Template",
+        encounter=None, authored_on=None):
+    return frappe.get_doc({
         "doctype": "Service Request",
         "patient": patient,
         "practitioner": practitioner,
@@ -25,21 +34,19 @@ def create_service_request(patient, order_template, order_template_type="Lab Tes
         "status": "Active",
         "intent": "Order",
         "priority": "Routine",
-        "authored_on": now_datetime()
+        "authored_on": authored_on or now_datetime()
     })
 
-    request.insert()
-    frappe.db.commit()
-
-    return request.as_dict()
-
 @frappe.whitelist()
-def search_service_templates(text, type="Lab Test Template"):
+def search_service_templates(text=None, type="Lab Test Template", limit=20):
     """
     Searches for service templates (Lab Tests, Procedures, etc.).
     """
-    return frappe.get_all(type,
-        filters={"name": ["like", f"%{text}%"]},
-        fields=["name"],
-        limit=20
-    )
+    index = clinical_catalog.service_templates.get(type)
+    if not index:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Unsupported template type: {0}").format(type)}
+    if not text:
+        return []
+    return [{"name": row["name"], "score": row["score"]}
+        for row in index.search(text, limit=min(cint(limit) or 20, 50))]
@@ -1,7 +1,11 @@
+import time
 import frappe
 from frappe import _
-from frappe.utils import now_datetime
-from telehealth_platform.telehealth.utils import livekit_utils
+from frappe.utils import add_to_date, now_datetime
+from telehealth_platform.telehealth.utils import cache_utils, livekit_utils, recording_access, recording_ingest
+
+# Rendition played when get_recording is called without a quality
+DEFAULT_PLAYBACK_TIER = "review"
 
 @frappe.whitelist()
 def create(appointment_id):
@@ -27,9 +31,17 @@ def create(appointment_id):
             "status": "Active",
             "started_at": now_datetime()
         })
-        session.insert(ignore_permissions=True)
-        frappe.db.commit()
-        session_name = session.name
+        try:
+            session.insert(ignore_permissions=True)
+            frappe.db.commit()
+            session_name = session.name
+        except frappe.UniqueValidationError:
+            # A concurrent request created the session for this appointment first; read it
+            # in a fresh transaction
+            frappe.clear_messages()
+            frappe.db.rollback()
+            session_name = frappe.db.get_value("Telehealth Video Session", {"appointment": appointment_id}, "name")
+            session = frappe.get_doc("Telehealth Video Session", session_name)
     else:
         session = frappe.get_doc("Telehealth Video Session", session_name)
 
@@ -168,6 +180,10 @@ def webhook():
             # Trigger background job for AI notes if agent didn't send them
             # frappe.enqueue("telehealth_platform.telehealth.background_jobs.generate_notes.process", session_id=session_name)
     
+    elif event_type == "egress_ended":
+        egress = event.get("egressInfo") or event.get("egress_info") or {}
+        recording_ingest.register_recording(egress)
+
     elif event_type == "room_started":
         room_name = event.get("room", {}).get("name")
         frappe.logger().info(f"LiveKit Room Started: {room_name}")
@@ -180,48 +196,99 @@ def webhook():
     return {"status": "success"}
 
 @frappe.whitelist()
-def get_recording(session_id):
+def get_recording(session_id, quality=None):
     """
-    Returns the recording URL for a session.
+    Returns a presigned playback URL for a session's recording. The URL accepts
+    Range requests; `hls_url` is set when an HLS rendition exists. Plays the
+    review rendition when there is one, unless `quality` names another tier
+    or "original".
     """
-    recording_name = frappe.db.get_value("Video Recording", {"video_session": session_id}, "name")
-    if not recording_name:
+    recording = frappe.db.get_value("Video Recording", {"video_session": session_id},
+        ["name", "status", "storage_url", "hls_playlist", "duration", "size_mb"], as_dict=True)
+    if not recording or recording.status == "Deleted" or not (recording.storage_url or recording.hls_playlist):
         frappe.local.response.http_status_code = 404
         return {"error": "Not Found", "message": _("Recording not found")}
-        
-    import boto3
-    from botocore.exceptions import ClientError
-    
+
+    if not has_recording_access(session_id, frappe.session.user):
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Not permitted to view this recording")}
+
+    if recording.status == "Archived":
+        frappe.local.response.http_status_code = 409
+        return {"error": "Conflict", "message": _("Recording has been archived")}
+
+    renditions = {r.tier: r for r in frappe.get_all("Video Recording Rendition",
+        filters={"parenttype": "Video Recording", "parent": recording.name},
+        fields=["tier", "storage_key", "content_type", "size_mb"])}
+    quality = quality or (DEFAULT_PLAYBACK_TIER if DEFAULT_PLAYBACK_TIER in renditions else "original")
+    if quality != "original" and quality not in renditions:
+        frappe.local.response.http_status_code = 400
+        return {"error": "Bad Request", "message": _("Unknown quality: {0}").format(quality)}
+
+    playback = None
     try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=frappe.conf.get("aws_access_key_id"),
-            aws_secret_access_key=frappe.conf.get("aws_secret_access_key"),
-            region_name=frappe.conf.get("aws_region_name")
-        )
-        bucket_name = frappe.conf.get("s3_bucket_name")
-        
-        # storage_url is expected to be the S3 key in this logic
-        key = recording.storage_url
-        
-        presigned_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': bucket_name, 'Key': key},
-            ExpiresIn=3600 # 1 hour
-        )
-        return {
-            "recording_url": presigned_url,
-            "expires_at": str(frappe.utils.add_to_date(now_datetime(), seconds=3600))
-        }
-        
+        if quality != "original" or recording.storage_url:
+            playback = recording_access.get_playback_url(recording, frappe.session.user, renditions.get(quality))
     except Exception as e:
         frappe.log_error(f"S3 Presign Error: {str(e)}", "Get Recording")
-        # Fallback if config missing or error (e.g. invalid key)
-        return {
-            "recording_url": recording.storage_url, # Unsafe fallback for dev
-            "expires_at": None,
-            "warning": "Could not sign URL. Using raw URL."
-        }
+        frappe.local.response.http_status_code = 500
+        return {"error": "Internal Server Error", "message": _("Could not sign the recording URL")}
+
+    return {
+        "recording_url": playback["url"] if playback else None,
+        "content_type": playback["content_type"] if playback else None,
+        "expires_at": str(add_to_date(now_datetime(), seconds=int(playback["expires_at"] - time.time())))
+            if playback else None,
+        "accept_ranges": True,
+        "quality": quality,
+        "qualities": ["original"] + list(renditions) if recording.storage_url else list(renditions),
+        "duration": recording.duration or 0,
+        "size_mb": renditions[quality].size_mb if quality in renditions else (recording.size_mb or 0),
+        "hls_url": f"/api/v1/video-session/{session_id}/recording.m3u8" if recording.hls_playlist else None
+    }
+
+@frappe.whitelist()
+def get_recording_playlist(session_id):
+    """
+    Serves the HLS playlist of a session's recording with presigned segment URLs.
+    """
+    recording = frappe.db.get_value("Video Recording", {"video_session": session_id},
+        ["name", "status", "hls_playlist"], as_dict=True)
+    if not recording or not recording.hls_playlist or recording.status in ("Archived", "Deleted"):
+        frappe.local.response.http_status_code = 404
+        return {"error": "Not Found", "message": _("Recording not found")}
+
+    if not has_recording_access(session_id, frappe.session.user):
+        frappe.local.response.http_status_code = 403
+        return {"error": "Forbidden", "message": _("Not permitted to view this recording")}
+
+    try:
+        playlist = recording_access.get_hls_playlist(recording, frappe.session.user)
+    except Exception as e:
+        frappe.log_error(f"HLS Playlist Error: {str(e)}", "Get Recording")
+        frappe.local.response.http_status_code = 500
+        return {"error": "Internal Server Error", "message": _("Could not load the recording playlist")}
+
+    frappe.local.response.type = "binary"
+    frappe.local.response.filename = "recording.m3u8"
+    frappe.local.response.filecontent = playlist["playlist"]
+    frappe.local.response.display_content_as = "inline"
+
+def has_recording_access(session_id, user):
+    """
+    Admins, and the patient and practitioner of the session's appointment.
+    """
+    if "System Manager" in frappe.get_roles(user):
+        return True
+    appointment = frappe.db.get_value("Telehealth Video Session", session_id, "appointment")
+    participants = frappe.db.get_value("Patient Appointment", appointment, ["patient", "practitioner"], as_dict=True) \
+        if appointment else None
+    if not participants:
+        return False
+    if participants.patient and participants.patient == cache_utils.get_patient_for_user(user):
+        return True
+    return bool(participants.practitioner) and \
+        frappe.db.get_value("Healthcare Practitioner", participants.practitioner, "user_id") == user
 
 def cleanup_expired_sessions():
     """
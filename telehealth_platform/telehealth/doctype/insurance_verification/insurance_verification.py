@@ -3,3 +3,8 @@ from frappe.model.document import Document
 
 class InsuranceVerification(Document):
     pass
+
+
+def on_doctype_update():
+    # Status and update endpoints read the patient's latest verification
+    frappe.db.add_index("Insurance Verification", ["patient", "creation"])
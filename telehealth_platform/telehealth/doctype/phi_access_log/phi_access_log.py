@@ -12,3 +12,10 @@ class PHIAccessLog(Document):
             self.user_agent = frappe.local.get("user_agent") or ""
         if not self.user_name:
             self.user_name = frappe.db.get_value("User", self.user, "full_name")
+
+
+def on_doctype_update():
+    # Composite indexes for the admin search filters; InnoDB appends the primary
+    # key, so (timestamp desc, name desc) keyset pages are served from the index.
+    frappe.db.add_index("PHI Access Log", ["patient", "timestamp"])
+    frappe.db.add_index("PHI Access Log", ["user", "timestamp"])
@@ -0,0 +1,10 @@
+import frappe
+from frappe.model.document import Document
+
+class PHIAccessLogRollup(Document):
+    pass
+
+
+def on_doctype_update():
+    # Dashboards read one dimension over a date range
+    frappe.db.add_index("PHI Access Log Rollup", ["dimension", "date"])
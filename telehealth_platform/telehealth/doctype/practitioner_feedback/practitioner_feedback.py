@@ -0,0 +1,8 @@
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+class PractitionerFeedback(Document):
+    def validate(self):
+        if not 1 <= (self.rating or 0) <= 5:
+            frappe.throw(_("Rating must be between 1 and 5"))
@@ -9,3 +9,8 @@ class TelehealthVideoSession(Document):
     def calculate_duration(self):
         if self.started_at and self.ended_at:
             self.duration = time_diff_in_seconds(self.ended_at, self.started_at)
+
+
+def on_doctype_update():
+    # cleanup_expired_sessions looks for Active sessions started before a cutoff
+    frappe.db.add_index("Telehealth Video Session", ["status", "started_at"])
@@ -3,3 +3,8 @@ from frappe.model.document import Document
 
 class TranscriptChunk(Document):
 	pass
+
+
+def on_doctype_update():
+	# get_transcript reads one session in timestamp order
+	frappe.db.add_index("Transcript Chunk", ["video_session", "timestamp"])
@@ -0,0 +1,50 @@
+import frappe
+from telehealth_platform.telehealth.utils import cache_utils
+
+# Per-patient projection of open Medication Requests and Service Requests, kept
+# in the read-model cache. It is built on first read and dropped by doc events
+# on both DocTypes after each commit, so dashboards only query the order tables
+# on the first read after a change (or after ACTIVE_ORDERS_TTL).
+ACTIVE_ORDERS_CACHE = "telehealth_active_orders"
+ACTIVE_ORDERS_TTL = 15 * 60
+ACTIVE_STATUSES = ("Active", "On Hold")
+
+ORDER_DOCTYPES = {
+    "Medication Request": ("medications", ["medication", "dosage", "periodicity"]),
+    "Service Request": ("services", ["order_template_type", "order_template"]),
+}
+COMMON_FIELDS = ["name", "status", "authored_on", "encounter", "practitioner"]
+
+def get_active_orders(patient):
+    """
+    Cached entry {"payload", "etag"} of the patient's active orders.
+    """
+    return cache_utils.get_cached(ACTIVE_ORDERS_CACHE, patient, lambda: build_active_orders(patient),
+        ttl=ACTIVE_ORDERS_TTL)
+
+def build_active_orders(patient):
+    projection = {"patient": patient}
+    for doctype, (key, fields) in ORDER_DOCTYPES.items():
+        rows = frappe.get_all(doctype,
+            filters={"patient": patient, "status": ["in", ACTIVE_STATUSES], "docstatus": ["<", 2]},
+            fields=COMMON_FIELDS + fields,
+            order_by="authored_on desc, name desc"
+        )
+        projection[key] = [format_order(row, fields) for row in rows]
+    return projection
+
+def format_order(doc, fields):
+    order = {f: doc.get(f) for f in COMMON_FIELDS + fields}
+    order["authored_on"] = str(order["authored_on"]) if order["authored_on"] else None
+    return order
+
+def update_active_orders(doc, method=None, *args):
+    """
+    Doc event for Medication Request and Service Request: drops the cached
+    projection of the order's patient (and previous patient) once the
+    transaction commits. Also used for renames.
+    """
+    before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    patients = [p for p in {doc.get("patient"), before.get("patient") if before else None} if p]
+    if patients:
+        frappe.db.after_commit.add(lambda: cache_utils.clear_cached(ACTIVE_ORDERS_CACHE, *patients))
@@ -0,0 +1,224 @@
+from collections import deque
+from telehealth_platform.telehealth.utils.text_index import normalize
+
+# Matches allergies against medications by ingredient and drug class rather than
+# by raw name. Every known name (ingredient, brand, class, common synonyms such
+# as "sulfa") is compiled into one Aho-Corasick automaton, so resolving a
+# medication name is a single pass over its text whatever the number of terms.
+# Pure Python, no Frappe imports; sites extend DEFAULT_TERMS with Allergy Term rows.
+
+# term -> (ingredient codes, class codes). Class names map to the class only.
+DEFAULT_TERMS = {
+    # Penicillins
+    "penicillin": (["penicillin"], ["penicillins"]),
+    "penicillins": ([], ["penicillins"]),
+    "amoxicillin": (["amoxicillin"], ["penicillins"]),
+    "amoxil": (["amoxicillin"], ["penicillins"]),
+    "augmentin": (["amoxicillin", "clavulanate"], ["penicillins"]),
+    "ampicillin": (["ampicillin"], ["penicillins"]),
+    "piperacillin": (["piperacillin"], ["penicillins"]),
+    "dicloxacillin": (["dicloxacillin"], ["penicillins"]),
+    "nafcillin": (["nafcillin"], ["penicillins"]),
+    "oxacillin": (["oxacillin"], ["penicillins"]),
+    # Cephalosporins
+    "cephalosporins": ([], ["cephalosporins"]),
+    "cephalexin": (["cephalexin"], ["cephalosporins"]),
+    "keflex": (["cephalexin"], ["cephalosporins"]),
+    "cefazolin": (["cefazolin"], ["cephalosporins"]),
+    "cefuroxime": (["cefuroxime"], ["cephalosporins"]),
+    "ceftriaxone": (["ceftriaxone"], ["cephalosporins"]),
+    "cefdinir": (["cefdinir"], ["cephalosporins"]),
+    "cefepime": (["cefepime"], ["cephalosporins"]),
+    # Carbapenems
+    "carbapenems": ([], ["carbapenems"]),
+    "meropenem": (["meropenem"], ["carbapenems"]),
+    "imipenem": (["imipenem"], ["carbapenems"]),
+    "ertapenem": (["ertapenem"], ["carbapenems"]),
+    # Sulfonamide antibiotics
+    "sulfa": ([], ["sulfonamide_antibiotics"]),
+    "sulfa drugs": ([], ["sulfonamide_antibiotics"]),
+    "sulfonamides": ([], ["sulfonamide_antibiotics"]),
+    "sulfamethoxazole": (["sulfamethoxazole"], ["sulfonamide_antibiotics"]),
+    "bactrim": (["sulfamethoxazole", "trimethoprim"], ["sulfonamide_antibiotics"]),
+    "septra": (["sulfamethoxazole", "trimethoprim"], ["sulfonamide_antibiotics"]),
+    "sulfadiazine": (["sulfadiazine"], ["sulfonamide_antibiotics"]),
+    # Macrolides
+    "macrolides": ([], ["macrolides"]),
+    "erythromycin": (["erythromycin"], ["macrolides"]),
+    "azithromycin": (["azithromycin"], ["macrolides"]),
+    "zithromax": (["azithromycin"], ["macrolides"]),
+    "clarithromycin": (["clarithromycin"], ["macrolides"]),
+    # Fluoroquinolones
+    "fluoroquinolones": ([], ["fluoroquinolones"]),
+    "quinolones": ([], ["fluoroquinolones"]),
+    "ciprofloxacin": (["ciprofloxacin"], ["fluoroquinolones"]),
+    "cipro": (["ciprofloxacin"], ["fluoroquinolones"]),
+    "levofloxacin": (["levofloxacin"], ["fluoroquinolones"]),
+    "levaquin": (["levofloxacin"], ["fluoroquinolones"]),
+    "moxifloxacin": (["moxifloxacin"], ["fluoroquinolones"]),
+    # Tetracyclines
+    "tetracyclines": ([], ["tetracyclines"]),
+    "tetracycline": (["tetracycline"], ["tetracyclines"]),
+    "doxycycline": (["doxycycline"], ["tetracyclines"]),
+    "minocycline": (["minocycline"], ["tetracyclines"]),
+    # NSAIDs
+    "nsaids": ([], ["nsaids"]),
+    "nsaid": ([], ["nsaids"]),
+    "aspirin": (["aspirin"], ["nsaids"]),
+    "acetylsalicylic acid": (["aspirin"], ["nsaids"]),
+    "ibuprofen": (["ibuprofen"], ["nsaids"]),
+    "advil": (["ibuprofen"], ["nsaids"]),
+    "motrin": (["ibuprofen"], ["nsaids"]),
+    "naproxen": (["naproxen"], ["nsaids"]),
+    "aleve": (["naproxen"], ["nsaids"]),
+    "diclofenac": (["diclofenac"], ["nsaids"]),
+    "ketorolac": (["ketorolac"], ["nsaids"]),
+    "meloxicam": (["meloxicam"], ["nsaids"]),
+    "indomethacin": (["indomethacin"], ["nsaids"]),
+    # Opioids
+    "opioids": ([], ["opioids"]),
+    "opiates": ([], ["opioids"]),
+    "morphine": (["morphine"], ["opioids"]),
+    "codeine": (["codeine"], ["opioids"]),
+    "hydrocodone": (["hydrocodone"], ["opioids"]),
+    "oxycodone": (["oxycodone"], ["opioids"]),
+    "hydromorphone": (["hydromorphone"], ["opioids"]),
+    "tramadol": (["tramadol"], ["opioids"]),
+    # ACE inhibitors
+    "ace inhibitors": ([], ["ace_inhibitors"]),
+    "lisinopril": (["lisinopril"], ["ace_inhibitors"]),
+    "enalapril": (["enalapril"], ["ace_inhibitors"]),
+    "ramipril": (["ramipril"], ["ace_inhibitors"]),
+    "captopril": (["captopril"], ["ace_inhibitors"]),
+    # Aromatic anticonvulsants
+    "carbamazepine": (["carbamazepine"], ["aromatic_anticonvulsants"]),
+    "phenytoin": (["phenytoin"], ["aromatic_anticonvulsants"]),
+    "phenobarbital": (["phenobarbital"], ["aromatic_anticonvulsants"]),
+    "lamotrigine": (["lamotrigine"], ["aromatic_anticonvulsants"]),
+    # Others commonly recorded as allergies
+    "acetaminophen": (["acetaminophen"], []),
+    "paracetamol": (["acetaminophen"], []),
+    "tylenol": (["acetaminophen"], []),
+    "iodinated contrast": (["iodinated_contrast"], ["contrast_media"]),
+    "latex": (["latex"], []),
+}
+
+# Classes with documented cross-reactivity (warn, but less strongly than a class match)
+CROSS_REACTIVE_CLASSES = {
+    "penicillins": {"cephalosporins", "carbapenems"},
+    "cephalosporins": {"penicillins", "carbapenems"},
+    "carbapenems": {"penicillins", "cephalosporins"},
+}
+
+# Match types, strongest first
+MATCH_INGREDIENT = "ingredient"
+MATCH_CLASS = "class"
+MATCH_CROSS_REACTIVITY = "cross_reactivity"
+MATCH_NAME = "name"
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: finds every pattern occurring in a text in one pass.
+    """
+    def __init__(self, patterns):
+        # patterns: {pattern string: value}
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern, value in patterns.items():
+            self.add(pattern, value)
+        self.build()
+
+    def add(self, pattern, value):
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = next_state
+            state = next_state
+        self.output[state].append(value)
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find(self, text):
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for value in self.output[state]:
+                yield value
+
+class AllergyMatcher:
+    def __init__(self, terms=None):
+        """
+        `terms` maps a name to (ingredient codes, class codes) and is merged over
+        DEFAULT_TERMS; a value of None removes a default term.
+        """
+        merged = {normalize(term): value for term, value in DEFAULT_TERMS.items()}
+        for term, value in (terms or {}).items():
+            merged[normalize(term)] = value
+
+        # Patterns are padded with spaces so they only match whole words
+        patterns = {}
+        for term, value in merged.items():
+            if term and value is not None:
+                ingredients, classes = value
+                patterns[f" {term} "] = (frozenset(ingredients), frozenset(classes))
+        self.automaton = AhoCorasick(patterns)
+
+    def resolve(self, name):
+        """
+        (ingredient codes, class codes) mentioned anywhere in `name`.
+        """
+        ingredients, classes = set(), set()
+        for term_ingredients, term_classes in self.automaton.find(f" {normalize(name)} "):
+            ingredients |= term_ingredients
+            classes |= term_classes
+        return ingredients, classes
+
+    def check(self, allergies, medications):
+        """
+        Conflicts between a patient's allergies and proposed medications.
+        `allergies` are dicts with "allergen" (plus any fields to echo back);
+        returns {medication: [allergy dict + "match" and "matched_on"]}.
+        Unknown names fall back to comparing normalized names.
+        """
+        resolved = [(a, self.resolve(a["allergen"]), normalize(a["allergen"])) for a in allergies if a.get("allergen")]
+        conflicts = {}
+        for medication in medications:
+            ingredients, classes = self.resolve(medication)
+            cross_reactive = set()
+            for drug_class in classes:
+                cross_reactive |= CROSS_REACTIVE_CLASSES.get(drug_class, set())
+            medication_name = normalize(medication)
+
+            found = []
+            for allergy, (allergy_ingredients, allergy_classes), allergen_name in resolved:
+                if ingredients & allergy_ingredients:
+                    match, matched_on = MATCH_INGREDIENT, sorted(ingredients & allergy_ingredients)
+                elif classes & allergy_classes:
+                    match, matched_on = MATCH_CLASS, sorted(classes & allergy_classes)
+                elif cross_reactive & allergy_classes:
+                    match, matched_on = MATCH_CROSS_REACTIVITY, sorted(cross_reactive & allergy_classes)
+                elif allergen_name and medication_name and f" {allergen_name} " in f" {medication_name} ":
+                    match, matched_on = MATCH_NAME, [allergen_name]
+                else:
+                    continue
+                found.append(dict(allergy, match=match, matched_on=matched_on))
+            conflicts[medication] = found
+        return conflicts
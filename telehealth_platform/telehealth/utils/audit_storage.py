@@ -0,0 +1,184 @@
+import frappe
+from frappe.utils import add_days, add_months, get_datetime, get_first_day, getdate, now_datetime
+
+# PHI Access Log is append-only. Rows older than the hot window are moved, one
+# calendar month per table, into compressed archive tables. The "__" prefix keeps
+# them out of Frappe's DocType table namespace (and `bench trim-tables`).
+HOT_TABLE = "tabPHI Access Log"
+ARCHIVE_TABLE_PREFIX = "__phi_access_log_"
+ARCHIVE_MONTHS_CACHE_KEY = "telehealth_phi_log_archive_months"
+ARCHIVE_BATCH_SIZE = 5000
+DEFAULT_HOT_MONTHS = 3
+
+ROLLUP_FIELDS = ["name", "creation", "modified", "owner", "modified_by",
+    "date", "dimension", "dimension_value", "action", "access_count"]
+
+def get_hot_cutoff():
+    """
+    First instant that stays in the hot table. Everything before it is cold.
+    """
+    hot_months = int(frappe.conf.get("phi_log_hot_months") or DEFAULT_HOT_MONTHS)
+    return get_datetime(get_first_day(add_months(getdate(), -hot_months)))
+
+def get_archive_table(month):
+    return f"{ARCHIVE_TABLE_PREFIX}{getdate(month).strftime('%Y%m')}"
+
+def get_archived_months():
+    """
+    Returns archived months as YYYYMM strings, newest first.
+    """
+    months = frappe.cache().get_value(ARCHIVE_MONTHS_CACHE_KEY)
+    if months is None:
+        tables = frappe.db.sql_list("""
+            select table_name from information_schema.tables
+            where table_schema = database() and table_name like %s
+        """, ARCHIVE_TABLE_PREFIX.replace("_", "\\_") + "%")
+        suffixes = [t[len(ARCHIVE_TABLE_PREFIX):] for t in tables]
+        months = sorted((s for s in suffixes if len(s) == 6 and s.isdigit()), reverse=True)
+        frappe.cache().set_value(ARCHIVE_MONTHS_CACHE_KEY, months)
+    return months
+
+def get_log_sources(start=None, end=None):
+    """
+    Tables that may hold rows in [start, end), ordered newest first. Months are
+    disjoint, so reading the sources in order preserves timestamp desc ordering.
+    """
+    sources = [frappe.qb.DocType("PHI Access Log")]
+    for month in get_archived_months():
+        month_start = get_datetime(f"{month[:4]}-{month[4:]}-01")
+        month_end = get_datetime(add_months(month_start, 1))
+        if start and month_end <= start:
+            continue
+        if end and month_start >= end:
+            continue
+        sources.append(frappe.qb.Table(ARCHIVE_TABLE_PREFIX + month))
+    return sources
+
+def get_source_table_names(day):
+    """
+    Physical tables holding the rows for `day`: the hot table and, once its month
+    is archived, the month's archive table too (an interrupted archive run
+    leaves the month split between them).
+    """
+    table = get_archive_table(day)
+    if table[len(ARCHIVE_TABLE_PREFIX):] in get_archived_months():
+        return [HOT_TABLE, table]
+    return [HOT_TABLE]
+
+def find_archived_log(name):
+    """
+    Primary key lookup of an archived log entry across monthly tables.
+    """
+    for month in get_archived_months():
+        rows = frappe.db.sql(f"select * from `{ARCHIVE_TABLE_PREFIX}{month}` where name = %s",
+            name, as_dict=True)
+        if rows:
+            return rows[0]
+    return None
+
+def rebuild_rollups(day):
+    """
+    Recomputes the daily rollups (per user, per patient and per action) for one day.
+    Idempotent: existing rollup rows for the day are replaced.
+    """
+    day = getdate(day)
+    values = {"start": get_datetime(day), "end": get_datetime(add_days(day, 1))}
+    logs = " union all ".join(f"""
+        select `user`, patient, action from `{table}`
+        where timestamp >= %(start)s and timestamp < %(end)s""" for table in get_source_table_names(day))
+
+    rows = frappe.db.sql(f"""
+        select 'User', `user`, action, count(*) from ({logs}) logs
+        group by `user`, action
+        union all
+        select 'Patient', patient, action, count(*) from ({logs}) logs
+        where ifnull(patient, '') != ''
+        group by patient, action
+        union all
+        select 'Action', action, action, count(*) from ({logs}) logs
+        group by action
+    """, values)
+
+    frappe.db.delete("PHI Access Log Rollup", {"date": day})
+
+    now = now_datetime()
+    records = [
+        (frappe.generate_hash(length=10), now, now, "Administrator", "Administrator", day,
+            dimension, value, action, count)
+        for dimension, value, action, count in rows
+    ]
+    if records:
+        frappe.db.bulk_insert("PHI Access Log Rollup", ROLLUP_FIELDS, records)
+
+def build_daily_rollups():
+    """
+    Scheduled (daily): finalizes yesterday's rollups.
+    """
+    rebuild_rollups(add_days(getdate(), -1))
+    frappe.db.commit()
+
+def refresh_today_rollups():
+    """
+    Scheduled (hourly): keeps today's partial rollups current for dashboards.
+    Only touches one day of the timestamp index.
+    """
+    rebuild_rollups(getdate())
+    frappe.db.commit()
+
+def archive_cold_logs():
+    """
+    Scheduled (monthly): moves every month older than the hot window into its own
+    compressed archive table, oldest month first, in batches that commit as they go.
+    """
+    cutoff = get_hot_cutoff()
+    oldest = frappe.db.sql(f"select min(timestamp) from `{HOT_TABLE}`")[0][0]
+    if not oldest:
+        return
+
+    month = get_first_day(getdate(oldest))
+    while get_datetime(month) < cutoff:
+        try:
+            archive_month(month)
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Failed to archive PHI Access Log for {month}: {str(e)}", "Audit Archive")
+            return
+        month = add_months(month, 1)
+
+def archive_month(month):
+    month_start = get_datetime(month)
+    month_end = get_datetime(add_months(month, 1))
+
+    # Rollups must cover the month before its raw rows leave the hot table. Every
+    # day is rebuilt: an existing rollup may only be an hourly partial refresh
+    day = getdate(month_start)
+    while day < getdate(month_end):
+        rebuild_rollups(day)
+        day = add_days(day, 1)
+    frappe.db.commit()
+
+    table = get_archive_table(month)
+    ensure_archive_table(table)
+
+    while True:
+        names = frappe.db.sql_list(f"""
+            select name from `{HOT_TABLE}`
+            where timestamp >= %s and timestamp < %s
+            limit {ARCHIVE_BATCH_SIZE}
+        """, (month_start, month_end))
+        if not names:
+            break
+
+        frappe.db.sql(f"insert ignore into `{table}` select * from `{HOT_TABLE}` where name in %(names)s",
+            {"names": tuple(names)})
+        frappe.db.sql(f"delete from `{HOT_TABLE}` where name in %(names)s", {"names": tuple(names)})
+        frappe.db.commit()
+
+def ensure_archive_table(table):
+    if table[len(ARCHIVE_TABLE_PREFIX):] in get_archived_months():
+        return
+
+    # Same columns and indexes as the hot table, stored with InnoDB page compression
+    frappe.db.sql_ddl(f"create table if not exists `{table}` like `{HOT_TABLE}`")
+    frappe.db.sql_ddl(f"alter table `{table}` row_format=compressed")
+    frappe.cache().delete_value(ARCHIVE_MONTHS_CACHE_KEY)
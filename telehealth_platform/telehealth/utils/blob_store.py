@@ -0,0 +1,111 @@
+import os
+import shutil
+import frappe
+from telehealth_platform.telehealth.utils import metrics
+
+# Content-addressed storage for uploaded attachments. Each distinct SHA-256 is
+# stored once under private/files/blobs/<aa>/<hash><ext> and tracked by a
+# Content Blob row whose ref_count equals the number of File records using it.
+# Every File keeps its own attached_to_* link, so access checks are unchanged.
+BLOB_DIR = "blobs"
+
+def get_blob_url(content_hash, file_name):
+    ext = os.path.splitext(file_name)[1].lower()
+    return f"/private/files/{BLOB_DIR}/{content_hash[:2]}/{content_hash}{ext}"
+
+def store(spool_path, content_hash, size, file_name, is_upload=True):
+    """
+    Stores a spooled file by content hash and takes a reference on it.
+    The spool file is consumed either way. Returns the blob file URL.
+    Deduplication counts towards the upload metrics only for uploads.
+    """
+    blob = frappe.db.get_value("Content Blob", content_hash, ["file_url"], as_dict=True, for_update=True)
+    if blob:
+        add_reference(content_hash)
+        os.remove(spool_path)
+        if is_upload:
+            count_deduplicated(size)
+        return blob.file_url
+
+    file_url = get_blob_url(content_hash, file_name)
+    path = frappe.get_site_path(file_url.lstrip("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    shutil.move(spool_path, path)
+
+    try:
+        frappe.get_doc({
+            "doctype": "Content Blob",
+            "content_hash": content_hash,
+            "file_url": file_url,
+            "file_size": size,
+            "ref_count": 1
+        }).insert(ignore_permissions=True)
+    except frappe.DuplicateEntryError:
+        # A concurrent upload of the same content won the insert
+        add_reference(content_hash)
+        if is_upload:
+            count_deduplicated(size)
+        winner_url = frappe.db.get_value("Content Blob", content_hash, "file_url")
+        if winner_url != file_url:
+            remove_blob_file(file_url)
+        return winner_url
+    except Exception:
+        remove_blob_file(file_url)
+        raise
+
+    # The file is in place before the transaction commits; a rollback must not orphan it
+    frappe.db.after_rollback.add(lambda: remove_unreferenced_blob_file(file_url))
+    metrics.incr("upload_bytes_stored_total", size)
+    return file_url
+
+def count_deduplicated(size):
+    metrics.incr("upload_deduplicated_total")
+    metrics.incr("upload_bytes_deduplicated_total", size)
+
+def remove_blob_file(file_url):
+    path = frappe.get_site_path(file_url.lstrip("/"))
+    if os.path.exists(path):
+        os.remove(path)
+
+def remove_unreferenced_blob_file(file_url):
+    # A concurrent upload of the same content may have stored it again since
+    if not frappe.db.exists("Content Blob", {"file_url": file_url}):
+        remove_blob_file(file_url)
+
+def add_reference(content_hash):
+    frappe.db.sql("""update `tabContent Blob` set ref_count = ref_count + 1 where name = %s""", content_hash)
+
+def release(file_doc, method=None):
+    """
+    File on_trash hook: drops one reference and removes the blob with the last one.
+    """
+    if not (file_doc.file_url or "").startswith(f"/private/files/{BLOB_DIR}/"):
+        return
+
+    blob = frappe.db.get_value("Content Blob", {"file_url": file_doc.file_url},
+        ["name", "ref_count", "file_size"], as_dict=True, for_update=True)
+    if not blob:
+        return
+
+    if blob.ref_count > 1:
+        frappe.db.sql("""update `tabContent Blob` set ref_count = ref_count - 1 where name = %s""", blob.name)
+        return
+
+    frappe.delete_doc("Content Blob", blob.name, ignore_permissions=True)
+    metrics.incr("upload_bytes_stored_total", -(blob.file_size or 0))
+    remove_blob_file(file_doc.file_url)
+
+def get_storage_summary():
+    """
+    Physical vs logical bytes across all blobs.
+    """
+    blobs, stored, referenced = frappe.db.sql("""
+        select count(*), ifnull(sum(file_size), 0), ifnull(sum(file_size * ref_count), 0)
+        from `tabContent Blob`
+    """)[0]
+    return {
+        "blobs": blobs,
+        "bytes_stored": int(stored),
+        "bytes_referenced": int(referenced),
+        "bytes_saved": int(referenced - stored)
+    }
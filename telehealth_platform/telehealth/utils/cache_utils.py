@@ -0,0 +1,179 @@
+import hashlib
+import json
+import pickle
+import time
+import frappe
+from telehealth_platform.telehealth.utils import profiling
+
+# Read models are cached in Redis hashes (one hash per model, keyed by document)
+# together with an ETag, so a revalidation with If-None-Match can be answered
+# with a 304 without touching the database. Entries can be tagged with the
+# documents they were built from ("User:jane@example.com"); invalidating a tag
+# drops every entry that carries it.
+# Each key also has a version, bumped whenever it is invalidated. Entries
+# record the version read before they were built and an expiry, and are
+# treated as misses once either is out of date: a build that read the database
+# before a concurrent commit is not served after that commit's invalidation,
+# and nothing outlives its TTL. clear_namespace bumps a version shared by all
+# keys of the model.
+DEFAULT_TTL = 3600
+NAMESPACE_VERSION = "*"
+PATIENT_BY_USER_KEY = "telehealth_patient_by_user"
+PATIENT_BY_USER_TTL = 3600
+# Practitioner profiles, tagged with the Healthcare Practitioner and User they
+# were built from
+DOCTOR_PROFILE_CACHE = "telehealth_doctor_profile"
+
+def get_patient_for_user(user):
+    """
+    Name of the Patient linked to `user`, or None. Cached, including misses,
+    as a versioned entry like the read models.
+    """
+    entry = get_cached(PATIENT_BY_USER_KEY, user,
+        lambda: frappe.db.get_value("Patient", {"user_id": user}, "name") or "", ttl=PATIENT_BY_USER_TTL)
+    return entry["payload"] or None
+
+def clear_patient_for_user(doc, method=None):
+    """
+    Patient doc event: forgets the user -> patient mapping for old and new
+    user_id once the transaction commits.
+    """
+    users = {doc.get("user_id")}
+    before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if before:
+        users.add(before.get("user_id"))
+    users = [user for user in users if user]
+    if users:
+        frappe.db.after_commit.add(lambda: clear_cached(PATIENT_BY_USER_KEY, *users))
+
+def make_etag(payload):
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return '"{0}"'.format(hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+def get_versions_key(namespace):
+    return f"{namespace}|versions"
+
+def read_entries(namespace, keys):
+    """
+    ({key: live entry}, {key: current version}) for `keys` in one round trip.
+    """
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.hmget(cache.make_key(namespace), keys)
+    pipe.hmget(cache.make_key(get_versions_key(namespace)), keys + [NAMESPACE_VERSION])
+    raw, raw_versions = pipe.execute()
+    generation = int(raw_versions.pop() or 0)
+    versions = {key: (generation, int(version or 0)) for key, version in zip(keys, raw_versions)}
+    now = time.time()
+    entries = {}
+    for key, value in zip(keys, raw):
+        entry = pickle.loads(value) if value is not None else None
+        if entry and entry.get("version") == versions[key] and entry.get("expires_at", 0) > now:
+            entries[key] = entry
+    return entries, versions
+
+def get_cached(namespace, key, builder, ttl=DEFAULT_TTL):
+    """
+    Returns the cached entry {"payload", "etag"} for `key`, building and storing it on a miss.
+    """
+    entries, versions = read_entries(namespace, [key])
+    entry = entries.get(key)
+    profiling.note_cache(hits=int(entry is not None), misses=int(entry is None))
+    if entry is None:
+        entry = set_cached(namespace, key, builder(), ttl=ttl, version=versions[key])
+    return entry
+
+def set_cached(namespace, key, payload, tags=None, ttl=DEFAULT_TTL, version=None):
+    """
+    Stores `payload` for `key`. `version` is the key's version read before
+    the payload was built; by default the current one, for payloads built
+    after the change was committed.
+    """
+    if version is None:
+        version = read_entries(namespace, [key])[1][key]
+    entry = {"payload": payload, "etag": make_etag(payload), "version": version, "expires_at": time.time() + ttl}
+    frappe.cache().hset(namespace, key, entry)
+    for tag in tags or ():
+        frappe.cache().sadd(get_tag_key(namespace, tag), key)
+    return entry
+
+def get_cached_many(namespace, keys, builder, ttl=DEFAULT_TTL):
+    """
+    Returns ({key: entry}, number of misses) for many keys with one Redis read.
+    Misses are built together: `builder(keys)` returns {key: (payload, tags)};
+    keys it leaves out are not cached.
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}, 0
+    entries, versions = read_entries(namespace, keys)
+    missing = [key for key in keys if key not in entries]
+    profiling.note_cache(hits=len(entries), misses=len(missing))
+    if missing:
+        for key, (payload, tags) in builder(missing).items():
+            entries[key] = set_cached(namespace, key, payload, tags, ttl=ttl, version=versions[key])
+    return entries, len(missing)
+
+def get_tag_key(namespace, tag):
+    return f"{namespace}|tag|{tag}"
+
+def invalidate_tags(namespace, tags):
+    """
+    Drops every entry of `namespace` tagged with any of `tags`.
+    """
+    cache = frappe.cache()
+    for tag in tags:
+        tag_key = get_tag_key(namespace, tag)
+        keys = [frappe.safe_decode(key) for key in cache.smembers(tag_key)]
+        if keys:
+            clear_cached(namespace, *keys)
+        cache.delete_value(tag_key)
+
+def clear_cached(namespace, *keys):
+    """
+    Drops the entries of `keys` and bumps their versions, so that builds
+    already running when they were invalidated are not served.
+    """
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    for key in keys:
+        pipe.hincrby(cache.make_key(get_versions_key(namespace)), key, 1)
+    pipe.execute()
+    for key in keys:
+        cache.hdel(namespace, key)
+
+def clear_namespace(namespace):
+    """
+    Drops every entry of `namespace`, e.g. after a bulk recompute.
+    """
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.hincrby(cache.make_key(get_versions_key(namespace)), NAMESPACE_VERSION, 1)
+    pipe.execute()
+    cache.delete_value(namespace)
+
+def set_response_header(name, value):
+    headers = getattr(frappe.local, "response_headers", None)
+    if headers is not None:
+        headers[name] = value
+
+def is_not_modified(etag):
+    """
+    True if the request's If-None-Match matches `etag` (weak comparison).
+    """
+    header = frappe.get_request_header("If-None-Match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in [c[2:] if c.startswith("W/") else c for c in candidates]
+
+def conditional_response(entry):
+    """
+    Sets the ETag header and answers 304 Not Modified when the client copy is current.
+    """
+    set_response_header("ETag", entry["etag"])
+    set_response_header("Cache-Control", "private, no-cache")
+    if is_not_modified(entry["etag"]):
+        frappe.local.response.http_status_code = 304
+        return None
+    return entry["payload"]
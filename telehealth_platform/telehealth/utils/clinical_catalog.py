@@ -0,0 +1,36 @@
+from telehealth_platform.telehealth.utils.reference_index import ReferenceIndex
+
+# Search indexes for the order catalogs used by prescribing and service requests.
+# Autocomplete runs on every keystroke, so lookups are served from per-worker
+# indexes instead of `like '%text%'` scans of the catalog tables.
+medications = ReferenceIndex(
+    "medications",
+    "Medication",
+    fields=["generic_name", "medication_class", "strength", "strength_uom", "dosage_form", "disabled"],
+    get_texts=lambda row: [row.name, row.get("generic_name")],
+    is_active=lambda row: not row.get("disabled")
+)
+
+service_templates = {
+    "Lab Test Template": ReferenceIndex(
+        "lab_test_templates",
+        "Lab Test Template",
+        fields=["lab_test_name", "lab_test_code", "disabled"],
+        get_texts=lambda row: [row.name, row.get("lab_test_name"), row.get("lab_test_code")],
+        is_active=lambda row: not row.get("disabled")
+    ),
+    "Clinical Procedure Template": ReferenceIndex(
+        "clinical_procedure_templates",
+        "Clinical Procedure Template",
+        fields=["template", "item_code", "disabled"],
+        get_texts=lambda row: [row.name, row.get("template"), row.get("item_code")],
+        is_active=lambda row: not row.get("disabled")
+    ),
+    "Observation Template": ReferenceIndex(
+        "observation_templates",
+        "Observation Template",
+        fields=["observation", "abbr", "disabled"],
+        get_texts=lambda row: [row.name, row.get("observation"), row.get("abbr")],
+        is_active=lambda row: not row.get("disabled")
+    )
+}
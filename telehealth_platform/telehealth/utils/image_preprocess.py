@@ -0,0 +1,148 @@
+import io
+from PIL import Image, ImageFilter, ImageOps, ImageStat
+
+# Normalizes phone photos of insurance cards before OCR: crop to the card,
+# deskew, grayscale and downscale. A card is ~3.4in wide, so 1600px on the long
+# side is still well above the ~300 DPI OCR engines need for small print.
+# Pure Pillow, no Frappe imports, so the benchmarks can run it standalone.
+DEFAULT_MAX_SIDE = 1600
+JPEG_QUALITY = 85
+ANALYSIS_SIDE = 512
+MAX_SKEW_DEGREES = 8
+SKEW_STEP = 0.5
+# Minimum share of the photo the detected card must cover to be trusted
+MIN_CROP_AREA = 0.15
+CARD_DENSITY_RATIO = 0.5
+
+class ImagePreprocessError(Exception):
+    """
+    Raised when the image cannot be decoded.
+    """
+
+def normalize_card_image(content, max_side=DEFAULT_MAX_SIDE, quality=JPEG_QUALITY):
+    """
+    Returns (jpeg bytes, stats) for an encoded card photo. stats has the original
+    and normalized sizes, output dimensions, the deskew angle and whether it was cropped.
+    """
+    try:
+        image = Image.open(io.BytesIO(content))
+        # JPEG decoders can scale by 1/2, 1/4 or 1/8 while decoding, which avoids
+        # materialising a 12 MP bitmap only to shrink it afterwards
+        image.draft("L", (max_side * 2, max_side * 2))
+        image = ImageOps.exif_transpose(image).convert("L")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImagePreprocessError(str(e))
+
+    # Deskew first so the card is axis-aligned and crops tightly
+    angle = find_skew_angle(image)
+    if angle:
+        background = int(ImageStat.Stat(get_analysis_image(image)[0]).median[0])
+        image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=background)
+
+    box = find_card_box(image)
+    if box:
+        image = image.crop(box)
+
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image = ImageOps.autocontrast(image, cutoff=1)
+
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=quality, optimize=True)
+    normalized = out.getvalue()
+    return normalized, {
+        "original_bytes": len(content),
+        "normalized_bytes": len(normalized),
+        "width": image.size[0],
+        "height": image.size[1],
+        "angle": angle,
+        "cropped": bool(box)
+    }
+
+def get_analysis_image(image):
+    """
+    Small copy used for card detection and skew estimation.
+    """
+    scale = min(1.0, ANALYSIS_SIDE / max(image.size))
+    size = (max(1, int(image.size[0] * scale)), max(1, int(image.size[1] * scale)))
+    return image.resize(size, Image.BILINEAR), scale
+
+def find_card_box(image):
+    """
+    Bounding box of the card in full-resolution coordinates, or None to keep the
+    whole photo. The card is taken to be the bright region that stands out from
+    the background after blurring away texture and print.
+    """
+    small, scale = get_analysis_image(image)
+    blurred = small.filter(ImageFilter.GaussianBlur(3))
+    threshold = get_otsu_threshold(blurred.histogram())
+    mask = blurred.point(lambda p: 255 if p > threshold else 0)
+
+    # Per-column and per-row share of card pixels via box downsampling
+    x_span = get_dense_span(list(mask.resize((mask.size[0], 1), Image.BOX).getdata()))
+    y_span = get_dense_span(list(mask.resize((1, mask.size[1]), Image.BOX).getdata()))
+    if not x_span or not y_span:
+        return None
+
+    width, height = small.size
+    margin_x, margin_y = int(width * 0.02), int(height * 0.02)
+    left, right = max(0, x_span[0] - margin_x), min(width, x_span[1] + 1 + margin_x)
+    top, bottom = max(0, y_span[0] - margin_y), min(height, y_span[1] + 1 + margin_y)
+
+    area = (right - left) * (bottom - top) / float(width * height)
+    if area < MIN_CROP_AREA or area > 0.95:
+        return None
+    return (int(left / scale), int(top / scale), int(right / scale), int(bottom / scale))
+
+def get_otsu_threshold(histogram):
+    """
+    Grey level that best separates the histogram into two classes.
+    """
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    background, weighted_background = 0, 0
+    best_level, best_variance = 127, 0
+    for level, count in enumerate(histogram):
+        background += count
+        if not background or background == total:
+            continue
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / (total - background)
+        variance = background * (total - background) * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+def get_dense_span(profile):
+    """
+    First and last index whose density reaches CARD_DENSITY_RATIO of the peak.
+    """
+    peak = max(profile) if profile else 0
+    if not peak:
+        return None
+    threshold = peak * CARD_DENSITY_RATIO
+    dense = [i for i, value in enumerate(profile) if value >= threshold]
+    return dense[0], dense[-1]
+
+def find_skew_angle(image):
+    """
+    Estimates text skew with a projection profile: rotated to the right angle,
+    text lines give the sharpest contrast between row ink densities.
+    Returns the correcting rotation in degrees (0 if already straight).
+    """
+    small, _scale = get_analysis_image(image)
+    # Dark ink on a light card, inverted so ink counts as density
+    ink = ImageOps.invert(ImageOps.autocontrast(small)).point(lambda p: 255 if p > 128 else 0)
+
+    best_angle, best_score = 0, None
+    steps = int(MAX_SKEW_DEGREES / SKEW_STEP)
+    # Smallest rotations first so ties keep the image as it is
+    for i in sorted(range(-steps, steps + 1), key=abs):
+        angle = i * SKEW_STEP
+        rotated = ink.rotate(angle, resample=Image.NEAREST, fillcolor=0)
+        rows = list(rotated.resize((1, rotated.size[1]), Image.BOX).getdata())
+        score = sum((rows[j] - rows[j - 1]) ** 2 for j in range(1, len(rows)))
+        if best_score is None or score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
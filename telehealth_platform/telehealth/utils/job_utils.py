@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+import frappe
+
+# Holders refresh their slot every SLOT_REFRESH_SECONDS while the block runs,
+# however long it takes; one that dies without releasing is dropped after
+# SLOT_TTL seconds
+SLOT_TTL = 600
+SLOT_REFRESH_SECONDS = 60
+
+class SlotTimeoutError(TimeoutError):
+    """
+    Raised by concurrency_slot when no slot frees up within its wait_timeout.
+    """
+
+def run_with_retries(fn, retry_on=(Exception,), max_attempts=4, base_delay=1.0, max_delay=30.0,
+        on_retry=None, sleep=time.sleep):
+    """
+    Calls `fn` until it succeeds, retrying exceptions in `retry_on` with exponential
+    backoff and full jitter. `on_retry(attempt, exc)` runs before each wait.
+    """
+    attempt = 1
+    while True:
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt >= max_attempts:
+                raise
+            if on_retry:
+                on_retry(attempt, e)
+            sleep(random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1))))
+            attempt += 1
+
+@contextmanager
+def concurrency_slot(name, limit, wait_timeout=300, poll_interval=0.5):
+    """
+    Site-wide semaphore in Redis. At most `limit` holders across all workers run
+    the block at once; others wait up to `wait_timeout` seconds for a slot.
+    """
+    cache = frappe.cache()
+    key = cache.make_key(f"telehealth_slots:{name}")
+    token = frappe.generate_hash(length=12)
+    deadline = time.monotonic() + wait_timeout
+
+    while True:
+        now = time.time()
+        pipe = cache.pipeline()
+        pipe.zremrangebyscore(key, 0, now - SLOT_TTL)
+        pipe.zadd(key, {token: now})
+        pipe.zrank(key, token)
+        rank = pipe.execute()[-1]
+        if rank is not None and rank < limit:
+            break
+
+        cache.zrem(key, token)
+        if time.monotonic() > deadline:
+            raise SlotTimeoutError(f"Timed out waiting for a {name} slot")
+        time.sleep(poll_interval)
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=keep_slot, args=(cache, key, token, stop), daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heartbeat.join()
+        cache.zrem(key, token)
+
+def keep_slot(cache, key, token, stop, interval=SLOT_REFRESH_SECONDS):
+    """
+    Moves the holder's score forward until `stop` is set, so slots held by
+    jobs running longer than SLOT_TTL are not handed out again.
+    """
+    while not stop.wait(interval):
+        try:
+            # xx: never re-adds a slot that was already released or dropped
+            cache.zadd(key, {token: time.time()}, xx=True)
+        except Exception:
+            # Runs outside the job's Frappe context; the next refresh retries
+            pass
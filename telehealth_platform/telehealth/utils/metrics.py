@@ -0,0 +1,46 @@
+import frappe
+
+# Lightweight counters and histograms kept in a single Redis hash per site.
+# Histogram buckets are stored non-cumulatively and summed when read.
+METRICS_KEY = "telehealth_metrics"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def get_key():
+    return frappe.cache().make_key(METRICS_KEY)
+
+def incr(name, amount=1):
+    """
+    Increments a counter.
+    """
+    frappe.cache().hincrbyfloat(get_key(), name, amount)
+
+def observe(name, value, buckets=LATENCY_BUCKETS):
+    """
+    Records one observation of a histogram (count, sum and bucket).
+    """
+    bucket = next((b for b in buckets if value <= b), "+Inf")
+    pipe = frappe.cache().pipeline()
+    key = get_key()
+    pipe.hincrby(key, f"{name}_count", 1)
+    pipe.hincrbyfloat(key, f"{name}_sum", value)
+    pipe.hincrby(key, f"{name}_bucket:{bucket}", 1)
+    pipe.execute()
+
+def get_all():
+    """
+    Returns every recorded metric as {name: float}.
+    """
+    return {frappe.safe_decode(k): float(v) for k, v in read_hash(get_key()).items()}
+
+def read_hash(key):
+    """
+    HGETALL of an already prefixed key. RedisWrapper.hgetall would prefix it
+    again and unpickle the values, which hincrby counters are not.
+    """
+    pipe = frappe.cache().pipeline()
+    pipe.hgetall(key)
+    return pipe.execute()[0] or {}
+
+def get_average(values, name):
+    count = values.get(f"{name}_count") or 0
+    return (values.get(f"{name}_sum") or 0) / count if count else None
@@ -0,0 +1,48 @@
+import base64
+import json
+import frappe
+from frappe import _
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def get_page_size(limit=None, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Normalizes a client supplied page size into the range [1, maximum].
+    """
+    try:
+        size = int(limit) if limit else default
+    except (TypeError, ValueError):
+        frappe.throw(_("Invalid page size"), frappe.ValidationError)
+    return max(1, min(size, maximum))
+
+def encode_cursor(*values):
+    """
+    Encodes the sort key of the last row on a page into an opaque, URL safe cursor.
+    """
+    raw = json.dumps([str(v) if v is not None else None for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor, size):
+    """
+    Decodes a cursor produced by encode_cursor. Returns a list of `size` values.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception:
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        frappe.throw(_("Invalid pagination cursor"), frappe.ValidationError)
+    return values
+
+def paginate(rows, page_size, key):
+    """
+    Splits a result fetched with `limit=page_size + 1` into the page and the next cursor.
+    `key` maps a row to the tuple of values the query is ordered by.
+    """
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(*key(rows[-1])) if has_more and rows else None
+    return rows, next_cursor
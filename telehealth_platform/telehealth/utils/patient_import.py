@@ -0,0 +1,133 @@
+import csv
+import datetime
+import io
+import json
+import re
+
+# Parsing and validation for bulk patient imports. Rows are streamed from CSV
+# or NDJSON and checked a batch at a time; nothing here touches the database,
+# so a file can be validated (and tested) without a site.
+# Columns: patient_name (or first_name + last_name), email, phone, date_of_birth, gender
+FORMATS = ("csv", "ndjson")
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+GENDERS = {
+    "male": "Male",
+    "m": "Male",
+    "female": "Female",
+    "f": "Female",
+    "other": "Other",
+    "o": "Other",
+}
+# One date format per file: 03/04/1990 is 3 April or 4 March depending on where
+# the file came from, so day/month orders are only accepted when asked for
+DATE_FORMATS = {
+    "iso": ("%Y-%m-%d", "YYYY-MM-DD"),
+    "dmy": ("%d/%m/%Y", "DD/MM/YYYY"),
+    "mdy": ("%m/%d/%Y", "MM/DD/YYYY"),
+}
+DEFAULT_DATE_FORMAT = "iso"
+
+class ImportFormatError(ValueError):
+    pass
+
+def iter_rows(stream, fmt):
+    """
+    Yields (line number, row dict) from a binary or text stream without reading
+    it all into memory. Unparseable NDJSON lines yield a row of None.
+    """
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Unsupported format: {fmt}")
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        if not reader.fieldnames:
+            return
+        reader.fieldnames = [(f or "").strip().lower() for f in reader.fieldnames]
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None
+
+def iter_batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def clean_row(row, today=None, date_format=DEFAULT_DATE_FORMAT):
+    """
+    Normalized record {patient_name, email, phone, date_of_birth, gender}, or
+    raises ValueError with the reason the row is rejected.
+    """
+    if row is None:
+        raise ValueError("Malformed row")
+    get = lambda key: str(row.get(key) or "").strip()
+
+    patient_name = get("patient_name") or " ".join(filter(None, [get("first_name"), get("last_name")]))
+    if not patient_name:
+        raise ValueError("Missing patient_name")
+
+    email = get("email").lower()
+    if not EMAIL_RE.match(email):
+        raise ValueError(f"Invalid email: {email or '(empty)'}")
+
+    date_of_birth = parse_date(get("date_of_birth"), date_format)
+    if not date_of_birth:
+        raise ValueError(f"Missing or invalid date_of_birth (expected {DATE_FORMATS[date_format][1]})")
+    if date_of_birth > (today or datetime.date.today()):
+        raise ValueError("date_of_birth is in the future")
+
+    gender = get("gender")
+    if gender and gender.lower() not in GENDERS:
+        raise ValueError(f"Unknown gender: {gender}")
+
+    return {
+        "patient_name": patient_name,
+        "email": email,
+        "phone": re.sub(r"[\s().-]", "", get("phone")),
+        "date_of_birth": date_of_birth.isoformat(),
+        "gender": GENDERS.get(gender.lower(), "Other")
+    }
+
+def parse_date(value, date_format=DEFAULT_DATE_FORMAT):
+    if date_format != "iso":
+        value = value.replace("-", "/").replace(".", "/")
+    try:
+        return datetime.datetime.strptime(value, DATE_FORMATS[date_format][0]).date()
+    except ValueError:
+        return None
+
+def validate_batch(batch, seen_emails, today=None, date_format=DEFAULT_DATE_FORMAT):
+    """
+    Splits a batch of (line number, row) into valid records and errors. Emails
+    already in `seen_emails` (earlier in the file) are rejected as duplicates;
+    accepted emails are added to it. Returns ([(line, record)], [(line, email, error)]).
+    """
+    valid, errors = [], []
+    for line_no, row in batch:
+        try:
+            record = clean_row(row, today, date_format)
+        except ValueError as e:
+            email = str(row.get("email") or "").strip() if isinstance(row, dict) else ""
+            errors.append((line_no, email, str(e)))
+            continue
+        if record["email"] in seen_emails:
+            errors.append((line_no, record["email"], "Duplicate email in file"))
+            continue
+        seen_emails.add(record["email"])
+        valid.append((line_no, record))
+    return valid, errors
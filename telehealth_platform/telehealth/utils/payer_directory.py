@@ -0,0 +1,70 @@
+from telehealth_platform.telehealth.utils.reference_index import ReferenceIndex, get_lines
+from telehealth_platform.telehealth.utils.text_index import TextIndex
+
+# OCR and manual entry produce free-text payer and plan names ("Anthem Blue
+# Cross (OCR)", "Preferred Provider Org"). They are resolved against the
+# Insurance Payer directory and a fixed list of plan types.
+PAYER_MIN_SCORE = 0.6
+PLAN_TYPE_MIN_SCORE = 0.6
+
+PLAN_TYPE_ALIASES = {
+    "PPO": ["Preferred Provider Organization", "Preferred Provider Org"],
+    "HMO": ["Health Maintenance Organization", "Health Maintenance Org"],
+    "EPO": ["Exclusive Provider Organization"],
+    "POS": ["Point of Service"],
+    "HDHP": ["High Deductible Health Plan", "HSA Plan"],
+    "PFFS": ["Private Fee for Service"],
+    "Medicare Advantage": ["Medicare Part C", "MA Plan"],
+    "Medicaid": ["Medical Assistance"]
+}
+
+payers = ReferenceIndex(
+    "insurance_payers",
+    "Insurance Payer",
+    fields=["payer_name", "aliases", "disabled"],
+    get_texts=lambda row: [row.payer_name, row.name] + get_lines(row.get("aliases")),
+    is_active=lambda row: not row.get("disabled")
+)
+
+_plan_types = None
+
+def get_plan_type_index():
+    global _plan_types
+    if _plan_types is None:
+        index = TextIndex()
+        for plan_type, aliases in PLAN_TYPE_ALIASES.items():
+            index.add(plan_type, [plan_type] + aliases)
+        _plan_types = index
+    return _plan_types
+
+def resolve_payer(text, min_score=PAYER_MIN_SCORE):
+    """
+    Best matching payer as {"payer_id", "payer_name", "score"}, or None.
+    """
+    match = payers.get().best_match(text, min_score=min_score)
+    if not match:
+        return None
+    payer_id, score, row = match
+    return {"payer_id": payer_id, "payer_name": row.payer_name, "score": score}
+
+def normalize_plan_type(text):
+    """
+    Canonical plan type for `text`, or None if nothing is close enough.
+    """
+    match = get_plan_type_index().best_match(text, min_score=PLAN_TYPE_MIN_SCORE)
+    return match[0] if match else None
+
+def normalize_insurance_details(v):
+    """
+    Links the verification to a directory payer and canonicalizes plan_type.
+    Values that do not resolve are kept as entered.
+    """
+    if v.get("provider_name"):
+        payer = resolve_payer(v.provider_name)
+        if payer:
+            v.payer = payer["payer_id"]
+            v.provider_name = payer["payer_name"]
+        else:
+            v.payer = None
+    if v.get("plan_type"):
+        v.plan_type = normalize_plan_type(v.plan_type) or v.plan_type
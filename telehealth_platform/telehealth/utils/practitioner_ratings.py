@@ -0,0 +1,100 @@
+import frappe
+from frappe.query_builder.functions import Count, Sum
+from frappe.utils import flt, now_datetime
+from telehealth_platform.telehealth.utils import cache_utils
+
+# Practitioner Rating keeps, per practitioner, the count and sum of feedback
+# ratings plus a Bayesian average: (PRIOR_WEIGHT * prior mean + sum) /
+# (PRIOR_WEIGHT + count). A practitioner with two 5-star ratings does not
+# outrank one with two hundred 4.8s. Feedback events adjust count and sum with
+# atomic increments; rebuild_ratings recomputes everything from Practitioner
+# Feedback and refreshes the prior mean (the site-wide average rating).
+PRIOR_WEIGHT = 5
+DEFAULT_PRIOR_MEAN = 4.0
+PRIOR_MEAN_KEY = "telehealth_rating_prior_mean"
+
+def get_prior_mean():
+    value = frappe.cache().get_value(PRIOR_MEAN_KEY)
+    if value is None:
+        value = flt(frappe.conf.get("telehealth_rating_prior_mean")) or DEFAULT_PRIOR_MEAN
+    return flt(value)
+
+def get_score(rating_sum, rating_count, prior_mean):
+    return (PRIOR_WEIGHT * prior_mean + flt(rating_sum)) / (PRIOR_WEIGHT + (rating_count or 0))
+
+def get_rating(practitioner):
+    """
+    {"rating", "rating_count"} for one practitioner: a primary key read.
+    """
+    row = frappe.db.get_value("Practitioner Rating", practitioner, ["rating", "rating_count"], as_dict=True)
+    if not row or not row.rating_count:
+        return {"rating": None, "rating_count": 0}
+    return {"rating": flt(row.rating, 2), "rating_count": row.rating_count}
+
+def apply_feedback(practitioner, count_delta, sum_delta):
+    """
+    Adds a change in feedback to a practitioner's aggregate. Increments happen
+    in SQL, so concurrent submissions do not lose updates.
+    """
+    now = now_datetime()
+    frappe.db.sql("""
+        insert into `tabPractitioner Rating`
+            (name, practitioner, rating_count, rating_sum, rating, creation, modified, owner, modified_by)
+        values (%(practitioner)s, %(practitioner)s, 0, 0, 0, %(now)s, %(now)s, 'Administrator', 'Administrator')
+        on duplicate key update name = name""", {"practitioner": practitioner, "now": now})
+    frappe.db.sql("""
+        update `tabPractitioner Rating`
+        set rating_count = rating_count + %(count)s, rating_sum = rating_sum + %(sum)s, modified = %(now)s
+        where name = %(practitioner)s""",
+        {"practitioner": practitioner, "count": count_delta, "sum": sum_delta, "now": now})
+    frappe.db.sql("""
+        update `tabPractitioner Rating`
+        set rating = (%(weight)s * %(prior)s + rating_sum) / (%(weight)s + rating_count)
+        where name = %(practitioner)s""",
+        {"practitioner": practitioner, "weight": PRIOR_WEIGHT, "prior": get_prior_mean()})
+
+    tags = [f"Healthcare Practitioner:{practitioner}"]
+    frappe.db.after_commit.add(lambda: cache_utils.invalidate_tags(cache_utils.DOCTOR_PROFILE_CACHE, tags))
+
+def update_rating(doc, method=None):
+    """
+    Doc event for Practitioner Feedback (after_insert, on_update, on_trash).
+    """
+    if method == "after_insert":
+        apply_feedback(doc.practitioner, 1, doc.rating)
+    elif method == "on_trash":
+        apply_feedback(doc.practitioner, -1, -doc.rating)
+    else:
+        before = doc.get_doc_before_save()
+        if not before or (before.practitioner, before.rating) == (doc.practitioner, doc.rating):
+            return
+        apply_feedback(before.practitioner, -1, -before.rating)
+        apply_feedback(doc.practitioner, 1, doc.rating)
+
+def rebuild_ratings():
+    """
+    Daily job: recomputes every aggregate from Practitioner Feedback.
+    """
+    feedback = frappe.qb.DocType("Practitioner Feedback")
+    rows = (
+        frappe.qb.from_(feedback)
+        .select(feedback.practitioner, Count("*").as_("rating_count"), Sum(feedback.rating).as_("rating_sum"))
+        .groupby(feedback.practitioner)
+        .run(as_dict=True)
+    )
+
+    total_count = sum(r.rating_count for r in rows)
+    prior_mean = sum(flt(r.rating_sum) for r in rows) / total_count if total_count else get_prior_mean()
+    frappe.cache().set_value(PRIOR_MEAN_KEY, prior_mean)
+
+    now = now_datetime()
+    frappe.db.delete("Practitioner Rating")
+    frappe.db.bulk_insert("Practitioner Rating",
+        ["name", "practitioner", "rating_count", "rating_sum", "rating", "creation", "modified", "owner", "modified_by"],
+        [(r.practitioner, r.practitioner, r.rating_count, r.rating_sum,
+            get_score(r.rating_sum, r.rating_count, prior_mean), now, now, "Administrator", "Administrator")
+            for r in rows])
+    frappe.db.commit()
+    # Every score may have moved with the prior
+    cache_utils.clear_namespace(cache_utils.DOCTOR_PROFILE_CACHE)
+    return {"practitioners": len(rows), "ratings": total_count, "prior_mean": round(prior_mean, 4)}
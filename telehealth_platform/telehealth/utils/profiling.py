@@ -0,0 +1,265 @@
+import cProfile
+import os
+import random
+import time
+from contextlib import contextmanager
+import frappe
+from telehealth_platform.telehealth.utils.metrics import LATENCY_BUCKETS, read_hash
+
+# Per-route request metrics for the /api/v1 router. While a request runs, its
+# profile counts DB queries and their time (frappe.db.sql is wrapped for the
+# duration of the request, as frappe.recorder does), read-model cache hits and
+# misses, and time spent in external services. At the end everything is added
+# to one Redis hash with a single pipeline, so the cost per request is a clock
+# read per query and one round trip. Histograms are exposed in Prometheus text
+# format by api.metrics.get_prometheus_metrics.
+# A sample of requests (request_profile_sample_rate in site_config) also runs
+# under cProfile; the stats are dumped when the request is slower than
+# request_profile_slow_seconds.
+ROUTE_METRICS_KEY = "telehealth_route_metrics"
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+HISTOGRAMS = {
+    "wall_seconds": LATENCY_BUCKETS,
+    "db_seconds": LATENCY_BUCKETS,
+    "external_seconds": LATENCY_BUCKETS,
+    "db_queries": QUERY_COUNT_BUCKETS,
+}
+DEFAULT_SLOW_SECONDS = 1.0
+MAX_PROFILE_DUMPS = 50
+PROFILE_DIR = "request-profiles"
+
+class RequestProfile:
+    __slots__ = ("db_queries", "db_seconds", "cache_hits", "cache_misses", "external")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # service -> [calls, seconds]
+        self.external = {}
+
+def get_current():
+    return getattr(frappe.local, "telehealth_request_profile", None)
+
+def is_enabled():
+    return bool(frappe.conf.get("request_metrics", 1))
+
+@contextmanager
+def profile_request(method, route):
+    """
+    Measures the request handled inside the block and records it under `route`.
+    """
+    if not is_enabled() or get_current():
+        yield
+        return
+
+    profile = RequestProfile()
+    frappe.local.telehealth_request_profile = profile
+    db = frappe.local.db
+    previous_sql = db.__dict__.get("sql")
+    db.sql = timed_sql(db.sql, profile)
+
+    profiler = None
+    if random.random() < float(frappe.conf.get("request_profile_sample_rate") or 0):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            profiler = None
+
+    failed = False
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        wall = time.perf_counter() - started
+        if profiler:
+            profiler.disable()
+        if previous_sql is None:
+            del db.sql
+        else:
+            db.sql = previous_sql
+        frappe.local.telehealth_request_profile = None
+
+        status = 500 if failed else (frappe.local.response.get("http_status_code") or 200)
+        try:
+            record(method, route, status, wall, profile)
+            if profiler and wall >= float(frappe.conf.get("request_profile_slow_seconds") or DEFAULT_SLOW_SECONDS):
+                dump_profile(profiler, method, route, wall)
+        except Exception:
+            # Metrics must never fail the request
+            frappe.logger().exception("Recording request metrics failed")
+
+def timed_sql(sql, profile):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return sql(*args, **kwargs)
+        finally:
+            profile.db_queries += 1
+            profile.db_seconds += time.perf_counter() - started
+    return wrapper
+
+@contextmanager
+def count_queries():
+    """
+    Counts the DB queries run inside the block, e.g. by a cache builder, on top
+    of the request profile.
+    """
+    counter = RequestProfile()
+    db = frappe.local.db
+    previous_sql = db.__dict__.get("sql")
+    db.sql = timed_sql(db.sql, counter)
+    try:
+        yield counter
+    finally:
+        if previous_sql is None:
+            del db.sql
+        else:
+            db.sql = previous_sql
+
+def note_cache(hits=0, misses=0):
+    """
+    Counts read-model cache lookups towards the current request, if any.
+    """
+    profile = get_current()
+    if profile:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+
+@contextmanager
+def external_call(service):
+    """
+    Times a network call to an external service (s3, llm, stripe, textract).
+    Local work such as signing tokens or verifying webhooks is not wrapped.
+    """
+    profile = get_current()
+    if not profile:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        calls = profile.external.setdefault(service, [0, 0.0])
+        calls[0] += 1
+        calls[1] += time.perf_counter() - started
+
+def record(method, route, status, wall, profile):
+    label = f"{method} {route}"
+    pipe = frappe.cache().pipeline()
+    key = frappe.cache().make_key(ROUTE_METRICS_KEY)
+
+    pipe.hincrby(key, f"{label}|requests_total:{status // 100}xx", 1)
+    external_seconds = sum(seconds for _calls, seconds in profile.external.values())
+    for name, value in (("wall_seconds", wall), ("db_seconds", profile.db_seconds),
+            ("external_seconds", external_seconds), ("db_queries", profile.db_queries)):
+        bucket = next((b for b in HISTOGRAMS[name] if value <= b), "+Inf")
+        pipe.hincrby(key, f"{label}|{name}_count", 1)
+        pipe.hincrbyfloat(key, f"{label}|{name}_sum", value)
+        pipe.hincrby(key, f"{label}|{name}_bucket:{bucket}", 1)
+
+    if profile.cache_hits:
+        pipe.hincrby(key, f"{label}|cache_hits_total", profile.cache_hits)
+    if profile.cache_misses:
+        pipe.hincrby(key, f"{label}|cache_misses_total", profile.cache_misses)
+    for service, (calls, seconds) in profile.external.items():
+        pipe.hincrby(key, f"{label}|external_calls_total:{service}", calls)
+        pipe.hincrbyfloat(key, f"{label}|external_call_seconds_total:{service}", seconds)
+    pipe.execute()
+
+def get_route_metrics():
+    raw = read_hash(frappe.cache().make_key(ROUTE_METRICS_KEY))
+    return {frappe.safe_decode(k): float(v) for k, v in raw.items()}
+
+def dump_profile(profiler, method, route, wall):
+    directory = frappe.get_site_path("private", PROFILE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{route.replace('/', '_')}-{int(wall * 1000)}ms.prof"
+    profiler.dump_stats(os.path.join(directory, name))
+    frappe.logger().info(f"Slow request {method} {route} ({wall:.3f}s) profiled to {name}")
+
+    # Keep only the newest dumps
+    dumps = sorted(os.listdir(directory))
+    for old in dumps[:-MAX_PROFILE_DUMPS]:
+        os.remove(os.path.join(directory, old))
+
+def render_prometheus(route_values, values):
+    """
+    Prometheus text exposition of the per-route metrics (labelled by method
+    and route) and of the site-wide counters and histograms in utils.metrics.
+    """
+    families = {}
+
+    def add(name, kind, labels, suffix, value):
+        family = families.setdefault(name, {"type": kind, "samples": []})
+        family["samples"].append((suffix, labels, value))
+
+    def add_metric(name, labels, value):
+        if name.endswith("_count") or name.endswith("_sum"):
+            base, suffix = name.rsplit("_", 1)
+            add(base, "histogram", labels, f"_{suffix}", value)
+        elif "_bucket:" in name:
+            base, bucket = name.split("_bucket:", 1)
+            add(base, "histogram", labels + [("le", bucket)], "_bucket", value)
+        elif ":" in name:
+            base, label = name.split(":", 1)
+            label_name = "status" if base.endswith("requests_total") else "service"
+            add(base, "counter", labels + [(label_name, label)], "", value)
+        else:
+            add(name, "counter", labels, "", value)
+
+    for field, value in route_values.items():
+        label, name = field.split("|", 1)
+        method, route = label.split(" ", 1)
+        add_metric(f"route_{name}", [("method", method), ("route", route)], value)
+    for name, value in values.items():
+        add_metric(name, [], value)
+
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        metric = f"telehealth_{name}"
+        lines.append(f"# TYPE {metric} {family['type']}")
+        samples = family["samples"]
+        if family["type"] == "histogram":
+            samples = get_cumulative_buckets(samples)
+        for suffix, labels, value in samples:
+            label_text = ",".join(f'{k}="{escape_label(v)}"' for k, v in labels)
+            lines.append(f"{metric}{suffix}{{{label_text}}} {format_value(value)}" if label_text
+                else f"{metric}{suffix} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+def get_cumulative_buckets(samples):
+    """
+    Buckets are stored non-cumulatively; Prometheus expects cumulative counts
+    per series, in increasing `le` order and ending with +Inf.
+    """
+    series = {}
+    others = []
+    for suffix, labels, value in samples:
+        if suffix != "_bucket":
+            others.append((suffix, labels, value))
+            continue
+        key = tuple(labels[:-1])
+        series.setdefault(key, {})[labels[-1][1]] = value
+
+    result = []
+    for key, buckets in series.items():
+        total = 0
+        bounds = sorted((b for b in buckets if b != "+Inf"), key=float) + ["+Inf"]
+        for bound in bounds:
+            total += buckets.get(bound, 0)
+            result.append(("_bucket", list(key) + [("le", bound)], total))
+    return result + others
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
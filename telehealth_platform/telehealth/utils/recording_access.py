@@ -0,0 +1,136 @@
+import json
+import mimetypes
+import posixpath
+import re
+import time
+from urllib.parse import unquote, urlparse
+import frappe
+from telehealth_platform.adapters import storage_adapter
+from telehealth_platform.telehealth.utils import metrics, profiling
+
+# Playback access to Video Recordings. Objects stay private in the bucket and
+# clients get presigned GET URLs, which S3 serves with byte-range support, so
+# players seek and buffer without downloading the whole recording. Recordings
+# with an HLS rendition (hls_playlist) are also served as a media playlist whose
+# segment URIs are presigned. Signed URLs and playlists are cached per
+# (recording, user) and re-signed once less than REFRESH_MARGIN of their
+# lifetime is left, so a client never gets a URL that is about to expire.
+# Each recording's entries live in one Redis hash (a field per user and
+# variant, JSON values, read and written with plain commands), so dropping
+# them all is a single DEL.
+RECORDING_URL_CACHE = "telehealth_recording_url"
+DEFAULT_URL_EXPIRY = 3600
+REFRESH_MARGIN = 300
+HLS_CONTENT_TYPE = "application/vnd.apple.mpegurl"
+URI_ATTRIBUTE_RE = re.compile(r'URI="([^"]+)"')
+
+def get_url_expiry():
+    return int(frappe.conf.get("recording_url_expiry") or DEFAULT_URL_EXPIRY)
+
+def get_playback_url(recording, user, rendition=None):
+    """
+    {"url", "content_type", "expires_at"} for the recording file, or one of its
+    renditions, signed for `user`. `recording` is a Video Recording row with
+    name and storage_url; `rendition` a row with tier, storage_key and content_type.
+    """
+    def build():
+        if rendition:
+            key, content_type = rendition.storage_key, rendition.content_type
+        else:
+            key, content_type = get_object_key(recording.storage_url, storage_adapter.get_bucket_name()), None
+        content_type = content_type or mimetypes.guess_type(key)[0] or "application/octet-stream"
+        return {"url": storage_adapter.sign_get(key, get_url_expiry(), content_type), "content_type": content_type}
+
+    return get_signed(recording.name, user, rendition.tier if rendition else "file", build)
+
+def get_hls_playlist(recording, user):
+    """
+    {"playlist", "expires_at"}: the recording's HLS media playlist with every
+    segment (and init/key URI) replaced by a presigned URL.
+    """
+    def build():
+        expiry = get_url_expiry()
+        text = storage_adapter.read_object(recording.hls_playlist).decode("utf-8")
+        return {"playlist": rewrite_playlist(text, recording.hls_playlist,
+            lambda key: storage_adapter.sign_get(key, expiry))}
+
+    return get_signed(recording.name, user, "hls", build)
+
+def get_signed(recording, user, variant, build):
+    cache = frappe.cache()
+    cache_key, field = get_cache_key(recording), f"{user}:{variant}"
+    pipe = cache.pipeline()
+    pipe.hget(cache_key, field)
+    raw = pipe.execute()[0]
+    entry = json.loads(raw) if raw else None
+    if entry and is_fresh(entry, time.time()):
+        metrics.incr("recording_url_cache_hits_total")
+        profiling.note_cache(hits=1)
+        return entry
+
+    metrics.incr("recording_url_cache_misses_total")
+    profiling.note_cache(misses=1)
+    expiry = get_url_expiry()
+    signed_at = time.time()
+    entry = dict(build(), expires_at=signed_at + expiry)
+    pipe = cache.pipeline()
+    pipe.hset(cache_key, field, json.dumps(entry))
+    # Entries due for refresh are re-signed on read; the hash goes once all have expired
+    pipe.expire(cache_key, expiry)
+    pipe.execute()
+    return entry
+
+def is_fresh(entry, now, margin=REFRESH_MARGIN):
+    return entry["expires_at"] - now > margin
+
+def get_cache_key(recording):
+    return frappe.cache().make_key(f"{RECORDING_URL_CACHE}:{recording}")
+
+def clear_urls(recording):
+    frappe.cache().delete(get_cache_key(recording))
+
+def clear_recording_urls(doc, method=None):
+    """
+    Video Recording doc event: drops every URL signed for the recording once the
+    transaction commits, so a moved or deleted object is not served from cache.
+    """
+    name = doc.name
+    frappe.db.after_commit.add(lambda: clear_urls(name))
+
+def get_object_key(storage_url, bucket=None):
+    """
+    Bucket key from a stored location: a plain key, s3://bucket/key, or an
+    http(s) object URL (virtual-hosted or path-style).
+    """
+    if storage_url.startswith("s3://"):
+        return storage_url[5:].split("/", 1)[-1]
+    if "://" in storage_url:
+        path = unquote(urlparse(storage_url).path).lstrip("/")
+        if bucket and path.startswith(f"{bucket}/"):
+            path = path[len(bucket) + 1:]
+        return path
+    return storage_url.lstrip("/")
+
+def rewrite_playlist(text, playlist_key, sign):
+    """
+    Replaces the relative URIs of an HLS media playlist (segments, and the
+    URI attribute of tags such as EXT-X-MAP and EXT-X-KEY) with `sign(key)`,
+    resolving them against the playlist's own key. Absolute URIs are kept.
+    """
+    base = posixpath.dirname(playlist_key)
+
+    def sign_uri(uri):
+        if "://" in uri:
+            return uri
+        key = uri.lstrip("/") if uri.startswith("/") else posixpath.normpath(posixpath.join(base, uri))
+        return sign(key)
+
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith("#"):
+            line = sign_uri(stripped)
+        elif stripped.startswith("#EXT") and 'URI="' in stripped:
+            line = URI_ATTRIBUTE_RE.sub(lambda m: f'URI="{sign_uri(m.group(1))}"', line)
+        lines.append(line)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,341 @@
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import frappe
+from frappe.utils import add_days, add_to_date, cint, flt, now_datetime
+from telehealth_platform.adapters import storage_adapter
+from telehealth_platform.telehealth.utils import job_utils, metrics, recording_access
+
+# Recording ingestion and lifecycle. LiveKit sends egress_ended once a room
+# recording has been uploaded to the bucket; the webhook registers a Video
+# Recording from the egress info and queues process_recording, which fills in
+# size and duration and, when tiers are enabled (recording_transcode_tiers in
+# site_config), transcodes the original into low-bitrate renditions that are
+# served for review playback. The daily lifecycle job deletes the objects of
+# recordings past expires_at, or with recording_expiry_action = "archive"
+# moves the original and the HLS output to a cold storage class and drops the
+# renditions, which can be transcoded again.
+# A processing job waits at most TRANSCODE_SLOT_WAIT for a transcode slot and
+# then re-queues itself instead of holding its worker, and ffmpeg is stopped in
+# time for the job to record its outcome within TRANSCODE_TIMEOUT. Recordings
+# still left in Processing (a job killed or lost) are re-queued by the hourly
+# requeue_stale_recordings.
+TRANSCODE_TIERS = {
+    # Clinician review: 480p at 15 fps, fast start so playback begins on the first range
+    "review": {"height": 480, "fps": 15, "video_bitrate": 500, "audio_bitrate": 64, "ext": "mp4",
+        "content_type": "video/mp4"},
+    "mobile": {"height": 360, "fps": 15, "video_bitrate": 250, "audio_bitrate": 48, "ext": "mp4",
+        "content_type": "video/mp4"},
+    "audio": {"audio_bitrate": 48, "ext": "m4a", "content_type": "audio/mp4"},
+}
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_ARCHIVE_STORAGE_CLASS = "GLACIER"
+DEFAULT_TRANSCODE_SLOTS = 2
+TRANSCODE_TIMEOUT = 4 * 3600
+TRANSCODE_SLOT_WAIT = 10 * 60
+MAX_SLOT_ATTEMPTS = 6
+FFMPEG_TIMEOUT = TRANSCODE_TIMEOUT - TRANSCODE_SLOT_WAIT - 30 * 60
+STALE_PROCESSING_MINUTES = TRANSCODE_TIMEOUT // 60 + 30
+MAX_PROCESSING_DAYS = 2
+LIFECYCLE_BATCH_SIZE = 500
+EGRESS_COMPLETE = "EGRESS_COMPLETE"
+
+def parse_egress(egress_info):
+    """
+    Flattens LiveKit EgressInfo (camelCase JSON or snake_case) into
+    {egress_id, room_name, status, storage_key, hls_playlist, size_bytes, duration}.
+    LiveKit reports durations in nanoseconds; duration is in seconds.
+    """
+    def get(data, name):
+        camel = name.split("_")[0] + "".join(part.title() for part in name.split("_")[1:])
+        return data.get(camel, data.get(name)) if data else None
+
+    files = get(egress_info, "file_results") or [get(egress_info, "file") or {}]
+    segments = get(egress_info, "segment_results") or [get(egress_info, "segments") or {}]
+    file, segment = files[0] or {}, segments[0] or {}
+    duration = cint(get(file, "duration") or get(segment, "duration"))
+
+    return {
+        "egress_id": get(egress_info, "egress_id"),
+        "room_name": get(egress_info, "room_name"),
+        "status": get(egress_info, "status"),
+        "storage_key": get(file, "filename") or
+            (recording_access.get_object_key(get(file, "location")) if get(file, "location") else None),
+        "hls_playlist": get(segment, "playlist_name"),
+        "size_bytes": cint(get(file, "size") or get(segment, "size")),
+        "duration": round(duration / 1e9) if duration else None
+    }
+
+def register_recording(egress_info):
+    """
+    Creates the Video Recording for a completed egress and queues its processing.
+    Idempotent per egress, since LiveKit retries webhooks.
+    """
+    info = parse_egress(egress_info)
+    if info["status"] != EGRESS_COMPLETE or not (info["storage_key"] or info["hls_playlist"]):
+        return None
+
+    existing = frappe.db.get_value("Video Recording", {"egress_id": info["egress_id"]}, "name")
+    if existing:
+        return existing
+
+    session = frappe.db.get_value("Telehealth Video Session", {"room_name": info["room_name"]}, "name")
+    if not session:
+        frappe.log_error(f"Egress {info['egress_id']} for unknown room {info['room_name']}", "Recording Ingest")
+        return None
+
+    retention_days = cint(frappe.conf.get("recording_retention_days")) or DEFAULT_RETENTION_DAYS
+    recording = frappe.get_doc({
+        "doctype": "Video Recording",
+        "video_session": session,
+        "egress_id": info["egress_id"],
+        "status": "Processing",
+        "storage_url": info["storage_key"],
+        "hls_playlist": info["hls_playlist"],
+        "size_mb": to_mb(info["size_bytes"]) if info["size_bytes"] else None,
+        "duration": info["duration"],
+        "expires_at": add_days(now_datetime(), retention_days)
+    })
+    try:
+        recording.insert(ignore_permissions=True)
+    except frappe.UniqueValidationError:
+        frappe.clear_messages()
+        frappe.db.rollback()
+        return frappe.db.get_value("Video Recording", {"egress_id": info["egress_id"]}, "name")
+
+    enqueue_processing(recording.name)
+    metrics.incr("recordings_registered_total")
+    return recording.name
+
+def enqueue_processing(recording, attempt=1):
+    """
+    Queues process_recording once the current transaction commits. Each
+    attempt has its own job id, since a job cannot re-queue its own.
+    """
+    frappe.enqueue(
+        "telehealth_platform.telehealth.utils.recording_ingest.process_recording",
+        queue="long",
+        timeout=TRANSCODE_TIMEOUT,
+        job_id=f"recording-ingest::{recording}" + (f"::{attempt}" if attempt > 1 else ""),
+        deduplicate=True,
+        enqueue_after_commit=True,
+        recording=recording,
+        attempt=attempt
+    )
+
+def process_recording(recording, attempt=1):
+    """
+    Background job: size, duration and review renditions of a registered recording.
+    """
+    doc = frappe.get_doc("Video Recording", recording)
+    if doc.status != "Processing":
+        return
+    try:
+        if doc.storage_url:
+            key = recording_access.get_object_key(doc.storage_url, storage_adapter.get_bucket_name())
+            if not doc.size_mb:
+                doc.size_mb = to_mb(storage_adapter.head_object(key)["ContentLength"])
+
+            # ffmpeg reads the private object over a presigned URL, no local copy
+            source = storage_adapter.sign_get(key, TRANSCODE_TIMEOUT)
+            if not doc.duration:
+                doc.duration = probe_duration(source)
+
+            tiers = get_transcode_tiers()
+            if tiers:
+                slots = cint(frappe.conf.get("recording_transcode_slots")) or DEFAULT_TRANSCODE_SLOTS
+                try:
+                    with job_utils.concurrency_slot("recording-transcode", slots, wait_timeout=TRANSCODE_SLOT_WAIT):
+                        renditions = transcode(source, key, tiers)
+                except job_utils.SlotTimeoutError:
+                    # Every slot is busy: free this worker and try again later
+                    # (after MAX_SLOT_ATTEMPTS, the hourly sweep does)
+                    doc.save(ignore_permissions=True)
+                    if attempt < MAX_SLOT_ATTEMPTS:
+                        enqueue_processing(recording, attempt + 1)
+                    frappe.db.commit()
+                    return
+                doc.set("renditions", renditions)
+        doc.status = "Ready"
+    except Exception as e:
+        frappe.log_error(f"Processing recording {recording} failed: {str(e)}", "Recording Ingest")
+        doc.status = "Failed"
+
+    doc.save(ignore_permissions=True)
+    frappe.db.commit()
+    metrics.incr(f"recordings_{doc.status.lower()}_total")
+
+def requeue_stale_recordings():
+    """
+    Hourly: re-queues recordings left in Processing by a killed or lost job,
+    and fails those still not processed MAX_PROCESSING_DAYS after registration.
+    """
+    now = now_datetime()
+    recordings = frappe.get_all("Video Recording",
+        filters={"status": "Processing", "modified": ["<", add_to_date(now, minutes=-STALE_PROCESSING_MINUTES)]},
+        fields=["name", "creation"],
+        limit=LIFECYCLE_BATCH_SIZE
+    )
+    for row in recordings:
+        if row.creation < add_days(now, -MAX_PROCESSING_DAYS):
+            frappe.db.set_value("Video Recording", row.name, "status", "Failed")
+            frappe.log_error(f"Recording {row.name} was not processed within {MAX_PROCESSING_DAYS} days",
+                "Recording Ingest")
+        else:
+            enqueue_processing(row.name)
+    frappe.db.commit()
+
+def get_transcode_tiers():
+    """
+    Tiers enabled in site_config, when ffmpeg is available on the worker.
+    """
+    tiers = [t for t in frappe.conf.get("recording_transcode_tiers") or [] if t in TRANSCODE_TIERS]
+    if tiers and not shutil.which("ffmpeg"):
+        frappe.logger().warning("recording_transcode_tiers is set but ffmpeg is not installed")
+        return []
+    return tiers
+
+def transcode(source, key, tiers):
+    """
+    Encodes the tiers in parallel, one ffmpeg process each, then uploads the
+    results from the job thread (the pool threads have no Frappe site context).
+    Returns rendition rows; failed tiers are logged and left out.
+    """
+    renditions = []
+    with tempfile.TemporaryDirectory(prefix="recording-") as workdir:
+        def run(tier):
+            spec = TRANSCODE_TIERS[tier]
+            output = os.path.join(workdir, f"{tier}.{spec['ext']}")
+            subprocess.run(build_ffmpeg_args(source, output, spec), check=True, capture_output=True,
+                timeout=FFMPEG_TIMEOUT)
+            return output
+
+        with ThreadPoolExecutor(max_workers=len(tiers)) as pool:
+            futures = {tier: pool.submit(run, tier) for tier in tiers}
+        for tier, future in futures.items():
+            spec = TRANSCODE_TIERS[tier]
+            try:
+                output = future.result()
+                rendition_key = get_rendition_key(key, tier, spec["ext"])
+                storage_adapter.upload_file(output, rendition_key, spec["content_type"])
+                renditions.append({"tier": tier, "storage_key": rendition_key, "content_type": spec["content_type"],
+                    "size_mb": to_mb(os.path.getsize(output))})
+            except Exception as e:
+                stderr = getattr(e, "stderr", None) or b""
+                frappe.log_error(f"Transcoding {key} to {tier} failed: {str(e)} {stderr.decode(errors='ignore')[-1000:]}",
+                    "Recording Ingest")
+    return renditions
+
+def build_ffmpeg_args(source, output, spec):
+    args = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", source]
+    if spec.get("height"):
+        bitrate = spec["video_bitrate"]
+        args += ["-vf", f"scale=-2:{spec['height']},fps={spec['fps']}",
+            "-c:v", "libx264", "-preset", "veryfast",
+            "-b:v", f"{bitrate}k", "-maxrate", f"{bitrate}k", "-bufsize", f"{bitrate * 2}k"]
+    else:
+        args += ["-vn"]
+    args += ["-c:a", "aac", "-b:a", f"{spec['audio_bitrate']}k", "-ac", "1", "-movflags", "+faststart", output]
+    return args
+
+def probe_duration(source):
+    if not shutil.which("ffprobe"):
+        return None
+    result = subprocess.run(["ffprobe", "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", source], capture_output=True, text=True, timeout=300)
+    return round(flt(result.stdout.strip())) or None
+
+def get_rendition_key(key, tier, ext):
+    return f"{posixpath.splitext(key)[0]}.{tier}.{ext}"
+
+def to_mb(size_bytes):
+    return flt(size_bytes / (1024 * 1024), 2)
+
+def expire_recordings():
+    """
+    Daily lifecycle job: deletes (or archives) the objects of recordings past
+    expires_at, in batches with one bulk S3 delete and one UPDATE per batch.
+    Recordings whose objects could not be removed are retried the next day.
+    """
+    action = "archive" if frappe.conf.get("recording_expiry_action") == "archive" else "delete"
+    storage_class = frappe.conf.get("recording_archive_storage_class") or DEFAULT_ARCHIVE_STORAGE_CLASS
+    recording = frappe.qb.DocType("Video Recording")
+    failed = set()
+    expired, freed_mb = 0, 0
+
+    while True:
+        filters = {"expires_at": ["<", now_datetime()], "status": ["not in", ["Archived", "Deleted"]]}
+        if failed:
+            filters["name"] = ["not in", list(failed)]
+        batch = frappe.get_all("Video Recording", filters=filters,
+            fields=["name", "storage_url", "hls_playlist", "size_mb"], order_by="expires_at asc",
+            limit=LIFECYCLE_BATCH_SIZE)
+        if not batch:
+            break
+
+        renditions = frappe.get_all("Video Recording Rendition",
+            filters={"parenttype": "Video Recording", "parent": ["in", [r.name for r in batch]]},
+            fields=["parent", "storage_key", "size_mb"])
+        derived, sources = get_recording_keys(batch, renditions)
+        keys = derived if action == "archive" else {name: derived[name] + sources[name] for name in derived}
+
+        errors = storage_adapter.delete_objects([k for ks in keys.values() for k in ks])
+        done = []
+        for row in batch:
+            try:
+                if any(k in errors for k in keys[row.name]):
+                    raise Exception(", ".join(errors[k] for k in keys[row.name] if k in errors))
+                if action == "archive":
+                    for key in sources[row.name]:
+                        storage_adapter.archive_object(key, storage_class)
+                done.append(row.name)
+            except Exception as e:
+                failed.add(row.name)
+                frappe.log_error(f"Expiring recording {row.name} failed: {str(e)}", "Recording Lifecycle")
+
+        if done:
+            frappe.qb.update(recording).set(recording.status, "Archived" if action == "archive" else "Deleted") \
+                .where(recording.name.isin(done)).run()
+            frappe.db.delete("Video Recording Rendition", {"parenttype": "Video Recording", "parent": ["in", done]})
+            frappe.db.commit()
+            frappe.cache().delete(*[recording_access.get_cache_key(name) for name in done])
+
+        done = set(done)
+        expired += len(done)
+        freed_mb += sum(flt(r.size_mb) for r in renditions if r.parent in done)
+        if action == "delete":
+            freed_mb += sum(flt(r.size_mb) for r in batch if r.name in done)
+
+    if expired:
+        metrics.incr("recordings_expired_total", expired)
+        metrics.incr("recording_storage_freed_mb_total", freed_mb)
+        frappe.logger().info(f"Recording lifecycle: {action} {expired} recordings, {flt(freed_mb, 1)} MB freed")
+    return {"action": action, "recordings": expired, "freed_mb": flt(freed_mb, 2), "failed": len(failed)}
+
+def get_recording_keys(batch, renditions):
+    """
+    Object keys per recording, split into ({recording: [rendition keys]},
+    {recording: [original, HLS playlist and the segments it lists]}).
+    """
+    bucket = storage_adapter.get_bucket_name()
+    derived = {row.name: [] for row in batch}
+    keys = {row.name: [] for row in batch}
+    for rendition in renditions:
+        derived[rendition.parent].append(rendition.storage_key)
+
+    for row in batch:
+        if row.storage_url:
+            keys[row.name].append(recording_access.get_object_key(row.storage_url, bucket))
+        if row.hls_playlist:
+            segments = []
+            try:
+                recording_access.rewrite_playlist(storage_adapter.read_object(row.hls_playlist).decode("utf-8"),
+                    row.hls_playlist, lambda key: segments.append(key) or key)
+            except Exception:
+                # Already gone: only the playlist key is left
+                pass
+            keys[row.name] += segments + [row.hls_playlist]
+    return derived, keys
@@ -0,0 +1,83 @@
+import time
+import frappe
+from telehealth_platform.telehealth.utils.text_index import TextIndex
+
+# Per-worker search indexes over reference doctypes. A worker builds an index
+# on first use, then every `refresh_interval` seconds applies only the rows
+# modified since its watermark. Deletes and renames cannot be seen that way, so
+# they bump a per-doctype version in Redis that makes every worker rebuild.
+REFRESH_INTERVAL = 30
+VERSION_KEY = "telehealth_reference_index_version"
+
+# (site, index name) -> {"index", "version", "watermark", "checked"}
+_state = {}
+
+class ReferenceIndex:
+    def __init__(self, name, doctype, fields, get_texts, is_active=None, refresh_interval=REFRESH_INTERVAL):
+        self.name = name
+        self.doctype = doctype
+        self.fields = fields
+        # row -> list of texts the row is found by (name, aliases, codes).
+        # Rows only carry the fields the doctype has, so read them with row.get()
+        self.get_texts = get_texts
+        self.is_active = is_active or (lambda row: True)
+        self.refresh_interval = refresh_interval
+
+    def get(self):
+        """
+        The site's TextIndex, loaded or refreshed as needed. Payloads are the fetched rows.
+        """
+        key = (frappe.local.site, self.name)
+        state = _state.get(key)
+        now = time.monotonic()
+        if state and now - state["checked"] < self.refresh_interval:
+            return state["index"]
+
+        version = get_version(self.doctype)
+        if not state or state["version"] != version:
+            state = {"index": TextIndex(), "version": version, "watermark": None}
+            _state[key] = state
+        self.apply(state, self.fetch(state["watermark"]))
+        state["index"].ensure_sorted()
+        state["checked"] = now
+        return state["index"]
+
+    def fetch(self, since=None):
+        # ">=" re-reads rows sharing the watermark timestamp, which is harmless,
+        # instead of missing rows committed later with the same timestamp
+        filters = {"modified": (">=", since)} if since else {}
+        # Optional fields differ between Frappe Health versions
+        meta = frappe.get_meta(self.doctype)
+        fields = [f for f in self.fields if meta.has_field(f)]
+        return frappe.get_all(self.doctype, filters=filters,
+            fields=["name", "modified"] + fields, order_by="modified asc")
+
+    def apply(self, state, rows):
+        index = state["index"]
+        for row in rows:
+            if self.is_active(row):
+                index.add(row.name, self.get_texts(row), row)
+            else:
+                index.remove(row.name)
+            state["watermark"] = row.modified
+
+    def search(self, query, limit=10, min_score=None):
+        """
+        Returns up to `limit` matching rows with their "score", best first.
+        """
+        index = self.get()
+        kwargs = {"min_score": min_score} if min_score is not None else {}
+        return [dict(index.payloads[key], score=score) for key, score in index.search(query, limit, **kwargs)]
+
+def get_version(doctype):
+    return frappe.cache().hget(VERSION_KEY, doctype)
+
+def invalidate(doc, method=None):
+    """
+    Doc event (on_trash, after_rename): makes workers rebuild indexes over doc.doctype.
+    """
+    # A fresh token rather than a counter, so concurrent bumps never cancel out
+    frappe.cache().hset(VERSION_KEY, doc.doctype, frappe.generate_hash(length=10))
+
+def get_lines(text):
+    return [line.strip() for line in (text or "").splitlines() if line.strip()]
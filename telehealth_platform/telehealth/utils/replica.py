@@ -0,0 +1,166 @@
+import threading
+import time
+from contextlib import contextmanager
+import frappe
+from telehealth_platform.telehealth.utils import metrics
+
+# Read-only API handlers (router.REPLICA_READS) run against the read replica
+# configured for frappe.read_only (read_from_replica, replica_host and
+# replica_db_port in site_config), unless:
+# - replication lag is unknown or above replica_max_lag_seconds. Lag is read
+#   from SHOW SLAVE STATUS on the replica (the site's database user needs
+#   REPLICATION CLIENT, or REPLICA MONITOR on MariaDB 10.5+) and cached in Redis
+#   for LAG_CHECK_SECONDS, so at most one check per site every few seconds;
+# - the user wrote through the API in the last replica_sticky_seconds, so they
+#   read their own writes from the primary.
+# Replica connections are kept per worker thread and site and reused across
+# requests. Each use ends with a rollback, so the next request reads a fresh
+# snapshot; connections idle longer than IDLE_SECONDS are reopened.
+#
+# To try it with two local MariaDB instances, set up the second as a replica of
+# the first and point replica_host / replica_db_port at it.
+DEFAULT_MAX_LAG_SECONDS = 5
+DEFAULT_STICKY_SECONDS = 10
+LAG_CHECK_SECONDS = 2
+IDLE_SECONDS = 60
+LAG_CACHE_KEY = "telehealth_replica_lag"
+STICKY_CACHE_KEY = "telehealth_replica_sticky"
+READ_METHODS = ("GET", "HEAD")
+
+connections = threading.local()
+
+def is_enabled():
+    return bool(frappe.conf.get("read_from_replica") and frappe.conf.get("replica_host"))
+
+@contextmanager
+def route_reads(method, read_only):
+    """
+    Runs the block on the replica when the handler is `read_only` and the
+    replica is fresh enough for the user; after a write request, keeps the
+    user on the primary for a while.
+    """
+    user = frappe.session.user
+    if not is_enabled() or getattr(frappe.local, "replica_db", None):
+        yield
+        return
+
+    route = get_route(is_sticky(user), get_lag(), get_max_lag()) if read_only else None
+    if route != "replica":
+        if route:
+            metrics.incr(f"replica_fallback_{route}_total")
+        try:
+            yield
+        finally:
+            if method not in READ_METHODS and user != "Guest":
+                mark_sticky(user)
+        return
+
+    primary = frappe.local.db
+    replica = get_connection()
+    # frappe.read_only / connect_replica inside the handler keep using this connection
+    frappe.local.primary_db = primary
+    frappe.local.replica_db = replica
+    frappe.local.db = replica
+    metrics.incr("replica_reads_total")
+    try:
+        yield
+    finally:
+        frappe.local.db = primary
+        del frappe.local.replica_db
+        del frappe.local.primary_db
+        release(replica)
+
+def get_route(sticky, lag, max_lag):
+    """
+    "replica" for a read-only request, or why it stays on the primary:
+    "sticky", "unavailable" (lag unknown) or "lag".
+    """
+    if sticky:
+        return "sticky"
+    if lag is None:
+        return "unavailable"
+    if lag > max_lag:
+        return "lag"
+    return "replica"
+
+def get_max_lag():
+    return float(frappe.conf.get("replica_max_lag_seconds") or DEFAULT_MAX_LAG_SECONDS)
+
+def get_lag():
+    """
+    Replication lag in seconds, None when the replica is down, not
+    replicating or cannot be checked.
+    """
+    lag = frappe.cache().get_value(LAG_CACHE_KEY)
+    if lag is None:
+        try:
+            db = get_connection()
+            lag = parse_lag(db.sql("show slave status", as_dict=True))
+            release(db)
+        except Exception:
+            frappe.logger().exception("Checking replica lag failed")
+            discard_connection()
+            lag = None
+        # -1 caches "unknown" as well, so a broken replica is not probed on every request
+        frappe.cache().set_value(LAG_CACHE_KEY, -1 if lag is None else lag, expires_in_sec=LAG_CHECK_SECONDS)
+    return None if lag < 0 else lag
+
+def parse_lag(rows):
+    """
+    Seconds_Behind_Master of the (only) replication channel; None when
+    replication is not configured or stopped.
+    """
+    if not rows:
+        return None
+    lags = [row.get("Seconds_Behind_Master") for row in rows]
+    if any(lag is None for lag in lags):
+        return None
+    return max(float(lag) for lag in lags)
+
+def is_sticky(user):
+    return user != "Guest" and bool(frappe.cache().get_value(f"{STICKY_CACHE_KEY}|{user}"))
+
+def mark_sticky(user):
+    seconds = int(frappe.conf.get("replica_sticky_seconds") or DEFAULT_STICKY_SECONDS)
+    frappe.cache().set_value(f"{STICKY_CACHE_KEY}|{user}", 1, expires_in_sec=seconds)
+
+def get_pool():
+    if not hasattr(connections, "by_site"):
+        connections.by_site = {}
+    return connections.by_site
+
+def get_connection():
+    """
+    This thread's replica connection for the current site, opened as
+    frappe.connect_replica does.
+    """
+    pool = get_pool()
+    site = frappe.local.site
+    entry = pool.get(site)
+    if entry and time.monotonic() - entry[1] > IDLE_SECONDS:
+        discard_connection()
+        entry = None
+    if not entry:
+        from frappe.database import get_db
+        conf = frappe.local.conf
+        user, password = conf.db_name, conf.db_password
+        if conf.different_credentials_for_replica:
+            user, password = conf.replica_db_name, conf.replica_db_password
+        entry = [get_db(host=conf.replica_host, user=user, password=password, port=conf.replica_db_port), 0]
+        pool[site] = entry
+    entry[1] = time.monotonic()
+    return entry[0]
+
+def release(db):
+    try:
+        db.rollback()
+    except Exception:
+        discard_connection()
+
+def discard_connection():
+    entry = get_pool().pop(frappe.local.site, None)
+    if entry:
+        try:
+            entry[0].close()
+        except Exception:
+            pass
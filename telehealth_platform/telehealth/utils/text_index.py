@@ -0,0 +1,282 @@
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from heapq import heappush, heappushpop
+
+# In-memory lookup index for short reference names (payers, medications, ...).
+# Exact and prefix matches come from a dict and a sorted term list. Anything
+# else is matched word by word: each query word is looked up in the vocabulary
+# (exactly, by prefix, or by trigram similarity for misspellings) and entries
+# are ranked by how much of the query, weighted by word rarity, they cover.
+# Pure Python, no Frappe imports, so the benchmarks can build it without a site.
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.9
+TOKEN_PREFIX_SCORE = 0.8
+# Word-level matches are scaled below the prefix scores
+FUZZY_WEIGHT = 0.75
+DEFAULT_MIN_SCORE = 0.3
+# Vocabulary words at least this similar to a query word count as a match
+MIN_TOKEN_SIMILARITY = 0.5
+MAX_TOKEN_EXPANSIONS = 20
+# A misspelt word is not matched to words found in more than this share of
+# entries: a weak match to "health" or "plan" says nothing about the entry
+COMMON_WORD_SHARE = 0.05
+
+# Bracketed notes and punctuation carry no meaning for matching ("Aetna (OCR)")
+NOISE_RE = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+NON_WORD_RE = re.compile(r"[\W_]+")
+
+def normalize(text):
+    """
+    Lower-cased, accent-free text with punctuation and bracketed notes removed.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = NOISE_RE.sub(" ", text)
+    return NON_WORD_RE.sub(" ", text).strip()
+
+def get_trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TextIndex:
+    def __init__(self):
+        # key -> [(normalized text, frozenset of words)] for every text indexed under it
+        self.entries = {}
+        self.payloads = {}
+        self.exact = {}
+        # (term, is_word, key) for whole texts (is_word 0) and their words (1).
+        # Sorted, and purged of removed items, lazily on the next search so bulk
+        # loads and refreshes do not pay per item
+        self.prefixes = []
+        self.stale = set()
+        self.postings = {}
+        self.word_trigrams = {}
+        self.vocabulary = []
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def add(self, key, texts, payload=None):
+        """
+        Indexes `key` under one or more texts (a name and its aliases).
+        Re-adding a key replaces what was indexed before.
+        """
+        if key in self.entries:
+            self.remove(key)
+        if isinstance(texts, str):
+            texts = [texts]
+
+        entries = []
+        for text in texts:
+            normalized = normalize(text)
+            if not normalized or any(e[0] == normalized for e in entries):
+                continue
+            words = frozenset(normalized.split())
+            entries.append((normalized, words))
+
+            self.exact.setdefault(normalized, set()).add(key)
+            self.add_prefix((normalized, 0, key))
+            if len(words) > 1:
+                for word in words:
+                    self.add_prefix((word, 1, key))
+            for word in words:
+                if word not in self.postings:
+                    self.postings[word] = set()
+                    for trigram in get_trigrams(word):
+                        self.word_trigrams.setdefault(trigram, set()).add(word)
+                self.postings[word].add(key)
+
+        self.entries[key] = entries
+        self.payloads[key] = payload
+        self.dirty = True
+
+    def remove(self, key):
+        entries = self.entries.pop(key, None)
+        if entries is None:
+            return
+        self.payloads.pop(key, None)
+        for normalized, words in entries:
+            discard(self.exact, normalized, key)
+            self.stale.add((normalized, 0, key))
+            if len(words) > 1:
+                self.stale.update((word, 1, key) for word in words)
+            for word in words:
+                discard(self.postings, word, key)
+                if word not in self.postings:
+                    for trigram in get_trigrams(word):
+                        discard(self.word_trigrams, trigram, word)
+        self.dirty = True
+
+    def add_prefix(self, item):
+        if item in self.stale:
+            # Removed and re-added before a search: the old copy is still listed
+            self.stale.discard(item)
+        else:
+            self.prefixes.append(item)
+
+    def ensure_sorted(self):
+        if self.dirty:
+            if self.stale:
+                self.prefixes = [item for item in self.prefixes if item not in self.stale]
+                self.stale = set()
+            self.prefixes.sort()
+            self.vocabulary = sorted(self.postings)
+            self.dirty = False
+
+    def search(self, query, limit=10, min_score=DEFAULT_MIN_SCORE):
+        """
+        Returns up to `limit` (key, score) pairs, best first. Exact matches score 1,
+        prefixes of the whole text 0.9, prefixes of a word 0.8, and word-level
+        fuzzy matches up to 0.75.
+        """
+        normalized = normalize(query)
+        if not normalized:
+            return []
+        self.ensure_sorted()
+
+        scores = {}
+        for key in self.exact.get(normalized, ()):
+            scores[key] = EXACT_SCORE
+
+        # Prefix matches: one bisect, then a bounded forward scan
+        i = bisect_left(self.prefixes, (normalized,))
+        scanned = 0
+        while i < len(self.prefixes) and scanned < limit * 4:
+            term, is_word, key = self.prefixes[i]
+            if not term.startswith(normalized):
+                break
+            score = TOKEN_PREFIX_SCORE if is_word else PREFIX_SCORE
+            if scores.get(key, 0) < score:
+                scores[key] = score
+            i += 1
+            scanned += 1
+
+        if len(scores) < limit:
+            for key, similarity in self.get_fuzzy_matches(normalized.split(), min_score / FUZZY_WEIGHT, limit):
+                score = similarity * FUZZY_WEIGHT
+                if scores.get(key, 0) < score:
+                    scores[key] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(key, round(score, 4)) for key, score in ranked[:limit] if score >= min_score]
+
+    def get_word_matches(self, word, is_last):
+        """
+        {vocabulary word: similarity} for one query word. The last query word may
+        still be being typed, so it also matches as a prefix.
+        """
+        if word in self.postings:
+            matches = {word: 1.0}
+        else:
+            matches = {}
+            if len(word) > 2:
+                query = get_trigrams(word)
+                common = max(1, COMMON_WORD_SHARE * len(self.entries))
+                shared = {}
+                for trigram in query:
+                    for candidate in self.word_trigrams.get(trigram, ()):
+                        shared[candidate] = shared.get(candidate, 0) + 1
+                for candidate, count in shared.items():
+                    similarity = 2.0 * count / (len(query) + len(candidate))
+                    if similarity >= MIN_TOKEN_SIMILARITY and len(self.postings[candidate]) <= common:
+                        matches[candidate] = similarity
+
+        if is_last:
+            i = bisect_left(self.vocabulary, word)
+            for candidate in self.vocabulary[i:i + MAX_TOKEN_EXPANSIONS]:
+                if not candidate.startswith(word):
+                    break
+                matches.setdefault(candidate, PREFIX_SCORE)
+        return matches
+
+    def get_fuzzy_matches(self, words, min_similarity=0.0, limit=10):
+        """
+        Up to `limit` (key, score) pairs for keys matching the query words. The
+        score is the share of the query covered, weighting each word by its rarity
+        (idf), lowered a little for entries with many words the query does not mention.
+        """
+        total = float(len(self.entries)) or 1.0
+        per_word = []
+        for i, word in enumerate(words):
+            matches = self.get_word_matches(word, i == len(words) - 1)
+            # Words found nowhere still count against the score, as if very rare
+            frequency = sum(len(self.postings[match]) for match in matches)
+            per_word.append((matches, math.log(1 + total / (1 + frequency))))
+        weight_total = sum(weight for _matches, weight in per_word)
+        if not weight_total:
+            return []
+
+        # vocabulary word -> [(query word position, weighted similarity)]
+        lookup = {}
+        for i, (matches, weight) in enumerate(per_word):
+            for match, similarity in matches.items():
+                lookup.setdefault(match, []).append((i, weight * similarity))
+
+        # Max-score traversal: keys are enumerated from the rarest words' postings
+        # first. A key not reached yet can only match the remaining words, so once
+        # their weight cannot beat the current top `limit` scores the common words
+        # ("health", "plan") are never enumerated at all.
+        found = sorted((w for w in per_word if w[0]), key=lambda w: -w[1])
+        remaining = sum(weight for _matches, weight in found)
+        threshold = min_similarity
+        top, scored = [], set()
+        for matches, weight in found:
+            if remaining / weight_total < threshold:
+                break
+            remaining -= weight
+            # Closest vocabulary words first: keys reached only through a weaker
+            # match are bounded by that match's similarity
+            for match, similarity in sorted(matches.items(), key=lambda m: -m[1]):
+                if (weight * similarity + remaining) / weight_total < threshold:
+                    break
+                for key in self.postings[match]:
+                    if key in scored:
+                        continue
+                    scored.add(key)
+                    score = self.get_entry_score(key, lookup, weight_total)
+                    if score < threshold:
+                        continue
+                    if len(top) < limit:
+                        heappush(top, (score, key))
+                    else:
+                        heappushpop(top, (score, key))
+                    if len(top) == limit:
+                        threshold = max(threshold, top[0][0])
+        return [(key, score) for score, key in top]
+
+    def get_entry_score(self, key, lookup, weight_total):
+        best = 0
+        for _normalized, entry_words in self.entries[key]:
+            covered = {}
+            for word in entry_words:
+                for i, value in lookup.get(word, ()):
+                    if value > covered.get(i, 0):
+                        covered[i] = value
+            if covered:
+                score = sum(covered.values()) / weight_total \
+                    * (0.8 + 0.2 * min(1.0, len(covered) / float(len(entry_words))))
+                best = max(best, score)
+        return best
+
+    def best_match(self, query, min_score=DEFAULT_MIN_SCORE):
+        """
+        (key, score, payload) of the top result, or None.
+        """
+        results = self.search(query, limit=1, min_score=min_score)
+        if not results:
+            return None
+        key, score = results[0]
+        return key, score, self.payloads.get(key)
+
+def discard(postings, term, key):
+    keys = postings.get(term)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del postings[term]
@@ -0,0 +1,207 @@
+import base64
+import binascii
+import hashlib
+import io
+import mimetypes
+import os
+import time
+import frappe
+from frappe import _
+from werkzeug.utils import secure_filename
+from telehealth_platform.telehealth.utils import blob_store, metrics
+
+# Uploads are copied in fixed-size chunks so peak memory per upload does not
+# depend on the file size. Werkzeug already spools large multipart parts to disk.
+CHUNK_SIZE = 1024 * 1024
+UPLOAD_SESSION_PREFIX = "telehealth_upload_session:"
+UPLOAD_SESSION_TTL = 24 * 3600
+
+def get_spool_dir():
+    """
+    Site-local directory for partial uploads. It lives outside private/files so
+    incomplete uploads are never served.
+    """
+    path = frappe.get_site_path("private", "uploads")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def spool_stream(stream, path, mode="wb", chunk_size=CHUNK_SIZE):
+    """
+    Copies a readable stream to `path` chunk by chunk.
+    Returns (bytes_written, sha256 hexdigest of the bytes written).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, mode) as f:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """
+    Streams a file from disk through SHA-256.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def decode_base64_payload(payload):
+    """
+    Decodes a base64 string or data URI (data:<mime>;base64,<data>).
+    Returns (content bytes, mime type or None). Raises ValidationError if invalid.
+    """
+    mime_type = None
+    if payload.startswith("data:") and "," in payload:
+        header, payload = payload.split(",", 1)
+        mime_type = header[5:].split(";", 1)[0] or None
+    try:
+        return base64.b64decode(payload, validate=True), mime_type
+    except (binascii.Error, ValueError):
+        frappe.throw(_("File attachment must be a multipart upload or base64 encoded"), frappe.ValidationError)
+
+def get_request_upload(fieldname, value=None):
+    """
+    Returns (stream, file_name, mime_type) for a file sent as multipart field
+    `fieldname`, or as a base64 string / data URI in `value`. None if nothing was sent.
+    """
+    files = getattr(frappe.request, "files", None)
+    if files and fieldname in files:
+        file_obj = files[fieldname]
+        return file_obj.stream, file_obj.filename, file_obj.mimetype
+    if value:
+        content, mime_type = decode_base64_payload(value)
+        return io.BytesIO(content), None, mime_type
+    return None
+
+def get_file_name(file_name, fallback, mime_type=None):
+    name = secure_filename(file_name or "") or secure_filename(fallback) or "upload"
+    if not os.path.splitext(name)[1] and mime_type:
+        name += mimetypes.guess_extension(mime_type) or ""
+    return name
+
+def save_stream(stream, file_name, doctype, docname, is_upload=True):
+    """
+    Streams an upload to a temporary spool file, hashing it on the way, then attaches it.
+    Pass is_upload=False for files the app generates, so they stay out of the
+    upload metrics.
+    """
+    started = time.monotonic()
+    spool_path = os.path.join(get_spool_dir(), frappe.generate_hash(length=16))
+    try:
+        size, content_hash = spool_stream(stream, spool_path)
+        return attach_spooled_file(spool_path, file_name, doctype, docname, content_hash, size, started,
+            is_upload=is_upload)
+    finally:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+
+def attach_spooled_file(spool_path, file_name, doctype, docname, content_hash, size, started=None, is_upload=True):
+    """
+    Moves a fully spooled file into the content-addressed blob store and creates
+    the File record for `docname` without ever reading the content into memory.
+    Identical content is stored once; each document still gets its own File.
+    """
+    started = started or time.monotonic()
+    file_url = blob_store.store(spool_path, content_hash, size, file_name, is_upload=is_upload)
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": file_url,
+        "is_private": 1,
+        "folder": "Home/Attachments",
+        "attached_to_doctype": doctype,
+        "attached_to_name": docname,
+        "file_size": size,
+        "content_hash": content_hash
+    })
+    # File.before_insert reads the file back into memory and saves its own copy
+    # under private/files (deduplicated by MD5). The blob is already in place,
+    # so the row is written directly.
+    file_doc.set_new_name()
+    file_doc.set_user_and_timestamp()
+    file_doc.db_insert()
+
+    if is_upload:
+        metrics.incr("upload_total")
+        metrics.incr("upload_bytes_total", size)
+        metrics.observe("upload_latency_seconds", time.monotonic() - started)
+    return file_doc
+
+# Resumable uploads
+# -----------------
+# A session reserves a spool file; the client PUTs chunks at increasing offsets and
+# may ask for the received byte count to resume after a dropped connection.
+
+def create_session(user, file_name, total_size=None, **meta):
+    session_id = frappe.generate_hash(length=20)
+    session = {
+        "session_id": session_id,
+        "user": user,
+        "file_name": file_name,
+        "total_size": int(total_size) if total_size else None,
+        "meta": meta
+    }
+    open(get_session_path(session_id), "wb").close()
+    frappe.cache().set_value(UPLOAD_SESSION_PREFIX + session_id, session, expires_in_sec=UPLOAD_SESSION_TTL)
+    return session
+
+def get_session(session_id, user):
+    """
+    Returns the upload session if it exists and belongs to `user`, else None.
+    """
+    session = frappe.cache().get_value(UPLOAD_SESSION_PREFIX + session_id)
+    if not session or session["user"] != user or not os.path.exists(get_session_path(session_id)):
+        return None
+    return session
+
+def get_session_path(session_id):
+    return os.path.join(get_spool_dir(), f"{secure_filename(session_id)}.part")
+
+def get_received_bytes(session_id):
+    return os.path.getsize(get_session_path(session_id))
+
+def append_chunk(session, offset, stream):
+    """
+    Appends a chunk at `offset`. The spool file size is the source of truth, so a
+    chunk is only accepted at the current end of the file.
+    Returns the number of bytes received so far.
+    """
+    received = get_received_bytes(session["session_id"])
+    if int(offset) != received:
+        return None
+
+    size, _digest = spool_stream(stream, get_session_path(session["session_id"]), mode="ab")
+    received += size
+    if session["total_size"] and received > session["total_size"]:
+        frappe.throw(_("Upload exceeds the declared file size"), frappe.ValidationError)
+    return received
+
+def discard_session(session_id):
+    frappe.cache().delete_value(UPLOAD_SESSION_PREFIX + session_id)
+    path = get_session_path(session_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+def remove_abandoned_sessions():
+    """
+    Hourly: deletes the spool files of resumable uploads whose session expired
+    before they were completed or discarded.
+    """
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    for entry in os.scandir(get_spool_dir()):
+        if not entry.name.endswith(".part") or entry.stat().st_mtime > cutoff:
+            continue
+        session_id = entry.name[:-len(".part")]
+        if frappe.cache().get_value(UPLOAD_SESSION_PREFIX + session_id) is None:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,44 @@
+import unittest
+from telehealth_platform.telehealth.utils.allergy_matcher import AhoCorasick, AllergyMatcher
+
+class TestAllergyMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = AllergyMatcher({
+            "Zosyn": (["piperacillin", "tazobactam"], ["penicillins"]),
+            "Tylenol": None
+        })
+        self.allergies = [
+            {"allergen": "Penicillin", "severity": "Severe"},
+            {"allergen": "Sulfa drugs", "severity": "Moderate"},
+            {"allergen": "Peanuts", "severity": "Mild"}
+        ]
+
+    def test_aho_corasick_finds_overlapping_patterns(self):
+        automaton = AhoCorasick({"he": "he", "she": "she", "hers": "hers"})
+        self.assertEqual(sorted(automaton.find("ushers")), ["he", "hers", "she"])
+
+    def test_resolve_matches_whole_words_only(self):
+        self.assertEqual(self.matcher.resolve("Augmentin 875 mg Tablet"),
+            ({"amoxicillin", "clavulanate"}, {"penicillins"}))
+        self.assertEqual(self.matcher.resolve("Cipronella Oil"), (set(), set()))
+
+    def test_batch_check(self):
+        conflicts = self.matcher.check(self.allergies,
+            ["Amoxicillin 500 mg", "Cephalexin 250 mg", "Bactrim DS", "Ibuprofen 200 mg", "Zosyn 4.5 g"])
+
+        self.assertEqual([c["match"] for c in conflicts["Amoxicillin 500 mg"]], ["class"])
+        self.assertEqual([c["match"] for c in conflicts["Cephalexin 250 mg"]], ["cross_reactivity"])
+        self.assertEqual(conflicts["Bactrim DS"][0]["allergen"], "Sulfa drugs")
+        self.assertEqual(conflicts["Ibuprofen 200 mg"], [])
+        self.assertEqual(conflicts["Zosyn 4.5 g"][0]["matched_on"], ["penicillins"])
+
+    def test_unknown_names_fall_back_to_name_match(self):
+        conflicts = self.matcher.check(self.allergies, ["Peanuts Oil Emulsion"])
+        self.assertEqual(conflicts["Peanuts Oil Emulsion"][0]["match"], "name")
+
+    def test_removed_default_term(self):
+        conflicts = self.matcher.check([{"allergen": "Acetaminophen"}], ["Tylenol 500 mg"])
+        self.assertEqual(conflicts["Tylenol 500 mg"], [])
+
+if __name__ == "__main__":
+    unittest.main()
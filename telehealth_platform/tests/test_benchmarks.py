@@ -0,0 +1,32 @@
+import unittest
+from telehealth_platform.benchmarks import compare, harness, synthetic
+
+class TestBenchmarks(unittest.TestCase):
+    def test_compare_flags_latency_and_throughput_regressions(self):
+        old = {"router_dispatch": {"iterations": 1000, "latency_us": {"p50": 10.0, "p95": 20.0},
+            "calls_per_second": 50000.0}}
+        new = {"router_dispatch": {"iterations": 5000, "latency_us": {"p50": 10.5, "p95": 30.0},
+            "calls_per_second": 40000.0}}
+        rows = {row["metric"]: row for row in compare.compare(old, new, threshold=0.1)}
+        self.assertNotIn("router_dispatch.iterations", rows)
+        self.assertEqual(rows["router_dispatch.latency_us.p50"]["verdict"], "")
+        self.assertEqual(rows["router_dispatch.latency_us.p95"]["verdict"], "regression")
+        self.assertEqual(rows["router_dispatch.calls_per_second"]["verdict"], "regression")
+
+    def test_synthetic_data_is_deterministic(self):
+        practitioners = synthetic.make_practitioners(3)
+        patients = synthetic.make_patients(10)
+        first = synthetic.make_appointments(practitioners, patients, days=7)
+        second = synthetic.make_appointments(practitioners, patients, days=7)
+        self.assertEqual(first, second)
+        self.assertTrue(all(a["appointment_date"].weekday() < 5 for a in first))
+        self.assertEqual(len(list(synthetic.make_audit_logs(25, ["u@bench.invalid"], patients))), 25)
+
+    def test_summarize_percentiles(self):
+        summary = harness.summarize([i / 1000.0 for i in range(1, 101)], unit=1e3)
+        self.assertEqual(summary["p50"], 51.0)
+        self.assertEqual(summary["p99"], 100.0)
+        self.assertIsNone(harness.summarize([]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import io
+import os
+import unittest
+import frappe
+from telehealth_platform.telehealth.utils import blob_store, upload_utils
+
+class TestBlobStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not getattr(getattr(frappe, "local", None), "db", None):
+            raise unittest.SkipTest("Uploads are checked against a site (bench run-tests)")
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def upload(self, content):
+        return upload_utils.save_stream(io.BytesIO(content), "scan.pdf", "User", "Administrator")
+
+    def get_ref_count(self, file_doc):
+        return frappe.db.get_value("Content Blob", {"file_url": file_doc.file_url}, "ref_count")
+
+    def test_identical_uploads_share_one_blob(self):
+        content = frappe.generate_hash(length=64).encode()
+        first, second = self.upload(content), self.upload(content)
+        path = frappe.get_site_path(first.file_url.lstrip("/"))
+        self.assertTrue(first.file_url.startswith(f"/private/files/{blob_store.BLOB_DIR}/"))
+        self.assertEqual(second.file_url, first.file_url)
+        self.assertEqual(self.get_ref_count(first), 2)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), content)
+
+        frappe.delete_doc("File", first.name, ignore_permissions=True)
+        self.assertEqual(self.get_ref_count(second), 1)
+        self.assertTrue(os.path.exists(path))
+
+        frappe.delete_doc("File", second.name, ignore_permissions=True)
+        self.assertIsNone(self.get_ref_count(second))
+        self.assertFalse(os.path.exists(path))
+
+    def test_rollback_removes_the_stored_blob(self):
+        file_doc = self.upload(frappe.generate_hash(length=64).encode())
+        path = frappe.get_site_path(file_doc.file_url.lstrip("/"))
+        self.assertTrue(os.path.exists(path))
+        frappe.db.rollback()
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == "__main__":
+    unittest.main()
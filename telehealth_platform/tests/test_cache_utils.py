@@ -0,0 +1,112 @@
+import pickle
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+import frappe
+from telehealth_platform.telehealth.utils import cache_utils
+
+class FakeRedis:
+    """
+    The parts of Frappe's RedisWrapper cache_utils uses: hset/hdel/sadd/smembers
+    prefix the key (hset pickles the value), pipelines send raw commands.
+    """
+    def __init__(self):
+        self.hashes, self.sets = {}, {}
+
+    def make_key(self, key):
+        return f"site1|{key}"
+
+    def hset(self, name, key, value):
+        self.hashes.setdefault(self.make_key(name), {})[key] = pickle.dumps(value)
+
+    def hdel(self, name, key):
+        self.hashes.get(self.make_key(name), {}).pop(key, None)
+
+    def sadd(self, name, value):
+        self.sets.setdefault(self.make_key(name), set()).add(value.encode())
+
+    def smembers(self, name):
+        return self.sets.get(self.make_key(name), set())
+
+    def delete_value(self, name):
+        self.sets.pop(self.make_key(name), None)
+        self.hashes.pop(self.make_key(name), None)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.results = redis, []
+
+    def hmget(self, key, fields):
+        values = self.redis.hashes.get(key, {})
+        self.results.append([values.get(field) for field in fields])
+
+    def hincrby(self, key, field, amount):
+        values = self.redis.hashes.setdefault(key, {})
+        values[field] = str(int(values.get(field, 0)) + amount).encode()
+        self.results.append(int(values[field]))
+
+    def execute(self):
+        results, self.results = self.results, []
+        return results
+
+class TestCacheUtils(unittest.TestCase):
+    def setUp(self):
+        redis = FakeRedis()
+        patches = (("cache", lambda: redis), ("safe_decode", lambda v: v.decode()),
+            ("local", SimpleNamespace()))
+        for name, value in patches:
+            patcher = mock.patch.object(frappe, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_build_racing_an_invalidation_is_not_served(self):
+        def build_during_commit():
+            # The change commits and is invalidated while this build runs
+            cache_utils.clear_cached("orders", "PAT-1")
+            return {"orders": ["stale"]}
+
+        stale = cache_utils.get_cached("orders", "PAT-1", build_during_commit)
+        self.assertEqual(stale["payload"], {"orders": ["stale"]})
+        fresh = cache_utils.get_cached("orders", "PAT-1", lambda: {"orders": ["fresh"]})
+        self.assertEqual(fresh["payload"], {"orders": ["fresh"]})
+        again = cache_utils.get_cached("orders", "PAT-1", lambda: {"orders": ["rebuilt"]})
+        self.assertEqual(again["etag"], fresh["etag"])
+
+    def test_entries_expire(self):
+        cache_utils.get_cached("orders", "PAT-1", lambda: {"orders": []}, ttl=60)
+        with mock.patch.object(cache_utils.time, "time", return_value=cache_utils.time.time() + 61):
+            entry = cache_utils.get_cached("orders", "PAT-1", lambda: {"orders": ["new"]})
+        self.assertEqual(entry["payload"], {"orders": ["new"]})
+
+    def test_invalidating_a_tag_drops_its_entries(self):
+        build = lambda keys: {key: ({"id": key}, [f"User:{key}"]) for key in keys}
+        entries, misses = cache_utils.get_cached_many("profiles", ["a", "b"], build)
+        self.assertEqual(misses, 2)
+        cache_utils.invalidate_tags("profiles", ["User:a"])
+        entries, misses = cache_utils.get_cached_many("profiles", ["a", "b"], build)
+        self.assertEqual((sorted(entries), misses), (["a", "b"], 1))
+
+    def test_clearing_a_namespace_outdates_running_builds(self):
+        def build_during_recompute(keys):
+            cache_utils.clear_namespace("profiles")
+            return {key: ({"rating": 4.0}, []) for key in keys}
+
+        cache_utils.get_cached_many("profiles", ["a"], build_during_recompute)
+        entries, misses = cache_utils.get_cached_many("profiles", ["a"],
+            lambda keys: {key: ({"rating": 4.5}, []) for key in keys})
+        self.assertEqual((entries["a"]["payload"], misses), ({"rating": 4.5}, 1))
+
+    def test_patient_link_is_seen_after_commit(self):
+        db = SimpleNamespace(get_value=lambda *args: None, after_commit=SimpleNamespace(add=lambda fn: fn()))
+        with mock.patch.object(frappe, "db", db, create=True):
+            self.assertIsNone(cache_utils.get_patient_for_user("jane@example.com"))
+            db.get_value = lambda *args: "PAT-1"
+            self.assertIsNone(cache_utils.get_patient_for_user("jane@example.com"))
+            cache_utils.clear_patient_for_user({"user_id": "jane@example.com"})
+            self.assertEqual(cache_utils.get_patient_for_user("jane@example.com"), "PAT-1")
+
+if __name__ == "__main__":
+    unittest.main()
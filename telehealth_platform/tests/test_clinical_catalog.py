@@ -0,0 +1,94 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+import frappe
+from telehealth_platform.telehealth.utils import clinical_catalog, reference_index
+
+class Row(dict):
+    __getattr__ = dict.get
+
+MEDICATIONS = [
+    Row(name="Amoxicillin 500 mg Capsule", generic_name="amoxicillin", strength=500, strength_uom="mg",
+        dosage_form="Capsule", modified=1),
+    Row(name="Amoxicillin and Clavulanate 875 mg Tablet", generic_name="amoxicillin clavulanate", modified=2),
+    Row(name="Amlodipine 5 mg Tablet", generic_name="amlodipine", modified=3),
+    Row(name="Amoxicillin 250 mg Suspension (Discontinued)", generic_name="amoxicillin", disabled=1, modified=4),
+]
+LAB_TESTS = [
+    Row(name="CBC", lab_test_name="Complete Blood Count", lab_test_code="85025", modified=1),
+    Row(name="LIPID", lab_test_name="Lipid Panel", lab_test_code="80061", modified=2),
+]
+
+class FakeSite:
+    """
+    get_all over in-memory tables; get_meta knows only the fields each table's rows carry.
+    """
+    def __init__(self, tables):
+        self.tables = tables
+        self.requested_fields = {}
+
+    def get_meta(self, doctype):
+        fields = {f for row in self.tables[doctype] for f in row}
+        return SimpleNamespace(has_field=lambda f: f in fields)
+
+    def get_all(self, doctype, filters=None, fields=None, order_by=None):
+        self.requested_fields[doctype] = fields
+        since = (filters or {}).get("modified", (None, 0))[1]
+        return [Row({f: row.get(f) for f in fields}) for row in self.tables[doctype] if row.modified >= since]
+
+class TestClinicalCatalog(unittest.TestCase):
+    def setUp(self):
+        self.site = FakeSite({"Medication": [Row(r) for r in MEDICATIONS], "Lab Test Template": LAB_TESTS})
+        patches = (
+            ("local", SimpleNamespace(site=f"test-{id(self)}")),
+            ("get_meta", self.site.get_meta),
+            ("get_all", self.site.get_all),
+            ("cache", lambda: SimpleNamespace(hget=lambda key, field: None)),
+        )
+        for name, value in patches:
+            patcher = mock.patch.object(frappe, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def search(self, text, limit=10):
+        return [row["name"] for row in clinical_catalog.medications.search(text, limit=limit)]
+
+    def test_ranking(self):
+        self.assertEqual(self.search("amox")[:2],
+            ["Amoxicillin 500 mg Capsule", "Amoxicillin and Clavulanate 875 mg Tablet"])
+        self.assertEqual(self.search("clavulanate")[0], "Amoxicillin and Clavulanate 875 mg Tablet")
+        # Misspelling of the generic name
+        self.assertEqual(self.search("amlodepine")[0], "Amlodipine 5 mg Tablet")
+
+    def test_disabled_rows_are_left_out(self):
+        self.assertNotIn("Amoxicillin 250 mg Suspension (Discontinued)", self.search("amoxicillin"))
+
+        # Disabling a row is picked up on the next refresh through the modified watermark
+        self.site.tables["Medication"][2].update(disabled=1, modified=5)
+        with mock.patch.object(reference_index.time, "monotonic", return_value=10 ** 9):
+            self.assertNotIn("Amlodipine 5 mg Tablet", self.search("amlodipine"))
+
+    def test_only_existing_fields_are_fetched(self):
+        rows = clinical_catalog.service_templates["Lab Test Template"].search("lipid")
+        self.assertEqual(rows[0]["name"], "LIPID")
+        self.assertEqual(set(self.site.requested_fields["Lab Test Template"]),
+            {"name", "modified", "lab_test_name", "lab_test_code"})
+
+    def test_service_template_types(self):
+        self.assertEqual(set(clinical_catalog.service_templates),
+            {"Lab Test Template", "Clinical Procedure Template", "Observation Template"})
+        self.assertIsNone(clinical_catalog.service_templates.get("User"))
+        rows = clinical_catalog.service_templates["Lab Test Template"].search("85025")
+        self.assertEqual(rows[0]["name"], "CBC")
+
+    def test_search_rejects_other_doctypes(self):
+        from telehealth_platform.telehealth.api.service_request import search_service_templates
+        frappe.local.response = SimpleNamespace()
+        result = search_service_templates("admin", type="User")
+        self.assertEqual(result["error"], "Bad Request")
+        self.assertEqual(frappe.local.response.http_status_code, 400)
+        self.assertNotIn("User", self.site.requested_fields)
+        self.assertEqual(search_service_templates("lipid")[0]["name"], "LIPID")
+
+if __name__ == "__main__":
+    unittest.main()
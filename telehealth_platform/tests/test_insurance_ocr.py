@@ -0,0 +1,93 @@
+import threading
+import time
+import unittest
+from telehealth_platform.adapters.ocr_adapter import OCRAdapter, OCRTransientError, parse_card_fields
+from telehealth_platform.telehealth.utils.job_utils import keep_slot, run_with_retries
+
+CARD_FRONT = b"""Blue Shield of California
+Member Name: JANE DOE
+Member ID: XJK123456789
+Group: 00457812
+PPO
+"""
+
+class TestInsuranceOCR(unittest.TestCase):
+    def test_parse_card_fields(self):
+        fields = parse_card_fields([
+            "Aetna",
+            "Subscriber: John Smith",
+            "ID # W123456789",
+            "GRP 0098765",
+            "Plan: HMO Select"
+        ])
+        self.assertEqual(fields["provider_name"], "Aetna")
+        self.assertEqual(fields["subscriber_name"], "John Smith")
+        self.assertEqual(fields["policy_number"], "W123456789")
+        self.assertEqual(fields["group_number"], "0098765")
+        self.assertEqual(fields["plan_type"], "HMO")
+
+    def test_local_engine(self):
+        # Without Tesseract installed the local engine reads text fixtures
+        fields = OCRAdapter(engine="local").extract_card_fields(CARD_FRONT)
+        self.assertEqual(fields["provider_name"], "Blue Shield of California")
+        self.assertEqual(fields["policy_number"], "XJK123456789")
+        self.assertEqual(fields["group_number"], "00457812")
+        self.assertEqual(fields["plan_type"], "PPO")
+
+    def test_retries_transient_errors(self):
+        calls = []
+        delays = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OCRTransientError("throttled")
+            return "ok"
+
+        result = run_with_retries(flaky, retry_on=(OCRTransientError,), base_delay=1.0,
+            sleep=delays.append)
+        self.assertEqual(result, "ok")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(len(delays), 2)
+        self.assertTrue(0 <= delays[1] <= 2.0)
+
+    def test_gives_up_after_max_attempts(self):
+        def failing():
+            raise OCRTransientError("unavailable")
+
+        with self.assertRaises(OCRTransientError):
+            run_with_retries(failing, retry_on=(OCRTransientError,), max_attempts=2, sleep=lambda s: None)
+
+    def test_permanent_errors_are_not_retried(self):
+        calls = []
+
+        def broken():
+            calls.append(1)
+            raise ValueError("bad image")
+
+        with self.assertRaises(ValueError):
+            run_with_retries(broken, retry_on=(OCRTransientError,), sleep=lambda s: None)
+        self.assertEqual(len(calls), 1)
+
+class FakeSlots:
+    def __init__(self):
+        self.scores = {}
+
+    def zadd(self, key, mapping, xx=False):
+        for token, score in mapping.items():
+            if token in self.scores or not xx:
+                self.scores[token] = score
+
+class TestConcurrencySlot(unittest.TestCase):
+    def test_held_slot_is_refreshed(self):
+        slots, stop = FakeSlots(), threading.Event()
+        slots.scores["holder"] = 0
+        heartbeat = threading.Thread(target=keep_slot, args=(slots, "slots", "holder", stop, 0.01))
+        heartbeat.start()
+        time.sleep(0.05)
+        stop.set()
+        heartbeat.join()
+        self.assertGreater(slots.scores["holder"], time.time() - 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import pickle
+import unittest
+from unittest import mock
+import frappe
+from telehealth_platform.telehealth.utils import metrics
+
+class FakeRedis:
+    """
+    The parts of Frappe's RedisWrapper metrics uses: raw hash commands and
+    pipelines, plus its hgetall, which prefixes the key and unpickles values.
+    """
+    def __init__(self):
+        self.hashes = {}
+
+    def make_key(self, key):
+        return f"site1|{key}"
+
+    def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field.encode()] = str(float(fields.get(field.encode(), 0)) + amount).encode()
+
+    hincrbyfloat = hincrby
+
+    def hgetall(self, key):
+        return {k: pickle.loads(v) for k, v in self.hashes.get(self.make_key(key), {}).items()}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis, self.results = redis, []
+
+    def hincrby(self, key, field, amount):
+        self.results.append(self.redis.hincrby(key, field, amount))
+
+    hincrbyfloat = hincrby
+
+    def hgetall(self, key):
+        self.results.append(dict(self.redis.hashes.get(key, {})))
+
+    def execute(self):
+        results, self.results = self.results, []
+        return results
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        redis = FakeRedis()
+        for name, value in (("cache", lambda: redis), ("safe_decode", lambda v: v.decode())):
+            patcher = mock.patch.object(frappe, name, value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_recorded_metrics_read_back(self):
+        metrics.incr("upload_bytes_stored_total", 2048)
+        metrics.incr("upload_bytes_stored_total", 1024)
+        metrics.observe("upload_seconds", 0.2)
+        values = metrics.get_all()
+        self.assertEqual(values["upload_bytes_stored_total"], 3072)
+        self.assertEqual(values["upload_seconds_count"], 1)
+        self.assertEqual(values["upload_seconds_bucket:0.25"], 1)
+        self.assertEqual(metrics.get_average(values, "upload_seconds"), 0.2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import datetime
+import io
+import unittest
+from telehealth_platform.telehealth.utils.patient_import import (ImportFormatError, clean_row, iter_batches,
+    iter_rows, validate_batch)
+
+TODAY = datetime.date(2026, 10, 19)
+
+class TestPatientImport(unittest.TestCase):
+    def test_csv_rows_stream_with_line_numbers(self):
+        content = "Patient_Name,Email,Phone,Date_of_Birth,Gender\n" \
+            "Jane Doe,JANE@example.com,(555) 010-0001,1990-02-01,F\n" \
+            "John Roe,john@example.com,,01/03/1985,male\n"
+        rows = list(iter_rows(io.BytesIO(content.encode("utf-8")), "csv"))
+        self.assertEqual([line for line, _row in rows], [2, 3])
+        self.assertEqual(rows[0][1]["email"], "JANE@example.com")
+
+    def test_ndjson_malformed_line(self):
+        content = b'{"patient_name": "Jane Doe"}\n\nnot json\n[1, 2]\n'
+        rows = list(iter_rows(io.BytesIO(content), "ndjson"))
+        self.assertEqual(rows, [(1, {"patient_name": "Jane Doe"}), (3, None), (4, None)])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ImportFormatError):
+            list(iter_rows(io.BytesIO(b""), "xlsx"))
+
+    def test_clean_row_normalizes(self):
+        record = clean_row({"first_name": "Jane", "last_name": "Doe", "email": " JANE@Example.com ",
+            "phone": "(555) 010-0001", "date_of_birth": "01/02/1990", "gender": "F"}, TODAY, "dmy")
+        self.assertEqual(record, {
+            "patient_name": "Jane Doe",
+            "email": "jane@example.com",
+            "phone": "5550100001",
+            "date_of_birth": "1990-02-01",
+            "gender": "Female"
+        })
+        self.assertEqual(clean_row({"patient_name": "A B", "email": "a@b.co", "date_of_birth": "2000-01-01"},
+            TODAY)["gender"], "Other")
+
+    def test_dates_follow_one_format(self):
+        row = {"patient_name": "Jane Doe", "email": "jane@example.com", "date_of_birth": "03/04/1990"}
+        self.assertEqual(clean_row(row, TODAY, "dmy")["date_of_birth"], "1990-04-03")
+        self.assertEqual(clean_row(row, TODAY, "mdy")["date_of_birth"], "1990-03-04")
+        with self.assertRaisesRegex(ValueError, "YYYY-MM-DD"):
+            clean_row(row, TODAY)
+        with self.assertRaisesRegex(ValueError, "DD/MM/YYYY"):
+            clean_row(dict(row, date_of_birth="12/25/1990"), TODAY, "dmy")
+
+    def test_clean_row_rejects(self):
+        base = {"patient_name": "Jane Doe", "email": "jane@example.com", "date_of_birth": "1990-01-01"}
+        for change, reason in [
+            ({"patient_name": ""}, "patient_name"),
+            ({"email": "jane.example.com"}, "email"),
+            ({"date_of_birth": "31 Feb 1990"}, "date_of_birth"),
+            ({"date_of_birth": "2030-01-01"}, "future"),
+            ({"gender": "x"}, "gender"),
+        ]:
+            with self.assertRaisesRegex(ValueError, reason):
+                clean_row(dict(base, **change), TODAY)
+
+    def test_validate_batch_dedupes_across_batches(self):
+        seen = set()
+        rows = [
+            (2, {"patient_name": "Jane Doe", "email": "jane@example.com", "date_of_birth": "1990-01-01"}),
+            (3, {"patient_name": "Jane Dup", "email": "JANE@example.com", "date_of_birth": "1990-01-01"}),
+            (4, None),
+            (5, {"patient_name": "John Roe", "email": "john@example.com", "date_of_birth": "1985-03-01"}),
+        ]
+        batches = list(iter_batches(rows, 2))
+        self.assertEqual([len(b) for b in batches], [2, 2])
+
+        valid, errors = [], []
+        for batch in batches:
+            batch_valid, batch_errors = validate_batch(batch, seen, TODAY)
+            valid += batch_valid
+            errors += batch_errors
+        self.assertEqual([line for line, _record in valid], [2, 5])
+        self.assertEqual(errors, [(3, "jane@example.com", "Duplicate email in file"), (4, "", "Malformed row")])
+        self.assertEqual(seen, {"jane@example.com", "john@example.com"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+import frappe
+from telehealth_platform.telehealth.utils.profiling import RequestProfile, count_queries, render_prometheus, timed_sql
+
+class TestProfiling(unittest.TestCase):
+    def test_timed_sql_counts_queries(self):
+        profile = RequestProfile()
+        sql = timed_sql(lambda query, values=None: [(1,)], profile)
+        self.assertEqual(sql("select 1"), [(1,)])
+        sql("select 2", values=[])
+        self.assertEqual(profile.db_queries, 2)
+        self.assertGreaterEqual(profile.db_seconds, 0)
+
+    def test_count_queries_restores_sql(self):
+        class Database:
+            def sql(self, query):
+                return [(1,)]
+
+        db = Database()
+        with mock.patch.object(frappe, "local", SimpleNamespace(db=db), create=True):
+            with count_queries() as counter:
+                db.sql("select 1")
+                db.sql("select 2")
+            db.sql("select 3")
+        self.assertEqual(counter.db_queries, 2)
+        self.assertNotIn("sql", db.__dict__)
+
+    def test_render_route_histogram_is_cumulative(self):
+        text = render_prometheus({
+            "GET appointment.list_appointments|wall_seconds_bucket:0.05": 3,
+            "GET appointment.list_appointments|wall_seconds_bucket:0.25": 1,
+            "GET appointment.list_appointments|wall_seconds_bucket:+Inf": 1,
+            "GET appointment.list_appointments|wall_seconds_count": 5,
+            "GET appointment.list_appointments|wall_seconds_sum": 3.5,
+            "GET appointment.list_appointments|requests_total:2xx": 5,
+            "GET appointment.list_appointments|external_call_seconds_total:stripe": 0.25,
+        }, {})
+        labels = 'method="GET",route="appointment.list_appointments"'
+        self.assertIn("# TYPE telehealth_route_wall_seconds histogram", text)
+        self.assertIn(f'telehealth_route_wall_seconds_bucket{{{labels},le="0.05"}} 3', text)
+        self.assertIn(f'telehealth_route_wall_seconds_bucket{{{labels},le="0.25"}} 4', text)
+        self.assertIn(f'telehealth_route_wall_seconds_bucket{{{labels},le="+Inf"}} 5', text)
+        self.assertIn(f"telehealth_route_wall_seconds_sum{{{labels}}} 3.5", text)
+        self.assertIn(f'telehealth_route_requests_total{{{labels},status="2xx"}} 5', text)
+        self.assertIn(f'telehealth_route_external_call_seconds_total{{{labels},service="stripe"}} 0.25', text)
+
+    def test_render_site_metrics(self):
+        text = render_prometheus({}, {"upload_total": 7.0, "ocr_latency_seconds_count": 2.0,
+            "ocr_latency_seconds_sum": 0.5, "ocr_latency_seconds_bucket:0.25": 2.0})
+        self.assertIn("# TYPE telehealth_upload_total counter\ntelehealth_upload_total 7\n", text)
+        self.assertIn('telehealth_ocr_latency_seconds_bucket{le="0.25"} 2', text)
+        self.assertIn('telehealth_ocr_latency_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("telehealth_ocr_latency_seconds_count 2", text)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import frappe
+
+# Hot lookups and the columns the index serving each one must start with.
+# Queries are built the way the API builds them (frappe.get_all), so a change
+# to a filter or sort that no longer matches an index fails here.
+HOT_QUERIES = [
+    ("session by appointment", "Telehealth Video Session",
+        dict(filters={"appointment": "APT-0001"}), ["appointment"]),
+    ("session by room", "Telehealth Video Session",
+        dict(filters={"room_name": "room-APT-0001"}), ["room_name"]),
+    ("stuck active sessions", "Telehealth Video Session",
+        dict(filters={"status": "Active", "started_at": ["<", "2026-01-01 00:00:00"]}), ["status", "started_at"]),
+    ("transcript of a session", "Transcript Chunk",
+        dict(filters={"video_session": "VS-0001"}, fields=["speaker", "text", "timestamp", "is_final"],
+            order_by="timestamp asc"), ["video_session", "timestamp"]),
+    ("note of a session", "Clinical Note AI",
+        dict(filters={"video_session": "VS-0001"}), ["video_session"]),
+    ("AI data of a session", "AI Session Data",
+        dict(filters={"video_session": "VS-0001"}), ["video_session"]),
+    ("recording of a session", "Video Recording",
+        dict(filters={"video_session": "VS-0001"}), ["video_session"]),
+    ("recording by egress", "Video Recording",
+        dict(filters={"egress_id": "EG_0001"}), ["egress_id"]),
+    ("expired recordings", "Video Recording",
+        dict(filters={"expires_at": ["<", "2026-01-01 00:00:00"]}, order_by="expires_at asc"), ["expires_at"]),
+    ("latest insurance verification", "Insurance Verification",
+        dict(filters={"patient": "PAT-0001"}, order_by="creation desc"), ["patient", "creation"]),
+    ("PHI log of a patient", "PHI Access Log",
+        dict(filters={"patient": "PAT-0001"}, order_by="timestamp desc, name desc"), ["patient", "timestamp"]),
+    ("PHI log of a user", "PHI Access Log",
+        dict(filters={"user": "someone@example.com"}, order_by="timestamp desc, name desc"), ["user", "timestamp"]),
+]
+
+# One session per appointment and one note per session are enforced by the database
+UNIQUE_COLUMNS = [
+    ("Telehealth Video Session", "appointment"),
+    ("Telehealth Video Session", "room_name"),
+    ("Clinical Note AI", "video_session"),
+    ("Video Recording", "egress_id"),
+]
+
+def get_indexes(doctype, unique=False):
+    """
+    {index name: [columns in order]} of the DocType's table.
+    """
+    indexes = {}
+    for row in frappe.db.sql(f"show index from `tab{doctype}`", as_dict=True):
+        if unique and row.Non_unique:
+            continue
+        indexes.setdefault(row.Key_name, []).append((row.Seq_in_index, row.Column_name))
+    return {name: [column for _seq, column in sorted(columns)] for name, columns in indexes.items()}
+
+class TestQueryPlans(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if not getattr(getattr(frappe, "local", None), "db", None) or frappe.db.db_type != "mariadb":
+            raise unittest.SkipTest("Query plans are checked against a MariaDB site (bench run-tests)")
+        # Prefer index lookups to table scans, as the optimizer does once the
+        # tables hold production volumes; test sites are nearly empty
+        frappe.db.sql("set session max_seeks_for_key = 1")
+
+    @classmethod
+    def tearDownClass(cls):
+        frappe.db.sql("set session max_seeks_for_key = default")
+
+    def test_hot_queries_use_an_index(self):
+        for label, doctype, query, columns in HOT_QUERIES:
+            with self.subTest(label):
+                matching = [name for name, indexed in get_indexes(doctype).items()
+                    if indexed[:len(columns)] == columns]
+                self.assertTrue(matching, f"No index on `tab{doctype}` starting with {columns}")
+
+                sql = frappe.get_all(doctype, run=0, **query)
+                plan = frappe.db.sql(f"explain {sql}", as_dict=True)[0]
+                if "Impossible WHERE" in (plan.Extra or "") or "no matching row" in (plan.Extra or ""):
+                    continue
+                self.assertNotEqual(plan.type, "ALL", f"{label} scans `tab{doctype}`: {plan}")
+                self.assertIn(plan.key, matching, f"{label} uses {plan.key}, expected one of {matching}")
+
+    def test_unique_constraints(self):
+        for doctype, column in UNIQUE_COLUMNS:
+            with self.subTest(f"{doctype}.{column}"):
+                self.assertIn([column], get_indexes(doctype, unique=True).values())
+
+if __name__ == "__main__":
+    unittest.main()
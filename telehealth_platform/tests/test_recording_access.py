@@ -0,0 +1,47 @@
+import unittest
+from telehealth_platform.telehealth.utils.recording_access import get_object_key, is_fresh, rewrite_playlist
+
+PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:7
+#EXT-X-TARGETDURATION:6
+#EXT-X-PLAYLIST-TYPE:VOD
+#EXT-X-MAP:URI="init.mp4"
+#EXTINF:6.000,
+seg_00000.m4s
+#EXTINF:6.000,
+../shared/seg_00001.m4s
+#EXTINF:2.500,
+https://cdn.example.com/seg_00002.m4s
+#EXT-X-ENDLIST
+"""
+
+def sign(key):
+    return f"https://bucket.local/{key}?X-Amz-Signature=x"
+
+class TestRecordingAccess(unittest.TestCase):
+    def test_rewrite_playlist_signs_segments(self):
+        lines = rewrite_playlist(PLAYLIST, "recordings/room-1/hls/index.m3u8", sign).splitlines()
+        self.assertEqual(lines[4], '#EXT-X-MAP:URI="https://bucket.local/recordings/room-1/hls/init.mp4?X-Amz-Signature=x"')
+        self.assertEqual(lines[6], "https://bucket.local/recordings/room-1/hls/seg_00000.m4s?X-Amz-Signature=x")
+        self.assertEqual(lines[8], "https://bucket.local/recordings/room-1/shared/seg_00001.m4s?X-Amz-Signature=x")
+        # Absolute URIs and tags are left alone
+        self.assertEqual(lines[10], "https://cdn.example.com/seg_00002.m4s")
+        self.assertEqual(lines[5], "#EXTINF:6.000,")
+        self.assertEqual(lines[-1], "#EXT-X-ENDLIST")
+
+    def test_get_object_key(self):
+        self.assertEqual(get_object_key("recordings/a.mp4"), "recordings/a.mp4")
+        self.assertEqual(get_object_key("s3://telehealth/recordings/a.mp4"), "recordings/a.mp4")
+        self.assertEqual(get_object_key("https://telehealth.s3.amazonaws.com/recordings/a%20b.mp4", "telehealth"),
+            "recordings/a b.mp4")
+        self.assertEqual(get_object_key("http://localhost:9000/telehealth/recordings/a.mp4", "telehealth"),
+            "recordings/a.mp4")
+
+    def test_is_fresh_refreshes_before_expiry(self):
+        entry = {"expires_at": 10000}
+        self.assertTrue(is_fresh(entry, 10000 - 301))
+        self.assertFalse(is_fresh(entry, 10000 - 300))
+        self.assertFalse(is_fresh(entry, 10001))
+
+if __name__ == "__main__":
+    unittest.main()
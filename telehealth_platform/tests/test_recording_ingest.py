@@ -0,0 +1,52 @@
+import unittest
+from telehealth_platform.telehealth.utils.recording_ingest import (TRANSCODE_TIERS, build_ffmpeg_args,
+    get_rendition_key, parse_egress)
+
+EGRESS_ENDED = {
+    "egressId": "EG_abc123",
+    "roomName": "room-APT-0001",
+    "status": "EGRESS_COMPLETE",
+    "fileResults": [{
+        "filename": "recordings/room-APT-0001.mp4",
+        "location": "https://telehealth.s3.amazonaws.com/recordings/room-APT-0001.mp4",
+        "size": "52428800",
+        "duration": "1805400000000"
+    }],
+    "segmentResults": [{"playlistName": "recordings/room-APT-0001/index.m3u8", "segmentCount": "301"}]
+}
+
+class TestRecordingIngest(unittest.TestCase):
+    def test_parse_egress(self):
+        self.assertEqual(parse_egress(EGRESS_ENDED), {
+            "egress_id": "EG_abc123",
+            "room_name": "room-APT-0001",
+            "status": "EGRESS_COMPLETE",
+            "storage_key": "recordings/room-APT-0001.mp4",
+            "hls_playlist": "recordings/room-APT-0001/index.m3u8",
+            "size_bytes": 52428800,
+            "duration": 1805
+        })
+
+    def test_parse_egress_snake_case_location_only(self):
+        info = parse_egress({"egress_id": "EG_1", "room_name": "r", "status": "EGRESS_FAILED",
+            "file": {"location": "s3://telehealth/recordings/r.mp4"}})
+        self.assertEqual(info["storage_key"], "recordings/r.mp4")
+        self.assertEqual(info["status"], "EGRESS_FAILED")
+        self.assertIsNone(info["hls_playlist"])
+        self.assertIsNone(info["duration"])
+
+    def test_ffmpeg_args(self):
+        video = build_ffmpeg_args("https://src", "/tmp/review.mp4", TRANSCODE_TIERS["review"])
+        self.assertIn("scale=-2:480,fps=15", video)
+        self.assertEqual(video[video.index("-b:v") + 1], "500k")
+        self.assertEqual(video[-3:], ["-movflags", "+faststart", "/tmp/review.mp4"])
+
+        audio = build_ffmpeg_args("https://src", "/tmp/audio.m4a", TRANSCODE_TIERS["audio"])
+        self.assertIn("-vn", audio)
+        self.assertNotIn("-c:v", audio)
+
+    def test_rendition_key(self):
+        self.assertEqual(get_rendition_key("recordings/room-1.mp4", "review", "mp4"), "recordings/room-1.review.mp4")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+from telehealth_platform.telehealth.utils.replica import get_route, parse_lag
+
+class TestReplica(unittest.TestCase):
+    def test_route_prefers_replica_only_when_fresh(self):
+        self.assertEqual(get_route(sticky=False, lag=0.5, max_lag=5), "replica")
+        self.assertEqual(get_route(sticky=False, lag=5, max_lag=5), "replica")
+        self.assertEqual(get_route(sticky=False, lag=12, max_lag=5), "lag")
+        self.assertEqual(get_route(sticky=False, lag=None, max_lag=5), "unavailable")
+
+    def test_recent_writer_stays_on_primary(self):
+        self.assertEqual(get_route(sticky=True, lag=0, max_lag=5), "sticky")
+
+    def test_parse_lag(self):
+        self.assertIsNone(parse_lag([]))
+        self.assertIsNone(parse_lag([{"Seconds_Behind_Master": None}]))
+        self.assertEqual(parse_lag([{"Seconds_Behind_Master": 3}]), 3.0)
+        self.assertEqual(parse_lag([{"Seconds_Behind_Master": 1}, {"Seconds_Behind_Master": 7}]), 7.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from telehealth_platform.telehealth.utils.text_index import TextIndex, normalize
+
+class TestTextIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TextIndex()
+        self.index.add("ANTHEM-CA", ["Anthem Blue Cross", "Anthem BC California"], {"payer_name": "Anthem Blue Cross"})
+        self.index.add("BCBS-TX", ["Blue Cross Blue Shield of Texas", "BCBS Texas"])
+        self.index.add("AETNA", ["Aetna", "Aetna Health Inc"])
+        self.index.add("CIGNA", "Cigna Healthcare")
+
+    def test_normalize(self):
+        self.assertEqual(normalize("Anthem Blue-Cross (OCR)"), "anthem blue cross")
+        self.assertEqual(normalize("  Société Générale  "), "societe generale")
+
+    def test_exact_match_ignores_noise(self):
+        key, score, payload = self.index.best_match("ANTHEM BLUE CROSS (OCR)")
+        self.assertEqual(key, "ANTHEM-CA")
+        self.assertEqual(score, 1.0)
+        self.assertEqual(payload["payer_name"], "Anthem Blue Cross")
+
+    def test_prefix_ranks_above_word_prefix(self):
+        results = self.index.search("blue cr")
+        self.assertEqual(results[0][0], "BCBS-TX")
+        self.assertIn("ANTHEM-CA", [key for key, _score in results])
+
+    def test_misspelling(self):
+        self.assertEqual(self.index.best_match("Antem Blue Cros")[0], "ANTHEM-CA")
+        self.assertEqual(self.index.best_match("Blue Cross Blu Sheild Texas")[0], "BCBS-TX")
+
+    def test_no_match(self):
+        self.assertIsNone(self.index.best_match("Zzyzx Mutual", min_score=0.6))
+
+    def test_update_and_remove(self):
+        self.index.add("CIGNA", "Cigna Global Health")
+        self.assertIsNone(self.index.best_match("Cigna Healthcare", min_score=0.9))
+        self.assertEqual(self.index.best_match("cigna global")[0], "CIGNA")
+
+        self.index.remove("CIGNA")
+        self.assertNotIn("CIGNA", self.index)
+        self.assertEqual(self.index.search("cigna"), [])
+
+if __name__ == "__main__":
+    unittest.main()